@@ -1,67 +1,264 @@
 import hashlib
-from dataclasses import asdict
-from typing import List, Tuple
+from typing import List, Optional
 
-from .randomness import derive_random_vectors, select_gemm_indices
+from metrics.metrics import inc, timed
+
+from .codec import (
+    decode_challenge,
+    decode_job,
+    decode_receipt,
+    decode_verification,
+    decode_worker,
+    encode_challenge,
+    encode_job,
+    encode_receipt,
+    encode_verification,
+    encode_worker,
+)
+from .epoch import EpochConfig, EpochLedger, EpochResult, decode_epoch_result, encode_epoch_result
+from .policy import ChallengeDecision, ChallengePolicy, FixedPolicy
+from .randomness import derive_random_vectors
+from .sampling import WeightedSampler
 from .types import (
     Challenge,
     ChainState,
-    GemmCommitment,
     Job,
     Receipt,
     RewardAccount,
     Verification,
     Worker,
 )
+from .storage import (
+    OP_ASSIGN_CHALLENGE,
+    OP_CLOSE_EPOCH,
+    OP_CREATE_JOB,
+    OP_REGISTER_WORKER,
+    OP_SUBMIT_RECEIPT,
+    OP_SUBMIT_VERIFICATION,
+    ChainStore,
+)
+
+
+def verifier_weight(worker: Worker) -> int:
+    return max(worker.stake, 0) * (1 + max(worker.reputation_score, 0))
 
 
 class Chain:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        store: Optional[ChainStore] = None,
+        epoch: Optional[EpochConfig] = None,
+        policy: Optional[ChallengePolicy] = None,
+    ) -> None:
         self.state = ChainState()
+        self.store = store
+        self.epoch_config = epoch
+        self.policy = policy if policy is not None else FixedPolicy()
+        self.ledger = EpochLedger() if epoch is not None else None
+        self.verifier_sampler = WeightedSampler()
+        if store is not None:
+            self._restore()
+
+    @classmethod
+    def open(
+        cls,
+        directory: str,
+        snapshot_interval: int = 100_000,
+        sync: bool = False,
+        epoch: Optional[EpochConfig] = None,
+        policy: Optional[ChallengePolicy] = None,
+    ) -> "Chain":
+        store = ChainStore(directory, snapshot_interval=snapshot_interval, sync=sync)
+        return cls(store=store, epoch=epoch, policy=policy)
+
+    def _restore(self) -> None:
+        self.state, extras, tail = self.store.load()
+        if extras and extras[0]:
+            self.ledger = EpochLedger.decode(extras[0])
+        # Verdicts applied before the snapshot; those in the tail are observed during replay.
+        self.policy.restore_state(extras[1] if len(extras) > 1 else b"")
+        self.verifier_sampler = WeightedSampler(
+            (pubkey, verifier_weight(worker)) for pubkey, worker in self.state.workers.items()
+        )
+        for op, payload in tail:
+            if op == OP_REGISTER_WORKER:
+                self._apply_worker(decode_worker(payload))
+            elif op == OP_CREATE_JOB:
+                self._apply_job(decode_job(payload))
+            elif op == OP_SUBMIT_RECEIPT:
+                self._apply_receipt(decode_receipt(payload))
+            elif op == OP_ASSIGN_CHALLENGE:
+                self._apply_challenge(decode_challenge(payload))
+            elif op == OP_SUBMIT_VERIFICATION:
+                self._apply_verification(decode_verification(payload))
+            elif op == OP_CLOSE_EPOCH:
+                self._apply_epoch(decode_epoch_result(payload))
+            else:
+                raise ValueError(f"Unknown operation in chain log: {op}")
+
+    def _log(self, op: int, payload: bytes) -> None:
+        if self.store is None:
+            return
+        self.store.append(op, payload)
+        if self.store.snapshot_due():
+            self.snapshot()
+
+    def snapshot(self) -> None:
+        if self.store is not None:
+            ledger = self.ledger.encode() if self.ledger is not None else b""
+            self.state = self.store.write_snapshot(self.state, [ledger, self.policy.encode_state()])
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
 
     def register_worker(self, pubkey: str, stake: int, supported_skus: List[str]) -> Worker:
         worker = Worker(pubkey=pubkey, stake=stake, supported_skus=supported_skus)
-        self.state.workers[pubkey] = worker
-        self.state.accounts.setdefault(pubkey, RewardAccount())
+        self._apply_worker(worker)
+        self._log(OP_REGISTER_WORKER, encode_worker(worker))
         return worker
 
+    def _apply_worker(self, worker: Worker) -> None:
+        self.state.workers[worker.pubkey] = worker
+        self.verifier_sampler.update(worker.pubkey, verifier_weight(worker))
+        self.state.accounts.setdefault(worker.pubkey, RewardAccount())
+
     def create_job(self, job_id: str, sku_id: str, input_root: str, shard_size: int, payment: int) -> Job:
         job = Job(job_id=job_id, sku_id=sku_id, input_root=input_root, shard_size=shard_size, payment=payment)
-        self.state.jobs[job_id] = job
+        self._apply_job(job)
+        self._log(OP_CREATE_JOB, encode_job(job))
         return job
 
+    def _apply_job(self, job: Job) -> None:
+        self.state.jobs[job.job_id] = job
+
+    @timed("chain.submit_receipt")
     def submit_receipt(self, receipt: Receipt) -> str:
-        receipt_id = self._hash_receipt(receipt)
+        encoded = encode_receipt(receipt)
+        receipt_id = self._apply_receipt(receipt, encoded)
+        self._log(OP_SUBMIT_RECEIPT, encoded)
+        return receipt_id
+
+    def _apply_receipt(self, receipt: Receipt, encoded: Optional[bytes] = None) -> str:
+        receipt_id = hashlib.sha256(encoded if encoded is not None else encode_receipt(receipt)).hexdigest()
         self.state.receipts[receipt_id] = receipt
         return receipt_id
 
-    def assign_challenge(
+    def select_verifier(self, receipt_id: str) -> str:
+        """Draw a verifier for ``receipt_id``, weighted by stake and reputation.
+
+        The receipt's own worker is never selected.
+        """
+        receipt = self.state.receipts[receipt_id]
+        verifier = self.verifier_sampler.sample(f"{receipt_id}:verifier", exclude=receipt.worker_pubkey)
+        if verifier is None:
+            raise ValueError("No staked verifier available")
+        return verifier
+
+    def plan_challenge(
         self,
         receipt_id: str,
         verifier_pubkey: str,
-        rounds: int = 20,
-        sample_count: int = 2,
-    ) -> Challenge:
+        rounds: Optional[int] = None,
+        sample_count: Optional[int] = None,
+    ) -> ChallengeDecision:
+        """Ask the challenge policy what to check for ``receipt_id``, without assigning anything.
+
+        ``rounds`` and ``sample_count`` override the policy with a ``FixedPolicy``.
+        """
         receipt = self.state.receipts[receipt_id]
-        seed = f"{receipt_id}:{verifier_pubkey}"
-        gemm_indices = self._select_gemms(receipt.gemm_commitments, seed, sample_count)
-        random_vectors = derive_random_vectors(seed, rounds)
+        policy = self.policy
+        if rounds is not None or sample_count is not None:
+            policy = FixedPolicy(
+                rounds=20 if rounds is None else rounds,
+                sample_count=2 if sample_count is None else sample_count,
+            )
+        worker = self.state.workers.get(receipt.worker_pubkey)
+        return policy.decide(receipt, worker, f"{receipt_id}:{verifier_pubkey}")
+
+    def assign_challenge(
+        self,
+        receipt_id: str,
+        verifier_pubkey: Optional[str] = None,
+        rounds: Optional[int] = None,
+        sample_count: Optional[int] = None,
+    ) -> Challenge:
+        if verifier_pubkey is None:
+            verifier_pubkey = self.select_verifier(receipt_id)
+        decision = self.plan_challenge(receipt_id, verifier_pubkey, rounds, sample_count)
         challenge = Challenge(
             receipt_id=receipt_id,
             verifier_pubkey=verifier_pubkey,
-            gemm_indices=gemm_indices,
-            random_vectors=random_vectors,
+            gemm_indices=decision.gemm_indices,
+            random_vectors=derive_random_vectors(f"{receipt_id}:{verifier_pubkey}", decision.rounds),
+            open_rows=decision.open_rows,
         )
-        self.state.challenges[receipt_id] = challenge
+        self._apply_challenge(challenge)
+        self._log(OP_ASSIGN_CHALLENGE, encode_challenge(challenge))
         return challenge
 
+    def _apply_challenge(self, challenge: Challenge) -> None:
+        self.state.challenges[challenge.receipt_id] = challenge
+
+    @timed("chain.submit_verification")
     def submit_verification(self, verification: Verification) -> None:
+        self._apply_verification(verification)
+        self._log(OP_SUBMIT_VERIFICATION, encode_verification(verification))
+        inc("chain.verifications_passed" if verification.verdict else "chain.verifications_failed")
+
+    def _apply_verification(self, verification: Verification) -> None:
         self.state.verifications[verification.receipt_id] = verification
-        if verification.verdict:
+        receipt = self.state.receipts[verification.receipt_id]
+        self.policy.observe(receipt.worker_pubkey, verification.verdict)
+        if self.ledger is not None:
+            if verification.verdict:
+                job = self.state.jobs[receipt.job_id]
+                self.ledger.record_success(receipt.worker_pubkey, job.shard_size, job.payment, verification.receipt_id)
+            else:
+                self.ledger.record_failure(receipt.worker_pubkey, verification.receipt_id)
+        elif verification.verdict:
             self._settle_reward(verification.receipt_id)
         else:
             self._slash_worker(verification.receipt_id)
 
+    def is_settled(self, receipt_id: str) -> bool:
+        """True once the receipt's verification has been applied to balances and stakes."""
+        if receipt_id not in self.state.verifications:
+            return False
+        return self.ledger is None or receipt_id not in self.ledger.pending
+
+    @timed("chain.close_epoch")
+    def close_epoch(self) -> EpochResult:
+        """Settle the current epoch and commit its result as one logged state delta."""
+        if self.ledger is None:
+            raise ValueError("Chain is not running in epoch mode")
+        inflation = self.epoch_config.inflation if self.epoch_config is not None else 0
+        result = self.ledger.settle(self.state.workers, inflation)
+        self._apply_epoch(result)
+        self._log(OP_CLOSE_EPOCH, encode_epoch_result(result))
+        return result
+
+    def _apply_epoch(self, result: EpochResult) -> None:
+        accounts = self.state.accounts
+        workers = self.state.workers
+        for idx, pubkey in enumerate(result.pubkeys):
+            if result.credits[idx] or result.rewards[idx]:
+                account = accounts.setdefault(pubkey, RewardAccount())
+                account.credits += result.credits[idx]
+                account.balance += result.rewards[idx]
+            if result.slashed[idx] and pubkey in workers:
+                worker = workers[pubkey]
+                workers[pubkey] = Worker(
+                    pubkey=pubkey,
+                    stake=result.stakes[idx],
+                    supported_skus=worker.supported_skus,
+                    reputation_score=result.reputation_scores[idx],
+                )
+                self.verifier_sampler.update(pubkey, verifier_weight(workers[pubkey]))
+        if self.ledger is None:
+            self.ledger = EpochLedger()
+        self.ledger.reset(result.epoch + 1)
+
     def _settle_reward(self, receipt_id: str) -> None:
         receipt = self.state.receipts[receipt_id]
         job = self.state.jobs[receipt.job_id]
@@ -73,19 +270,14 @@ class Chain:
         receipt = self.state.receipts[receipt_id]
         worker = self.state.workers[receipt.worker_pubkey]
         slashed = max(worker.stake // 10, 1)
-        self.state.workers[worker.pubkey] = Worker(
+        updated = Worker(
             pubkey=worker.pubkey,
             stake=max(worker.stake - slashed, 0),
             supported_skus=worker.supported_skus,
             reputation_score=max(worker.reputation_score - 1, 0),
         )
+        self.state.workers[worker.pubkey] = updated
+        self.verifier_sampler.update(worker.pubkey, verifier_weight(updated))
 
     def _hash_receipt(self, receipt: Receipt) -> str:
-        payload = str(asdict(receipt)).encode("utf-8")
-        return hashlib.sha256(payload).hexdigest()
-
-    def _select_gemms(
-        self, commitments: List[GemmCommitment], seed: str, sample_count: int
-    ) -> List[Tuple[int, int]]:
-        indices = select_gemm_indices(seed, len(commitments), sample_count)
-        return [(commitments[idx].layer_index, commitments[idx].gemm_index) for idx in indices]
+        return hashlib.sha256(encode_receipt(receipt)).hexdigest()
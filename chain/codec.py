@@ -0,0 +1,373 @@
+import functools
+import struct
+from typing import Callable, Dict, List, Tuple, Union
+
+from .types import Challenge, GemmCommitment, Job, Receipt, Verification, Worker
+
+
+# Canonical binary encoding for chain objects (spec/commitments.md).
+# Every message starts with a version byte and a type tag. Strings are
+# u32-length-prefixed UTF-8, roots and digests are raw 32 bytes, and integers
+# are little-endian.
+CODEC_VERSION = 1
+# Challenges that require opened rows append ``open_rows`` and use version 2.
+# Challenges without opened rows keep the version 1 encoding, so each
+# challenge still has exactly one encoding.
+CHALLENGE_ROWS_VERSION = 2
+
+TAG_GEMM_COMMITMENT = 1
+TAG_RECEIPT = 2
+TAG_CHALLENGE = 3
+TAG_VERIFICATION = 4
+TAG_WORKER = 5
+TAG_JOB = 6
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+_HEADER = struct.Struct("<BB")
+_U32 = struct.Struct("<I")
+_COMMITMENT = struct.Struct("<II32s")
+_GEMM_INDEX = struct.Struct("<II")
+_I64 = struct.Struct("<q")
+DIGEST_SIZE = 32
+
+
+class CodecError(ValueError):
+    pass
+
+
+def _range_checked(encoder: Callable) -> Callable:
+    """Report integers that do not fit their fixed-width field as CodecError."""
+
+    @functools.wraps(encoder)
+    def wrapper(value):
+        try:
+            return encoder(value)
+        except struct.error as exc:
+            raise CodecError(f"{type(value).__name__} has a field out of range: {exc}") from exc
+
+    return wrapper
+
+
+def _digest(value: str) -> bytes:
+    if not value:
+        raise CodecError("Expected a hex digest, got an empty string; empty commitments use chain.types.EMPTY_ROOT")
+    try:
+        raw = bytes.fromhex(value)
+    except ValueError as exc:
+        raise CodecError(f"Expected a hex digest, got {value!r}") from exc
+    if len(raw) != DIGEST_SIZE:
+        raise CodecError(f"Expected a 32-byte digest, got {len(raw)} bytes")
+    return raw
+
+
+def _pack_str(value: str) -> bytes:
+    raw = value.encode("utf-8")
+    return _U32.pack(len(raw)) + raw
+
+
+def _pack_gemm_indices(indices: List[Tuple[int, int]]) -> bytes:
+    return _U32.pack(len(indices)) + b"".join(_GEMM_INDEX.pack(layer, gemm) for layer, gemm in indices)
+
+
+def _pack_digests(values: List[str]) -> bytes:
+    return _U32.pack(len(values)) + b"".join(_digest(value) for value in values)
+
+
+class _Reader:
+    def __init__(self, data: Buffer, tag: int, versions: Tuple[int, ...] = (CODEC_VERSION,)) -> None:
+        self.view = memoryview(data).cast("B")
+        self.offset = 0
+        version, found = self.unpack(_HEADER)
+        if version not in versions:
+            raise CodecError(f"Unsupported codec version: {version}")
+        if found != tag:
+            raise CodecError(f"Expected type tag {tag}, got {found}")
+        self.version = version
+
+    def unpack(self, layout: struct.Struct) -> tuple:
+        try:
+            values = layout.unpack_from(self.view, self.offset)
+        except struct.error as exc:
+            raise CodecError("Truncated message") from exc
+        self.offset += layout.size
+        return values
+
+    def take(self, size: int) -> memoryview:
+        if self.offset + size > len(self.view):
+            raise CodecError("Truncated message")
+        chunk = self.view[self.offset : self.offset + size]
+        self.offset += size
+        return chunk
+
+    def string(self) -> str:
+        (length,) = self.unpack(_U32)
+        return str(self.take(length), "utf-8")
+
+    def digest(self) -> str:
+        return self.take(DIGEST_SIZE).hex()
+
+    def gemm_indices(self) -> List[Tuple[int, int]]:
+        (count,) = self.unpack(_U32)
+        return [self.unpack(_GEMM_INDEX) for _ in range(count)]
+
+    def digests(self) -> List[str]:
+        (count,) = self.unpack(_U32)
+        return [self.digest() for _ in range(count)]
+
+    def int64(self) -> int:
+        return self.unpack(_I64)[0]
+
+    def strings(self) -> List[str]:
+        (count,) = self.unpack(_U32)
+        return [self.string() for _ in range(count)]
+
+    def finish(self) -> None:
+        if self.offset != len(self.view):
+            raise CodecError("Trailing bytes after message")
+
+
+@_range_checked
+def encode_gemm_commitment(commitment: GemmCommitment) -> bytes:
+    return _HEADER.pack(CODEC_VERSION, TAG_GEMM_COMMITMENT) + _COMMITMENT.pack(
+        commitment.layer_index, commitment.gemm_index, _digest(commitment.merkle_root)
+    )
+
+
+def decode_gemm_commitment(data: Buffer) -> GemmCommitment:
+    reader = _Reader(data, TAG_GEMM_COMMITMENT)
+    layer_index, gemm_index, root = reader.unpack(_COMMITMENT)
+    reader.finish()
+    return GemmCommitment(layer_index=layer_index, gemm_index=gemm_index, merkle_root=root.hex())
+
+
+@_range_checked
+def encode_receipt(receipt: Receipt) -> bytes:
+    pack = _COMMITMENT.pack
+    return b"".join(
+        [
+            _HEADER.pack(CODEC_VERSION, TAG_RECEIPT),
+            _pack_str(receipt.worker_pubkey),
+            _pack_str(receipt.job_id),
+            _pack_str(receipt.shard_id),
+            _pack_str(receipt.sku_id),
+            _digest(receipt.output_root),
+            _U32.pack(len(receipt.gemm_commitments)),
+            b"".join(
+                pack(item.layer_index, item.gemm_index, _digest(item.merkle_root)) for item in receipt.gemm_commitments
+            ),
+        ]
+    )
+
+
+class ReceiptView:
+    """Zero-copy view over an encoded receipt.
+
+    Header fields are decoded eagerly; GEMM commitments are fixed-size records
+    read on demand, so large receipts can be inspected without materializing
+    every commitment.
+    """
+
+    def __init__(self, data: Buffer) -> None:
+        reader = _Reader(data, TAG_RECEIPT)
+        self.worker_pubkey = reader.string()
+        self.job_id = reader.string()
+        self.shard_id = reader.string()
+        self.sku_id = reader.string()
+        self.output_root_bytes = reader.take(DIGEST_SIZE)
+        (self.commitment_count,) = reader.unpack(_U32)
+        self._commitments = reader.take(self.commitment_count * _COMMITMENT.size)
+        reader.finish()
+
+    @property
+    def output_root(self) -> str:
+        return self.output_root_bytes.hex()
+
+    def commitment_root_bytes(self, index: int) -> memoryview:
+        if not 0 <= index < self.commitment_count:
+            raise IndexError(index)
+        offset = index * _COMMITMENT.size + _GEMM_INDEX.size
+        return self._commitments[offset : offset + DIGEST_SIZE]
+
+    def commitment(self, index: int) -> GemmCommitment:
+        if not 0 <= index < self.commitment_count:
+            raise IndexError(index)
+        layer_index, gemm_index, root = _COMMITMENT.unpack_from(self._commitments, index * _COMMITMENT.size)
+        return GemmCommitment(layer_index=layer_index, gemm_index=gemm_index, merkle_root=root.hex())
+
+    def to_receipt(self) -> Receipt:
+        commitments = [
+            GemmCommitment(layer_index=layer_index, gemm_index=gemm_index, merkle_root=root.hex())
+            for layer_index, gemm_index, root in _COMMITMENT.iter_unpack(self._commitments)
+        ]
+        return Receipt(
+            worker_pubkey=self.worker_pubkey,
+            job_id=self.job_id,
+            shard_id=self.shard_id,
+            sku_id=self.sku_id,
+            output_root=self.output_root,
+            gemm_commitments=commitments,
+        )
+
+
+def decode_receipt(data: Buffer) -> Receipt:
+    return ReceiptView(data).to_receipt()
+
+
+@_range_checked
+def encode_challenge(challenge: Challenge) -> bytes:
+    version = CHALLENGE_ROWS_VERSION if challenge.open_rows else CODEC_VERSION
+    return b"".join(
+        [
+            _HEADER.pack(version, TAG_CHALLENGE),
+            _digest(challenge.receipt_id),
+            _pack_str(challenge.verifier_pubkey),
+            _pack_gemm_indices(challenge.gemm_indices),
+            _pack_digests(challenge.random_vectors),
+            _U32.pack(challenge.open_rows) if challenge.open_rows else b"",
+        ]
+    )
+
+
+def decode_challenge(data: Buffer) -> Challenge:
+    reader = _Reader(data, TAG_CHALLENGE, versions=(CODEC_VERSION, CHALLENGE_ROWS_VERSION))
+    receipt_id = reader.digest()
+    verifier_pubkey = reader.string()
+    gemm_indices = reader.gemm_indices()
+    random_vectors = reader.digests()
+    open_rows = 0
+    if reader.version == CHALLENGE_ROWS_VERSION:
+        (open_rows,) = reader.unpack(_U32)
+        if open_rows == 0:
+            raise CodecError("Version 2 challenges must open at least one row")
+    reader.finish()
+    return Challenge(
+        receipt_id=receipt_id,
+        verifier_pubkey=verifier_pubkey,
+        gemm_indices=gemm_indices,
+        random_vectors=random_vectors,
+        open_rows=open_rows,
+    )
+
+
+@_range_checked
+def encode_verification(verification: Verification) -> bytes:
+    return b"".join(
+        [
+            _HEADER.pack(CODEC_VERSION, TAG_VERIFICATION),
+            _digest(verification.receipt_id),
+            _pack_str(verification.verifier_pubkey),
+            _pack_gemm_indices(verification.gemm_indices),
+            _pack_digests(verification.random_vectors),
+            b"\x01" if verification.verdict else b"\x00",
+        ]
+    )
+
+
+def decode_verification(data: Buffer) -> Verification:
+    reader = _Reader(data, TAG_VERIFICATION)
+    receipt_id = reader.digest()
+    verifier_pubkey = reader.string()
+    gemm_indices = reader.gemm_indices()
+    random_vectors = reader.digests()
+    (verdict,) = reader.take(1)
+    reader.finish()
+    if verdict not in (0, 1):
+        raise CodecError(f"Invalid verdict byte: {verdict}")
+    return Verification(
+        receipt_id=receipt_id,
+        verifier_pubkey=verifier_pubkey,
+        gemm_indices=gemm_indices,
+        random_vectors=random_vectors,
+        verdict=bool(verdict),
+    )
+
+
+@_range_checked
+def encode_worker(worker: Worker) -> bytes:
+    return b"".join(
+        [
+            _HEADER.pack(CODEC_VERSION, TAG_WORKER),
+            _pack_str(worker.pubkey),
+            _I64.pack(worker.stake),
+            _U32.pack(len(worker.supported_skus)),
+            b"".join(_pack_str(sku) for sku in worker.supported_skus),
+            _I64.pack(worker.reputation_score),
+        ]
+    )
+
+
+def decode_worker(data: Buffer) -> Worker:
+    reader = _Reader(data, TAG_WORKER)
+    worker = Worker(
+        pubkey=reader.string(),
+        stake=reader.int64(),
+        supported_skus=reader.strings(),
+        reputation_score=reader.int64(),
+    )
+    reader.finish()
+    return worker
+
+
+@_range_checked
+def encode_job(job: Job) -> bytes:
+    return b"".join(
+        [
+            _HEADER.pack(CODEC_VERSION, TAG_JOB),
+            _pack_str(job.job_id),
+            _pack_str(job.sku_id),
+            _pack_str(job.input_root),
+            _I64.pack(job.shard_size),
+            _I64.pack(job.payment),
+        ]
+    )
+
+
+def decode_job(data: Buffer) -> Job:
+    reader = _Reader(data, TAG_JOB)
+    job = Job(
+        job_id=reader.string(),
+        sku_id=reader.string(),
+        input_root=reader.string(),
+        shard_size=reader.int64(),
+        payment=reader.int64(),
+    )
+    reader.finish()
+    return job
+
+
+_ENCODERS: Dict[type, Callable] = {
+    GemmCommitment: encode_gemm_commitment,
+    Receipt: encode_receipt,
+    Challenge: encode_challenge,
+    Verification: encode_verification,
+    Worker: encode_worker,
+    Job: encode_job,
+}
+
+_DECODERS: Dict[int, Callable] = {
+    TAG_GEMM_COMMITMENT: decode_gemm_commitment,
+    TAG_RECEIPT: decode_receipt,
+    TAG_CHALLENGE: decode_challenge,
+    TAG_VERIFICATION: decode_verification,
+    TAG_WORKER: decode_worker,
+    TAG_JOB: decode_job,
+}
+
+
+def encode(value) -> bytes:
+    encoder = _ENCODERS.get(type(value))
+    if encoder is None:
+        raise CodecError(f"No encoding for {type(value).__name__}")
+    return encoder(value)
+
+
+def decode(data: Buffer):
+    view = memoryview(data).cast("B")
+    if len(view) < _HEADER.size:
+        raise CodecError("Truncated message")
+    _, tag = _HEADER.unpack_from(view)
+    decoder = _DECODERS.get(tag)
+    if decoder is None:
+        raise CodecError(f"Unknown type tag: {tag}")
+    return decoder(view)
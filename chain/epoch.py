@@ -0,0 +1,244 @@
+import struct
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
+
+from .codec import Buffer, CodecError
+from .types import Worker
+
+
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_LEDGER_VERSION = 1
+# v2 appends the receipts pending settlement; written only when there are any.
+_LEDGER_PENDING_VERSION = 2
+_RESULT_VERSION = 1
+_INITIAL_CAPACITY = 64
+
+
+@dataclass(frozen=True)
+class EpochConfig:
+    inflation: int = 0
+
+
+@dataclass(frozen=True)
+class EpochResult:
+    """State delta produced by settling one epoch.
+
+    Rows are aligned across ``pubkeys``, ``credits``, ``rewards``, ``stakes``
+    and ``reputation_scores``; only workers with activity in the epoch appear.
+    """
+
+    epoch: int
+    pool: int
+    pubkeys: List[str]
+    credits: List[int]
+    rewards: List[int]
+    stakes: List[int]
+    reputation_scores: List[int]
+    slashed: List[bool]
+
+
+def _pack_str(value: str) -> bytes:
+    raw = value.encode("utf-8")
+    return _U32.pack(len(raw)) + raw
+
+
+def _read_str(view: memoryview, offset: int):
+    (length,) = _U32.unpack_from(view, offset)
+    start = offset + _U32.size
+    return str(view[start : start + length], "utf-8"), start + length
+
+
+def _largest_remainder(pool: int, credits: np.ndarray, order: np.ndarray) -> List[int]:
+    """Split ``pool`` pro rata to ``credits`` exactly, deterministically.
+
+    Every worker gets ``floor(pool * c / total)``. The units left over go one
+    each to the largest fractional remainders, with ties broken by ``order``.
+    """
+    total = int(credits.sum())
+    if pool <= 0 or total <= 0:
+        return [0] * len(credits)
+    if pool * int(credits.max()) < (1 << 63):
+        scaled = credits * np.int64(pool)
+        shares = scaled // total
+        remainders = scaled % total
+        leftover = pool - int(shares.sum())
+        shares[np.lexsort((order, -remainders))[:leftover]] += 1
+        return shares.tolist()
+    scaled = [int(value) * pool for value in credits]
+    shares = [value // total for value in scaled]
+    leftover = pool - sum(shares)
+    ranking = sorted(range(len(scaled)), key=lambda idx: (-(scaled[idx] % total), int(order[idx])))
+    for idx in ranking[:leftover]:
+        shares[idx] += 1
+    return shares
+
+
+class EpochLedger:
+    """Columnar per-worker accumulators for the current epoch.
+
+    Verifications only bump array slots; ``settle`` computes rewards and
+    slashes for every worker in one vectorized pass.
+    """
+
+    def __init__(self, epoch: int = 0) -> None:
+        self.epoch = epoch
+        self._index: Dict[str, int] = {}
+        self._pubkeys: List[str] = []
+        self._credits = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self._slashes = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self.fees = 0
+        # Receipts verified this epoch; they settle when it closes.
+        self.pending: Dict[str, None] = {}
+
+    def __len__(self) -> int:
+        return len(self._pubkeys)
+
+    def _slot(self, pubkey: str) -> int:
+        slot = self._index.get(pubkey)
+        if slot is None:
+            slot = len(self._pubkeys)
+            if slot == len(self._credits):
+                self._credits = np.concatenate([self._credits, np.zeros_like(self._credits)])
+                self._slashes = np.concatenate([self._slashes, np.zeros_like(self._slashes)])
+            self._index[pubkey] = slot
+            self._pubkeys.append(pubkey)
+        return slot
+
+    def record_success(self, pubkey: str, credits: int, fee: int, receipt_id: Optional[str] = None) -> None:
+        self._credits[self._slot(pubkey)] += credits
+        self.fees += fee
+        if receipt_id is not None:
+            self.pending[receipt_id] = None
+
+    def record_failure(self, pubkey: str, receipt_id: Optional[str] = None) -> None:
+        self._slashes[self._slot(pubkey)] += 1
+        if receipt_id is not None:
+            self.pending[receipt_id] = None
+
+    def settle(self, workers: Mapping[str, Worker], inflation: int) -> EpochResult:
+        count = len(self._pubkeys)
+        credits = self._credits[:count]
+        slashes = self._slashes[:count]
+        order = np.argsort(np.array(self._pubkeys, dtype=object)).argsort() if count else np.zeros(0, dtype=np.int64)
+        pool = inflation + self.fees
+        rewards = _largest_remainder(pool, credits, order)
+
+        stakes = np.array([workers[key].stake if key in workers else 0 for key in self._pubkeys], dtype=np.int64)
+        reputations = np.array(
+            [workers[key].reputation_score if key in workers else 0 for key in self._pubkeys], dtype=np.int64
+        )
+        # Slashes compound: each failure removes a tenth of the remaining stake
+        # (at least 1), exactly as repeated immediate slashing would.
+        remaining = slashes.copy()
+        while remaining.any():
+            active = remaining > 0
+            cut = np.maximum(stakes // 10, 1)
+            stakes = np.where(active, np.maximum(stakes - cut, 0), stakes)
+            remaining = remaining - active
+        reputations = np.where(slashes > 0, np.maximum(reputations - slashes, 0), reputations)
+
+        return EpochResult(
+            epoch=self.epoch,
+            pool=pool,
+            pubkeys=list(self._pubkeys),
+            credits=credits.tolist(),
+            rewards=rewards,
+            stakes=stakes.tolist(),
+            reputation_scores=reputations.tolist(),
+            slashed=(slashes > 0).tolist(),
+        )
+
+    def reset(self, epoch: int) -> None:
+        self.__init__(epoch)
+
+    def encode(self) -> bytes:
+        count = len(self._pubkeys)
+        pending = (
+            [_U32.pack(len(self.pending)), b"".join(_pack_str(receipt_id) for receipt_id in self.pending)]
+            if self.pending
+            else []
+        )
+        return b"".join(
+            [
+                bytes([_LEDGER_PENDING_VERSION if self.pending else _LEDGER_VERSION]),
+                _I64.pack(self.epoch),
+                _I64.pack(self.fees),
+                _U32.pack(count),
+                b"".join(_pack_str(key) for key in self._pubkeys),
+                self._credits[:count].astype("<i8").tobytes(),
+                self._slashes[:count].astype("<i8").tobytes(),
+                *pending,
+            ]
+        )
+
+    @classmethod
+    def decode(cls, data: Buffer) -> "EpochLedger":
+        view = memoryview(data).cast("B")
+        if not view or view[0] not in (_LEDGER_VERSION, _LEDGER_PENDING_VERSION):
+            raise CodecError("Unsupported epoch ledger encoding")
+        (epoch,) = _I64.unpack_from(view, 1)
+        ledger = cls(epoch)
+        (ledger.fees,) = _I64.unpack_from(view, 9)
+        (count,) = _U32.unpack_from(view, 17)
+        offset = 21
+        for _ in range(count):
+            pubkey, offset = _read_str(view, offset)
+            ledger._slot(pubkey)
+        ledger._credits[:count] = np.frombuffer(view, dtype="<i8", count=count, offset=offset)
+        ledger._slashes[:count] = np.frombuffer(view, dtype="<i8", count=count, offset=offset + 8 * count)
+        if view[0] == _LEDGER_PENDING_VERSION:
+            offset += 16 * count
+            (pending,) = _U32.unpack_from(view, offset)
+            offset += 4
+            for _ in range(pending):
+                receipt_id, offset = _read_str(view, offset)
+                ledger.pending[receipt_id] = None
+        return ledger
+
+
+def encode_epoch_result(result: EpochResult) -> bytes:
+    count = len(result.pubkeys)
+    columns = [result.credits, result.rewards, result.stakes, result.reputation_scores]
+    return b"".join(
+        [
+            bytes([_RESULT_VERSION]),
+            _I64.pack(result.epoch),
+            _I64.pack(result.pool),
+            _U32.pack(count),
+            b"".join(_pack_str(key) for key in result.pubkeys),
+            b"".join(np.asarray(column, dtype="<i8").tobytes() for column in columns),
+            np.asarray(result.slashed, dtype=np.uint8).tobytes(),
+        ]
+    )
+
+
+def decode_epoch_result(data: Buffer) -> EpochResult:
+    view = memoryview(data).cast("B")
+    if not view or view[0] != _RESULT_VERSION:
+        raise CodecError("Unsupported epoch result encoding")
+    (epoch,) = _I64.unpack_from(view, 1)
+    (pool,) = _I64.unpack_from(view, 9)
+    (count,) = _U32.unpack_from(view, 17)
+    offset = 21
+    pubkeys = []
+    for _ in range(count):
+        pubkey, offset = _read_str(view, offset)
+        pubkeys.append(pubkey)
+    columns = []
+    for _ in range(4):
+        columns.append(np.frombuffer(view, dtype="<i8", count=count, offset=offset).tolist())
+        offset += 8 * count
+    slashed = np.frombuffer(view, dtype=np.uint8, count=count, offset=offset).astype(bool).tolist()
+    return EpochResult(
+        epoch=epoch,
+        pool=pool,
+        pubkeys=pubkeys,
+        credits=columns[0],
+        rewards=columns[1],
+        stakes=columns[2],
+        reputation_scores=columns[3],
+        slashed=slashed,
+    )
@@ -0,0 +1,231 @@
+import hashlib
+import struct
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Mapping, Optional, Tuple
+
+from .codec import CodecError
+from .randomness import select_gemm_indices
+from .types import GemmCommitment, Receipt, Worker
+
+
+# GEMM positions within a layer (spec/deterministic_inference.md): 0 = X @ Wqkv,
+# 1 = A @ V, 2 = X @ W1, 3 = Z @ W2.
+MLP_GEMMS = frozenset({2, 3})
+
+_U32 = struct.Struct("<I")
+
+
+@dataclass(frozen=True)
+class ChallengeDecision:
+    """What to check for one receipt.
+
+    ``expected_cost`` is the expected verifier work, in Freivalds rounds over
+    one GEMM.
+    """
+
+    tier: str
+    rounds: int
+    gemm_indices: List[Tuple[int, int]]
+    open_rows: int
+    expected_cost: float
+
+
+@dataclass(frozen=True)
+class PolicyTier:
+    """Challenge parameters for one trust level.
+
+    Every challenge samples ``mlp_samples`` MLP GEMMs. With probability
+    ``attention_probability`` it also samples ``attention_samples`` attention
+    GEMMs.
+    """
+
+    rounds: int
+    mlp_samples: int
+    attention_samples: int
+    attention_probability: float
+    open_rows: int
+
+
+class ChallengePolicy:
+    """Chooses rounds, sampled GEMMs and opened rows for a receipt.
+
+    ``decide`` must be a pure function of its arguments and of the
+    verifications passed to ``observe``. ``Chain`` feeds it every applied
+    verification, including those replayed from the log. A policy that keeps
+    state from ``observe`` returns it from ``encode_state``; ``Chain`` stores
+    it in each snapshot and hands it back to ``restore_state`` before
+    replaying the log after that snapshot.
+    """
+
+    def decide(self, receipt: Receipt, worker: Optional[Worker], seed: str) -> ChallengeDecision:
+        raise NotImplementedError
+
+    def observe(self, worker_pubkey: str, verdict: bool) -> None:
+        return None
+
+    def encode_state(self) -> bytes:
+        return b""
+
+    def restore_state(self, data: bytes) -> None:
+        return None
+
+
+class FixedPolicy(ChallengePolicy):
+    """The same rounds and number of uniformly sampled GEMMs for every receipt."""
+
+    def __init__(self, rounds: int = 20, sample_count: int = 2, open_rows: int = 0, row_cost: float = 0.5) -> None:
+        self.rounds = rounds
+        self.sample_count = sample_count
+        self.open_rows = open_rows
+        self.row_cost = row_cost
+
+    def decide(self, receipt: Receipt, worker: Optional[Worker], seed: str) -> ChallengeDecision:
+        commitments = receipt.gemm_commitments
+        positions = select_gemm_indices(seed, len(commitments), self.sample_count)
+        return ChallengeDecision(
+            tier="fixed",
+            rounds=self.rounds,
+            gemm_indices=_gemm_indices(commitments, positions),
+            open_rows=self.open_rows,
+            expected_cost=len(positions) * (self.rounds + self.row_cost * self.open_rows),
+        )
+
+
+PROBATION = "probation"
+STANDARD = "standard"
+TRUSTED = "trusted"
+
+DEFAULT_TIERS: Dict[str, PolicyTier] = {
+    PROBATION: PolicyTier(rounds=40, mlp_samples=4, attention_samples=2, attention_probability=1.0, open_rows=8),
+    STANDARD: PolicyTier(rounds=20, mlp_samples=2, attention_samples=1, attention_probability=0.5, open_rows=2),
+    TRUSTED: PolicyTier(rounds=10, mlp_samples=1, attention_samples=1, attention_probability=0.1, open_rows=0),
+}
+
+
+class AdaptivePolicy(ChallengePolicy):
+    """Scales checking with worker trust (PRD §9).
+
+    A worker is on ``probation`` if it failed any of its last
+    ``failure_window`` verifications or has less than ``min_stake`` at stake.
+    It is ``trusted`` if it has at least ``trusted_reputation`` reputation and
+    ``trusted_stake`` stake. Every other worker is ``standard``. MLP GEMMs are
+    sampled in every challenge. Attention GEMMs are sampled only in some, as a
+    deterministic function of the challenge seed. SKUs may raise the minimum
+    number of rounds (``sku_rounds``) and weight the expected cost
+    (``sku_cost``, default 1.0).
+
+    Recent verdicts are part of the policy state carried in chain snapshots,
+    so a restarted node makes the same decisions as one that never stopped.
+    """
+
+    def __init__(
+        self,
+        tiers: Optional[Mapping[str, PolicyTier]] = None,
+        trusted_reputation: int = 10,
+        trusted_stake: int = 1000,
+        min_stake: int = 1,
+        failure_window: int = 32,
+        sku_rounds: Optional[Mapping[str, int]] = None,
+        sku_cost: Optional[Mapping[str, float]] = None,
+        row_cost: float = 0.5,
+    ) -> None:
+        self.tiers = dict(DEFAULT_TIERS if tiers is None else tiers)
+        missing = {PROBATION, STANDARD, TRUSTED} - set(self.tiers)
+        if missing:
+            raise ValueError(f"Missing policy tiers: {', '.join(sorted(missing))}")
+        self.trusted_reputation = trusted_reputation
+        self.trusted_stake = trusted_stake
+        self.min_stake = min_stake
+        self.failure_window = failure_window
+        self.sku_rounds = dict(sku_rounds or {})
+        self.sku_cost = dict(sku_cost or {})
+        self.row_cost = row_cost
+        self._history: Dict[str, Deque[bool]] = {}
+
+    def observe(self, worker_pubkey: str, verdict: bool) -> None:
+        history = self._history.get(worker_pubkey)
+        if history is None:
+            history = self._history[worker_pubkey] = deque(maxlen=self.failure_window)
+        history.append(verdict)
+
+    def encode_state(self) -> bytes:
+        parts = [_U32.pack(len(self._history))]
+        for pubkey in sorted(self._history):
+            raw = pubkey.encode("utf-8")
+            verdicts = bytes(int(verdict) for verdict in self._history[pubkey])
+            parts += [_U32.pack(len(raw)), raw, _U32.pack(len(verdicts)), verdicts]
+        return b"".join(parts)
+
+    def restore_state(self, data: bytes) -> None:
+        self._history = {}
+        if not data:
+            return
+        view = memoryview(data)
+        try:
+            (count,) = _U32.unpack_from(view, 0)
+            offset = _U32.size
+            for _ in range(count):
+                (length,) = _U32.unpack_from(view, offset)
+                pubkey = str(view[offset + _U32.size : offset + _U32.size + length], "utf-8")
+                offset += _U32.size + length
+                (length,) = _U32.unpack_from(view, offset)
+                verdicts = view[offset + _U32.size : offset + _U32.size + length]
+                offset += _U32.size + length
+                for verdict in verdicts:
+                    self.observe(pubkey, bool(verdict))
+        except (struct.error, UnicodeDecodeError) as exc:
+            raise CodecError("Truncated policy state") from exc
+        if offset != len(view):
+            raise CodecError("Trailing bytes after policy state")
+
+    def recent_failures(self, worker_pubkey: str) -> int:
+        return sum(1 for verdict in self._history.get(worker_pubkey, ()) if not verdict)
+
+    def tier_for(self, worker: Optional[Worker]) -> str:
+        if worker is None or worker.stake < self.min_stake or self.recent_failures(worker.pubkey):
+            return PROBATION
+        if worker.reputation_score >= self.trusted_reputation and worker.stake >= self.trusted_stake:
+            return TRUSTED
+        return STANDARD
+
+    def decide(self, receipt: Receipt, worker: Optional[Worker], seed: str) -> ChallengeDecision:
+        tier_name = self.tier_for(worker)
+        tier = self.tiers[tier_name]
+        rounds = max(tier.rounds, self.sku_rounds.get(receipt.sku_id, 0))
+        commitments = receipt.gemm_commitments
+        mlp = [pos for pos, item in enumerate(commitments) if item.gemm_index in MLP_GEMMS]
+        attention = [pos for pos, item in enumerate(commitments) if item.gemm_index not in MLP_GEMMS]
+
+        # Receipts with too few MLP GEMMs make up the difference from attention.
+        mlp_count = min(tier.mlp_samples, len(mlp))
+        shortfall = tier.mlp_samples - mlp_count
+        include_attention = _draw(f"{seed}:include-attention") < tier.attention_probability
+        attention_count = min(shortfall + (tier.attention_samples if include_attention else 0), len(attention))
+        positions = [mlp[idx] for idx in select_gemm_indices(f"{seed}:mlp", len(mlp), mlp_count)]
+        picked = select_gemm_indices(f"{seed}:attention", len(attention), attention_count)
+        positions += [attention[idx] for idx in picked]
+
+        chance = tier.attention_probability
+        expected_gemms = (
+            mlp_count
+            + (1 - chance) * min(shortfall, len(attention))
+            + chance * min(shortfall + tier.attention_samples, len(attention))
+        )
+        cost = expected_gemms * (rounds + self.row_cost * tier.open_rows) * self.sku_cost.get(receipt.sku_id, 1.0)
+        return ChallengeDecision(
+            tier=tier_name,
+            rounds=rounds,
+            gemm_indices=_gemm_indices(commitments, sorted(positions)),
+            open_rows=tier.open_rows,
+            expected_cost=cost,
+        )
+
+
+def _draw(seed: str) -> float:
+    """Uniform float in [0, 1) derived from ``seed``."""
+    return int.from_bytes(hashlib.sha256(seed.encode("utf-8")).digest()[:8], "big") / float(1 << 64)
+
+
+def _gemm_indices(commitments: List[GemmCommitment], positions: List[int]) -> List[Tuple[int, int]]:
+    return [(commitments[pos].layer_index, commitments[pos].gemm_index) for pos in positions]
@@ -1,5 +1,17 @@
 import hashlib
-from typing import List
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+# Challenge vectors live in the Freivalds field P = 2^61 - 1
+# (spec/deterministic_inference.md).
+FIELD_MODULUS = (1 << 61) - 1
+_FIELD_MASK = np.uint64(FIELD_MODULUS)
+_ELEMENT_BYTES = 8
+# Extra elements drawn per vector to absorb rejected samples without a second
+# XOF call in all but astronomically rare cases.
+_REJECTION_SLACK = 4
 
 
 def derive_random_vectors(seed: str, count: int) -> List[str]:
@@ -10,17 +22,62 @@ def derive_random_vectors(seed: str, count: int) -> List[str]:
     return vectors
 
 
+def expand_field_vector(seed: str, length: int) -> np.ndarray:
+    """Expand ``seed`` into ``length`` uniform elements of [0, P) as uint64.
+
+    The seed keys a SHAKE-256 stream. Each element is the next 8 bytes read
+    little-endian and masked to 61 bits. The one value equal to P is rejected,
+    so elements are uniform over the field.
+    """
+    if length <= 0:
+        return np.zeros(0, dtype=np.uint64)
+    xof = hashlib.shake_256(b"field:" + seed.encode("utf-8"))
+    drawn = length + _REJECTION_SLACK
+    while True:
+        raw = np.frombuffer(xof.digest(drawn * _ELEMENT_BYTES), dtype="<u8") & _FIELD_MASK
+        values = raw[raw != _FIELD_MASK]
+        if len(values) >= length:
+            return values[:length].astype(np.uint64)
+        drawn *= 2
+
+
+def expand_field_vectors(seeds: Sequence[str], length: int) -> np.ndarray:
+    """Expand each per-round seed (e.g. ``Challenge.random_vectors``) into a ``(k, length)`` array."""
+    out = np.empty((len(seeds), max(length, 0)), dtype=np.uint64)
+    for idx, seed in enumerate(seeds):
+        out[idx] = expand_field_vector(seed, length)
+    return out
+
+
+def derive_field_vectors(seed: str, count: int, length: int) -> np.ndarray:
+    return expand_field_vectors(derive_random_vectors(seed, count), length)
+
+
+def select_spot_rows(receipt_id: str, layer_index: int, gemm_index: int, total_rows: int, count: int) -> List[int]:
+    """The ``min(count, total_rows)`` output rows a challenged GEMM must open, sorted.
+
+    Derived from the receipt and GEMM alone, so the worker and the verifier
+    agree on them without another round trip.
+    """
+    return sorted(select_gemm_indices(f"{receipt_id}:{layer_index}:{gemm_index}:rows", total_rows, count))
+
+
 def select_gemm_indices(seed: str, total_gemms: int, count: int) -> List[int]:
-    if total_gemms <= 0:
+    """Sample ``min(count, total_gemms)`` distinct indices in O(count).
+
+    A sparse Fisher-Yates shuffle: only the swapped positions are tracked, so
+    neither time nor memory depends on ``total_gemms``.
+    """
+    count = min(count, total_gemms)
+    if count <= 0:
         return []
+    swapped: Dict[int, int] = {}
     indices = []
     digest = seed.encode("utf-8")
-    cursor = 0
-    while len(indices) < count:
+    for position in range(count):
         digest = hashlib.sha256(digest).digest()
         value = int.from_bytes(digest[:8], "little")
-        idx = value % total_gemms
-        if idx not in indices:
-            indices.append(idx)
-        cursor += 1
+        pick = position + value % (total_gemms - position)
+        indices.append(swapped.get(pick, pick))
+        swapped[pick] = swapped.get(position, position)
     return indices
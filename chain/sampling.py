@@ -0,0 +1,117 @@
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class WeightedSampler:
+    """Integer-weighted sampling over keys backed by a Fenwick tree.
+
+    ``update`` and ``sample`` cost O(log n). Keys keep their slot when their
+    weight drops to zero, so slashing or unstaking never triggers a rebuild;
+    capacity doubles as keys are added.
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, int]] = ()) -> None:
+        self._slots: Dict[str, int] = {}
+        self._keys: List[str] = []
+        self._weights: List[int] = []
+        self._tree: List[int] = [0]
+        self.total = 0
+        for key, weight in items:
+            self._add_key(key, weight)
+        self._rebuild(max(len(self._keys), 1))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._slots
+
+    def weight(self, key: str) -> int:
+        slot = self._slots.get(key)
+        return 0 if slot is None else self._weights[slot]
+
+    def _add_key(self, key: str, weight: int) -> int:
+        if weight < 0:
+            raise ValueError("Sampler weights must be non-negative")
+        slot = len(self._keys)
+        self._slots[key] = slot
+        self._keys.append(key)
+        self._weights.append(weight)
+        self.total += weight
+        return slot
+
+    def _rebuild(self, capacity: int) -> None:
+        tree = [0] * (capacity + 1)
+        for slot, weight in enumerate(self._weights):
+            tree[slot + 1] += weight
+        for index in range(1, capacity + 1):
+            parent = index + (index & -index)
+            if parent <= capacity:
+                tree[parent] += tree[index]
+        self._tree = tree
+
+    def _add(self, slot: int, delta: int) -> None:
+        index = slot + 1
+        tree = self._tree
+        while index < len(tree):
+            tree[index] += delta
+            index += index & -index
+
+    def _prefix(self, slot: int) -> int:
+        """Sum of weights in slots ``[0, slot)``."""
+        total = 0
+        index = slot
+        while index > 0:
+            total += self._tree[index]
+            index -= index & -index
+        return total
+
+    def update(self, key: str, weight: int) -> None:
+        if weight < 0:
+            raise ValueError("Sampler weights must be non-negative")
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._add_key(key, 0)
+            if len(self._keys) >= len(self._tree):
+                self._rebuild(2 * (len(self._tree) - 1))
+        delta = weight - self._weights[slot]
+        if delta:
+            self._weights[slot] = weight
+            self.total += delta
+            self._add(slot, delta)
+
+    def remove(self, key: str) -> None:
+        if key in self._slots:
+            self.update(key, 0)
+
+    def find(self, value: int) -> str:
+        """Return the key whose cumulative weight interval contains ``value``."""
+        if not 0 <= value < self.total:
+            raise ValueError(f"Sample point {value} outside [0, {self.total})")
+        index = 0
+        step = 1 << ((len(self._tree) - 1).bit_length() - 1)
+        tree = self._tree
+        while step:
+            nxt = index + step
+            if nxt < len(tree) and tree[nxt] <= value:
+                index = nxt
+                value -= tree[nxt]
+            step >>= 1
+        return self._keys[index]
+
+    def sample(self, seed: str, exclude: Optional[str] = None) -> Optional[str]:
+        """Draw a key with probability proportional to its weight.
+
+        The draw is a deterministic function of ``seed``. ``exclude`` takes no
+        part in the draw, and the other keys keep their relative odds.
+        Returns None if no other key has positive weight.
+        """
+        excluded = self.weight(exclude) if exclude is not None else 0
+        total = self.total - excluded
+        if total <= 0:
+            return None
+        digest = hashlib.sha256(seed.encode("utf-8")).digest()
+        value = int.from_bytes(digest[:16], "little") % total
+        if excluded and value >= self._prefix(self._slots[exclude]):
+            value += excluded
+        return self.find(value)
@@ -0,0 +1,372 @@
+import mmap
+import os
+import re
+import struct
+import zlib
+from collections.abc import MutableMapping
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .codec import (
+    DIGEST_SIZE,
+    CodecError,
+    decode_challenge,
+    decode_job,
+    decode_receipt,
+    decode_verification,
+    decode_worker,
+    encode_challenge,
+    encode_job,
+    encode_receipt,
+    encode_verification,
+    encode_worker,
+)
+from .types import ChainState, RewardAccount
+
+
+# Operation log records: length:u32 crc32:u32 seq:u64 op:u8 payload.
+# The CRC covers seq, op and payload, so a torn tail write is detected and
+# dropped on recovery.
+OP_REGISTER_WORKER = 1
+OP_CREATE_JOB = 2
+OP_SUBMIT_RECEIPT = 3
+OP_ASSIGN_CHALLENGE = 4
+OP_SUBMIT_VERIFICATION = 5
+OP_CLOSE_EPOCH = 6
+
+_RECORD_HEADER = struct.Struct("<IIQ")
+_SNAPSHOT_MAGIC = b"CSNP"
+# v2 stores a list of extra sections (epoch ledger, policy state); v1 stored one.
+_SNAPSHOT_VERSION = 2
+_SNAPSHOT_VERSIONS = (1, 2)
+_SNAPSHOT_HEADER = struct.Struct("<4sBQ")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_ACCOUNT = struct.Struct("<qq")
+
+_LOG_NAME = re.compile(r"^log-(\d{16})\.bin$")
+_SNAPSHOT_NAME = re.compile(r"^snapshot-(\d{16})\.bin$")
+
+
+class StorageError(RuntimeError):
+    pass
+
+
+class SnapshotTable:
+    """Read-only table of codec records keyed by 32-byte digests.
+
+    Keys are stored sorted next to an offsets array, so lookups are a binary
+    search over the memory-mapped file and nothing is decoded up front.
+    """
+
+    def __init__(self, view: memoryview, offset: int) -> None:
+        (self.count,) = _U64.unpack_from(view, offset)
+        self._keys_offset = offset + _U64.size
+        self.keys = np.frombuffer(view, dtype=f"S{DIGEST_SIZE}", count=self.count, offset=self._keys_offset)
+        offsets_start = self._keys_offset + self.count * DIGEST_SIZE
+        self.offsets = np.frombuffer(view, dtype="<u8", count=self.count + 1, offset=offsets_start)
+        self._view = view
+        self._data = offsets_start + (self.count + 1) * _U64.size
+        self.end = self._data + int(self.offsets[-1])
+
+    def _key_at(self, index: int) -> bytes:
+        start = self._keys_offset + index * DIGEST_SIZE
+        return bytes(self._view[start : start + DIGEST_SIZE])
+
+    def find(self, key: bytes) -> Optional[memoryview]:
+        if not self.count:
+            return None
+        index = int(np.searchsorted(self.keys, np.bytes_(key)))
+        if index >= self.count or self._key_at(index) != key:
+            return None
+        start = self._data + int(self.offsets[index])
+        return self._view[start : self._data + int(self.offsets[index + 1])]
+
+    def iter_keys(self) -> Iterator[bytes]:
+        for index in range(self.count):
+            yield self._key_at(index)
+
+
+def _write_table(handle, records: List[Tuple[bytes, bytes]]) -> None:
+    records.sort(key=lambda item: item[0])
+    handle.write(_U64.pack(len(records)))
+    for key, _ in records:
+        handle.write(key)
+    offset = 0
+    handle.write(_U64.pack(0))
+    for _, payload in records:
+        offset += len(payload)
+        handle.write(_U64.pack(offset))
+    for _, payload in records:
+        handle.write(payload)
+
+
+class RecordMap(MutableMapping):
+    """Dict-like map from hex digests to chain objects.
+
+    Entries from the last snapshot are decoded lazily from the memory-mapped
+    table; entries written since then live in an in-memory overlay until the
+    next snapshot folds them in.
+    """
+
+    def __init__(self, table: Optional[SnapshotTable] = None, decoder: Optional[Callable] = None) -> None:
+        self._table = table
+        self._decoder = decoder
+        self._overlay: Dict[str, object] = {}
+        self._deleted: set = set()
+
+    def _from_table(self, key: str):
+        if self._table is None or key in self._deleted:
+            return None
+        try:
+            raw = self._table.find(bytes.fromhex(key))
+        except ValueError:
+            return None
+        return None if raw is None else self._decoder(raw)
+
+    def __getitem__(self, key: str):
+        if key in self._overlay:
+            return self._overlay[key]
+        value = self._from_table(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value) -> None:
+        self._overlay[key] = value
+        self._deleted.discard(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._overlay.pop(key, None)
+        self._deleted.add(key)
+
+    def __contains__(self, key) -> bool:
+        if key in self._overlay:
+            return True
+        if self._table is None or key in self._deleted:
+            return False
+        try:
+            return self._table.find(bytes.fromhex(key)) is not None
+        except (TypeError, ValueError):
+            return False
+
+    def __iter__(self) -> Iterator[str]:
+        if self._table is not None:
+            for raw in self._table.iter_keys():
+                key = raw.hex()
+                if key not in self._overlay and key not in self._deleted:
+                    yield key
+        yield from self._overlay
+
+    def raw_items(self, encoder: Callable[[object], bytes]) -> Iterator[Tuple[bytes, bytes]]:
+        """Yield ``(key, encoded)`` pairs, copying snapshot records without decoding them."""
+        if self._table is not None:
+            for raw in self._table.iter_keys():
+                key = raw.hex()
+                if key not in self._overlay and key not in self._deleted:
+                    yield raw, bytes(self._table.find(raw))
+        for key, value in self._overlay.items():
+            yield bytes.fromhex(key), encoder(value)
+
+    def __len__(self) -> int:
+        base = 0
+        if self._table is not None:
+            base = self._table.count - len(self._deleted) - sum(
+                1 for key in self._overlay if self._table.find(bytes.fromhex(key)) is not None
+            )
+        return base + len(self._overlay)
+
+
+def _table_records(mapping, encoder: Callable[[object], bytes]) -> List[Tuple[bytes, bytes]]:
+    if isinstance(mapping, RecordMap):
+        return list(mapping.raw_items(encoder))
+    return [(bytes.fromhex(key), encoder(value)) for key, value in mapping.items()]
+
+
+def _write_list(handle, payloads: List[bytes]) -> None:
+    handle.write(_U32.pack(len(payloads)))
+    for payload in payloads:
+        handle.write(_U32.pack(len(payload)))
+        handle.write(payload)
+
+
+def _read_list(view: memoryview, offset: int) -> Tuple[List[memoryview], int]:
+    (count,) = _U32.unpack_from(view, offset)
+    offset += _U32.size
+    items = []
+    for _ in range(count):
+        (length,) = _U32.unpack_from(view, offset)
+        offset += _U32.size
+        items.append(view[offset : offset + length])
+        offset += length
+    return items, offset
+
+
+def _encode_account(pubkey: str, account: RewardAccount) -> bytes:
+    raw = pubkey.encode("utf-8")
+    return _U32.pack(len(raw)) + raw + _ACCOUNT.pack(account.credits, account.balance)
+
+
+def _decode_account(data: memoryview) -> Tuple[str, RewardAccount]:
+    (length,) = _U32.unpack_from(data, 0)
+    pubkey = str(data[_U32.size : _U32.size + length], "utf-8")
+    credits, balance = _ACCOUNT.unpack_from(data, _U32.size + length)
+    return pubkey, RewardAccount(credits=credits, balance=balance)
+
+
+class ChainStore:
+    """Append-only, checksummed operation log plus periodic snapshots.
+
+    Layout of ``directory``:
+    - ``snapshot-<seq>.bin``: full state after the first ``seq`` operations.
+    - ``log-<seq>.bin``: operations starting at ``seq``.
+
+    ``load`` maps the newest snapshot and returns the log records after it;
+    ``write_snapshot`` writes a new snapshot atomically and starts a new log
+    segment, after which older files are removed.
+    """
+
+    def __init__(self, directory: str, snapshot_interval: int = 100_000, sync: bool = False) -> None:
+        self.directory = directory
+        self.snapshot_interval = snapshot_interval
+        self.sync = sync
+        self.seq = 0
+        self.snapshot_seq = 0
+        self._log = None
+        self._snapshot_map: Optional[mmap.mmap] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _files(self, pattern: "re.Pattern") -> List[Tuple[int, str]]:
+        found = []
+        for name in os.listdir(self.directory):
+            match = pattern.match(name)
+            if match:
+                found.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return sorted(found)
+
+    def load(self) -> Tuple[ChainState, List[bytes], List[Tuple[int, memoryview]]]:
+        """Return ``(state, extras, tail)`` where ``tail`` holds ``(op, payload)`` records to replay.
+
+        ``extras`` are the sections passed to the last ``write_snapshot``.
+        """
+        state = ChainState()
+        extras: List[bytes] = []
+        snapshots = self._files(_SNAPSHOT_NAME)
+        if snapshots:
+            self.snapshot_seq, path = snapshots[-1]
+            state, extras = self._read_snapshot(path)
+        self.seq = self.snapshot_seq
+
+        tail: List[Tuple[int, memoryview]] = []
+        for _, path in self._files(_LOG_NAME):
+            with open(path, "rb") as handle:
+                data = handle.read()
+            offset = 0
+            while offset + _RECORD_HEADER.size <= len(data):
+                length, checksum, seq = _RECORD_HEADER.unpack_from(data, offset)
+                body_start = offset + _RECORD_HEADER.size
+                body = memoryview(data)[body_start : body_start + length]
+                if len(body) != length or zlib.crc32(body, zlib.crc32(data[offset + 8 : body_start])) != checksum:
+                    break
+                if seq >= self.seq:
+                    if seq != self.seq:
+                        raise StorageError(f"Operation log gap: expected {self.seq}, found {seq}")
+                    tail.append((body[0], body[1:]))
+                    self.seq += 1
+                offset = body_start + length
+            if offset != len(data):
+                # Drop a torn final record so new appends start on a clean boundary.
+                with open(path, "r+b") as handle:
+                    handle.truncate(offset)
+        return state, extras, tail
+
+    def append(self, op: int, payload: bytes) -> None:
+        if self._log is None:
+            self._log = open(os.path.join(self.directory, f"log-{self.seq:016d}.bin"), "ab")
+        body = bytes([op]) + payload
+        seq_bytes = _U64.pack(self.seq)
+        checksum = zlib.crc32(body, zlib.crc32(seq_bytes))
+        self._log.write(_RECORD_HEADER.pack(len(body), checksum, self.seq) + body)
+        self._log.flush()
+        if self.sync:
+            os.fsync(self._log.fileno())
+        self.seq += 1
+
+    def snapshot_due(self) -> bool:
+        return self.seq - self.snapshot_seq >= self.snapshot_interval
+
+    def write_snapshot(self, state: ChainState, extras: Sequence[bytes] = ()) -> ChainState:
+        """Persist ``state`` and opaque ``extras`` sections; return a state backed by the new snapshot."""
+        path = os.path.join(self.directory, f"snapshot-{self.seq:016d}.bin")
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as handle:
+            handle.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, _SNAPSHOT_VERSION, self.seq))
+            _write_list(handle, [encode_worker(worker) for worker in state.workers.values()])
+            _write_list(handle, [encode_job(job) for job in state.jobs.values()])
+            _write_list(handle, [_encode_account(key, account) for key, account in state.accounts.items()])
+            _write_table(handle, _table_records(state.receipts, encode_receipt))
+            _write_table(handle, _table_records(state.challenges, encode_challenge))
+            _write_table(handle, _table_records(state.verifications, encode_verification))
+            _write_list(handle, list(extras))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        self.snapshot_seq = self.seq
+        # Every existing log segment starts below ``seq`` and is covered by the
+        # new snapshot; the next append opens a fresh segment.
+        for _, old in self._files(_SNAPSHOT_NAME) + self._files(_LOG_NAME):
+            if old != path:
+                os.remove(old)
+        state, _ = self._read_snapshot(path)
+        return state
+
+    def _read_snapshot(self, path: str) -> Tuple[ChainState, List[bytes]]:
+        with open(path, "rb") as handle:
+            self._snapshot_map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._snapshot_map)
+        magic, version, seq = _SNAPSHOT_HEADER.unpack_from(view, 0)
+        if magic != _SNAPSHOT_MAGIC or version not in _SNAPSHOT_VERSIONS:
+            raise StorageError(f"Unrecognized snapshot file: {path}")
+        offset = _SNAPSHOT_HEADER.size
+        state = ChainState()
+        try:
+            workers, offset = _read_list(view, offset)
+            for raw in workers:
+                worker = decode_worker(raw)
+                state.workers[worker.pubkey] = worker
+            jobs, offset = _read_list(view, offset)
+            for raw in jobs:
+                job = decode_job(raw)
+                state.jobs[job.job_id] = job
+            accounts, offset = _read_list(view, offset)
+            for raw in accounts:
+                pubkey, account = _decode_account(raw)
+                state.accounts[pubkey] = account
+            tables = []
+            for _ in range(3):
+                table = SnapshotTable(view, offset)
+                tables.append(table)
+                offset = table.end
+            if version == 1:
+                (extra_length,) = _U64.unpack_from(view, offset)
+                extras = [bytes(view[offset + _U64.size : offset + _U64.size + extra_length])]
+            else:
+                extras = [bytes(section) for section in _read_list(view, offset)[0]]
+        except (CodecError, struct.error, ValueError) as exc:
+            raise StorageError(f"Corrupt snapshot file: {path}") from exc
+        state.receipts = RecordMap(tables[0], decode_receipt)
+        state.challenges = RecordMap(tables[1], decode_challenge)
+        state.verifications = RecordMap(tables[2], decode_verification)
+        return state, extras
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._log = None
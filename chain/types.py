@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import hashlib
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Tuple
 
 
+# Canonical root of a commitment over zero rows (spec/commitments.md).
+EMPTY_ROOT = hashlib.sha256(b"").hexdigest()
+
+
 @dataclass(frozen=True)
 class Worker:
     pubkey: str
@@ -44,6 +49,8 @@ class Challenge:
     verifier_pubkey: str
     gemm_indices: List[Tuple[int, int]]
     random_vectors: List[str]
+    # Output rows per sampled GEMM the verifier must open and recompute exactly.
+    open_rows: int = 0
 
 
 @dataclass(frozen=True)
@@ -1,66 +1,235 @@
+import argparse
+import hashlib
+import json
+import platform
+import sys
 import time
-from typing import List
-
-from verifier.verifier import VerifierNode
-from worker.worker import WorkerNode
-
-
-def build_matrix(rows: int, cols: int) -> List[List[int]]:
-    matrix = []
-    value = 1
-    for _ in range(rows):
-        row = []
-        for _ in range(cols):
-            row.append(value % 17)
-            value += 1
-        matrix.append(row)
-    return matrix
-
-
-def main() -> None:
-    worker = WorkerNode(pubkey="worker-bench")
-    verifier = VerifierNode(pubkey="verifier-bench")
-
-    rows = 64
-    inner = 64
-    cols = 64
-    input_matrix = build_matrix(rows, inner)
-    weights = [build_matrix(inner, cols)]
-
-    job = {
-        "job_id": "bench",
-        "sku_id": "llama3_8b_int8_batch_v1",
-        "shard_id": "bench-shard",
-        "input_matrix": input_matrix,
-        "weights": weights,
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from chain.chain import Chain
+from chain.codec import encode_receipt
+from chain.epoch import EpochConfig
+from chain.randomness import derive_field_vectors, select_spot_rows
+from chain.types import GemmCommitment, Receipt, Verification
+from verifier.verifier import VerifierNode, opened_rows
+from worker.gemm import get_gemm_engine, mod_matmul
+from worker.merkle import FlatMerkleTree, MerkleMultiproof
+
+
+# PRD section 4 GEMMs as (name, lhs shape, rhs shape) for T tokens and hidden size H.
+PRD_GEMMS: Dict[str, Callable[[int, int], Tuple[Tuple[int, int], Tuple[int, int]]]] = {
+    "qkv": lambda t, h: ((t, h), (h, 3 * h)),
+    "attn_value": lambda t, h: ((t, t), (t, h)),
+    "mlp_in": lambda t, h: ((t, h), (h, 4 * h)),
+    "mlp_out": lambda t, h: ((t, 4 * h), (4 * h, h)),
+}
+STAGES = ("gemm", "commitment", "challenge_response", "verification", "spot_check")
+VERIFICATION_TARGET = 0.05
+
+
+def _best_of(repeats: int, fn: Callable[[], object]) -> Tuple[float, object]:
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_gemm(tokens: int, hidden: int, name: str, rounds: int, open_rows: int, repeats: int, seed: int) -> dict:
+    (lhs_rows, inner), (_, cols) = PRD_GEMMS[name](tokens, hidden)
+    rng = np.random.default_rng(seed)
+    x = rng.integers(-128, 128, size=(lhs_rows, inner), dtype=np.int64)
+    w = rng.integers(-128, 128, size=(inner, cols), dtype=np.int64)
+    engine = get_gemm_engine("numpy")
+    verifier = VerifierNode(pubkey="verifier-bench", spot_check_rows=open_rows)
+    r = derive_field_vectors(f"bench:{name}:{tokens}:{hidden}", rounds, cols)
+    rows = select_spot_rows("bench", 0, 0, lhs_rows, open_rows)
+
+    stages: Dict[str, float] = {}
+    stages["gemm"], y = _best_of(repeats, lambda: engine.matmul(x, w))
+    stages["commitment"], tree = _best_of(repeats, lambda: FlatMerkleTree.from_matrix(y))
+
+    def respond():
+        wr = mod_matmul(w, r.T)
+        yr = mod_matmul(y, r.T)
+        proof = MerkleMultiproof(
+            leaf_count=tree.leaf_count,
+            rows=[(idx, y[idx].tolist()) for idx in rows],
+            siblings=tree.get_multiproof(rows),
+        )
+        return wr, yr, proof
+
+    stages["challenge_response"], (wr, yr, proof) = _best_of(repeats, respond)
+
+    def verify():
+        return verifier.verify_challenge_batch(
+            receipt_id="bench",
+            input_matrix=x,
+            merkle_root=tree.root(),
+            response_layer_index=0,
+            response_gemm_index=0,
+            r_vectors=r,
+            wr_vectors=wr.T,
+            yr_vectors=yr.T,
+            merkle_proofs=proof,
+        )
+
+    stages["verification"], result = _best_of(repeats, verify)
+    if not result.verdict:
+        raise RuntimeError(f"Benchmark verification failed for {name} T={tokens} H={hidden}: {result.reason}")
+    # Exact recomputation of the opened rows: the cost side of the --open-rows knob.
+    stages["spot_check"], reason = _best_of(repeats, lambda: verifier.check_rows(x, w, opened_rows(proof)))
+    if reason is not None:
+        raise RuntimeError(f"Benchmark spot check failed for {name} T={tokens} H={hidden}: {reason}")
+    inference = stages["gemm"]
+    ratio = stages["verification"] / inference if inference > 0 else 0.0
+    return {
+        "tokens": tokens,
+        "hidden": hidden,
+        "gemm": name,
+        "shape": [lhs_rows, inner, cols],
+        "open_rows": len(rows),
+        "stages": stages,
+        "verification_ratio": ratio,
+        "meets_target": ratio <= VERIFICATION_TARGET,
     }
 
-    start = time.perf_counter()
-    output, receipt = worker.run_job(type("Job", (), job))
-    inference_time = time.perf_counter() - start
-
-    r_vector = [1 for _ in range(cols)]
-    response = worker.respond_challenge(0, 0, r_vector, row_indices=[0, 1, 2])
-    start = time.perf_counter()
-    result = verifier.verify_challenge(
-        receipt_id="bench",
-        input_matrix=input_matrix,
-        merkle_root=receipt.gemm_commitments[0].merkle_root,
-        response_layer_index=0,
-        response_gemm_index=0,
-        r_vector=response.r_vector,
-        wr_vector=response.wr_vector,
-        yr_vector=response.yr_vector,
-        merkle_proofs=response.merkle_proofs,
+
+def bench_chain(receipts: int, workers: int, commitments: int, repeats: int) -> dict:
+    receipt_batch = [
+        Receipt(
+            worker_pubkey=f"worker-{idx % workers}",
+            job_id="bench-job",
+            shard_id=f"shard-{idx}",
+            sku_id="llama3_8b_int8_batch_v1",
+            output_root=hashlib.sha256(f"out-{idx}".encode()).hexdigest(),
+            gemm_commitments=[
+                GemmCommitment(layer_index=g // 4, gemm_index=g % 4, merkle_root=hashlib.sha256(f"{idx}:{g}".encode()).hexdigest())
+                for g in range(commitments)
+            ],
+        )
+        for idx in range(receipts)
+    ]
+    stages: Dict[str, float] = {}
+    stages["receipt_hashing"], _ = _best_of(
+        repeats, lambda: [hashlib.sha256(encode_receipt(receipt)).digest() for receipt in receipt_batch]
     )
-    verification_time = time.perf_counter() - start
 
-    ratio = (verification_time / inference_time) if inference_time > 0 else 0
-    print("verification verdict:", result.verdict)
-    print("inference_time_sec:", round(inference_time, 6))
-    print("verification_time_sec:", round(verification_time, 6))
-    print("verification_ratio:", round(ratio, 4))
+    def settle(epoch: Optional[EpochConfig]) -> float:
+        chain = Chain(epoch=epoch)
+        for idx in range(workers):
+            chain.register_worker(f"worker-{idx}", stake=1000, supported_skus=["llama3_8b_int8_batch_v1"])
+        chain.create_job("bench-job", "llama3_8b_int8_batch_v1", "00" * 32, shard_size=4, payment=10)
+        ids = [chain.submit_receipt(receipt) for receipt in receipt_batch]
+        verifications = [
+            Verification(receipt_id, "verifier-bench", [], [], verdict=idx % 50 != 0) for idx, receipt_id in enumerate(ids)
+        ]
+        start = time.perf_counter()
+        for verification in verifications:
+            chain.submit_verification(verification)
+        if epoch is not None:
+            chain.close_epoch()
+        return time.perf_counter() - start
+
+    stages["settlement_immediate"] = min(settle(None) for _ in range(repeats))
+    stages["settlement_epoch"] = min(settle(EpochConfig(inflation=1000)) for _ in range(repeats))
+    return {"receipts": receipts, "workers": workers, "commitments": commitments, "stages": stages}
+
+
+def _case_key(case: dict) -> Tuple[int, int, str]:
+    return case["tokens"], case["hidden"], case["gemm"]
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Return one message per stage that is slower than ``baseline`` by more than ``tolerance``."""
+    regressions = []
+    if report["meta"].get("rounds") != baseline.get("meta", {}).get("rounds"):
+        return ["baseline was recorded with a different --rounds; stages are not comparable"]
+    previous = {_case_key(case): case for case in baseline.get("cases", [])}
+    pairs = [(f"{case['gemm']} T={case['tokens']} H={case['hidden']}", case, previous.get(_case_key(case))) for case in report["cases"]]
+    chain, old_chain = report.get("chain"), baseline.get("chain")
+    if chain and old_chain and all(chain[key] == old_chain.get(key) for key in ("receipts", "workers", "commitments")):
+        pairs.append(("chain", chain, old_chain))
+    for label, current, old in pairs:
+        if not current or not old:
+            continue
+        for stage, seconds in current["stages"].items():
+            before = old["stages"].get(stage)
+            if before and seconds > before * (1 + tolerance):
+                regressions.append(f"{label} {stage}: {before:.6f}s -> {seconds:.6f}s (+{seconds / before - 1:.0%})")
+    return regressions
+
+
+def _ints(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark GEMM, commitment, challenge and chain stages over PRD shapes.")
+    parser.add_argument("--tokens", type=_ints, default=[64, 256], help="comma-separated T values")
+    parser.add_argument("--hidden", type=_ints, default=[256, 512], help="comma-separated H values")
+    parser.add_argument("--gemms", default=",".join(PRD_GEMMS), help="comma-separated subset of " + ",".join(PRD_GEMMS))
+    parser.add_argument("--rounds", type=int, default=8, help="Freivalds rounds per challenge")
+    parser.add_argument("--open-rows", type=int, default=4, help="output rows opened and exactly recomputed per challenge")
+    parser.add_argument("--repeats", type=int, default=3, help="repetitions per stage; the best time is kept")
+    parser.add_argument("--receipts", type=int, default=2000, help="receipts for the chain stages")
+    parser.add_argument("--workers", type=int, default=64, help="registered workers for the chain stages")
+    parser.add_argument("--json", dest="json_path", help="write the report to this file")
+    parser.add_argument("--baseline", help="compare against a previous --json report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before a stage is flagged")
+    args = parser.parse_args(argv)
+
+    gemms = [name for name in args.gemms.split(",") if name]
+    unknown = [name for name in gemms if name not in PRD_GEMMS]
+    if unknown:
+        parser.error(f"unknown GEMMs: {', '.join(unknown)}")
+
+    cases = []
+    for hidden in args.hidden:
+        for tokens in args.tokens:
+            for name in gemms:
+                case = bench_gemm(tokens, hidden, name, args.rounds, args.open_rows, args.repeats, seed=len(cases))
+                cases.append(case)
+                stages = "  ".join(f"{stage}={case['stages'][stage]:.6f}" for stage in STAGES)
+                verdict = "ok" if case["meets_target"] else "OVER"
+                print(f"{name:<10} T={tokens:<6} H={hidden:<6} {stages}  ratio={case['verification_ratio']:.4f} [{verdict}]")
+
+    chain = bench_chain(args.receipts, args.workers, commitments=4 * 32, repeats=args.repeats)
+    print("chain      " + "  ".join(f"{stage}={seconds:.6f}" for stage, seconds in chain["stages"].items()))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "rounds": args.rounds,
+            "open_rows": args.open_rows,
+            "repeats": args.repeats,
+            "verification_target": VERIFICATION_TARGET,
+        },
+        "cases": cases,
+        "chain": chain,
+        "meets_target": all(case["meets_target"] for case in cases),
+    }
+    print(f"verification/inference <= {VERIFICATION_TARGET:.0%} for all shapes: {report['meets_target']}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(report, json.load(handle), args.tolerance)
+        for message in regressions:
+            print("REGRESSION", message)
+        if regressions:
+            return 1
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
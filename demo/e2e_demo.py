@@ -1,30 +1,20 @@
-import hashlib
-from typing import List
+import tempfile
 
 from chain.chain import Chain
+from chain.randomness import expand_field_vectors
 from sdk.sdk import SDKClient
 from verifier.verifier import VerifierNode
+from verifier.weights import WeightStore
 from worker.types import InferenceJob
 from worker.worker import WorkerNode
 
 
-def vector_from_seed(seed: str, length: int) -> List[int]:
-    data = seed.encode("utf-8")
-    values = []
-    while len(values) < length:
-        data = hashlib.sha256(data).digest()
-        for i in range(0, len(data), 4):
-            if len(values) >= length:
-                break
-            values.append(int.from_bytes(data[i : i + 4], "little", signed=False))
-    return values
-
-
 def main() -> None:
     chain = Chain()
     sdk = SDKClient(chain)
     worker = WorkerNode(pubkey="worker-1")
-    verifier = VerifierNode(pubkey="verifier-1")
+    weight_store = WeightStore(tempfile.mkdtemp(prefix="compute-weights-"))
+    verifier = VerifierNode(pubkey="verifier-1", weight_store=weight_store)
 
     sdk.register_worker("worker-1", stake=1000, supported_skus=["llama3_8b_int8_batch_v1"])
     sdk.create_job(job_id="job-1", sku_id="llama3_8b_int8_batch_v1", input_root="input-root", shard_size=4, payment=10)
@@ -34,6 +24,7 @@ def main() -> None:
         [[1, 0, 2], [0, 1, 1]],
         [[2, 1], [1, 0], [0, 1]],
     ]
+    weight_store.register_sku("llama3_8b_int8_batch_v1", weight_store.add(weights))
     job = InferenceJob(job_id="job-1", sku_id="llama3_8b_int8_batch_v1", shard_id="shard-1", input_matrix=input_matrix, weights=weights)
     output, receipt = worker.run_job(job)
 
@@ -42,20 +33,33 @@ def main() -> None:
     challenge = chain.state.challenges[receipt_id]
 
     gemm_layer, gemm_index = challenge.gemm_indices[0]
-    r_vector = vector_from_seed(challenge.random_vectors[0], len(weights[gemm_index][0]))
-    response = worker.respond_challenge(gemm_layer, gemm_index, r_vector, row_indices=[0, 1])
+    r_vectors = expand_field_vectors(challenge.random_vectors, len(weights[gemm_index][0])).tolist()
+    responses = [
+        worker.respond_challenge(
+            gemm_layer,
+            gemm_index,
+            r_vector,
+            row_indices=[0, 1],
+            multiproof=True,
+            receipt_id=receipt_id,
+            open_rows=challenge.open_rows,
+        )
+        for r_vector in r_vectors
+    ]
 
     merkle_root = receipt.gemm_commitments[gemm_index].merkle_root
-    result = verifier.verify_challenge(
+    result = verifier.verify_challenge_batch(
         receipt_id=receipt_id,
-        input_matrix=worker.gemm_inputs[(gemm_layer, gemm_index)],
+        input_matrix=worker.gemm_artifact(gemm_layer, gemm_index, "input", job_id=job.job_id),
         merkle_root=merkle_root,
-        response_layer_index=response.layer_index,
-        response_gemm_index=response.gemm_index,
-        r_vector=response.r_vector,
-        wr_vector=response.wr_vector,
-        yr_vector=response.yr_vector,
-        merkle_proofs=response.merkle_proofs,
+        response_layer_index=responses[0].layer_index,
+        response_gemm_index=responses[0].gemm_index,
+        r_vectors=[response.r_vector for response in responses],
+        wr_vectors=[response.wr_vector for response in responses],
+        yr_vectors=[response.yr_vector for response in responses],
+        merkle_proofs=responses[0].merkle_proofs,
+        sku_id=receipt.sku_id,
+        open_rows=challenge.open_rows,
     )
 
     verification = verifier.build_verification_receipt(
@@ -0,0 +1,149 @@
+"""Run GemmCaptureHooks on a tiny Llama-style CPU model and check what they commit.
+
+Needs torch only (no transformers or checkpoint). Checks that every layer
+submits its GEMMs in spec order, that a receipt holds ``layers x 4``
+commitments, and that the first layer's roots match GEMMs recomputed by hand.
+"""
+
+import argparse
+import sys
+from typing import List, Optional, Tuple
+
+import numpy as np
+import torch
+from torch import nn
+
+from worker.llm_backend import hash_state_dict
+from worker.llm_commit import CommitmentStream, GemmCaptureHooks, quantize_activation
+from worker.merkle import FlatMerkleTree
+
+GEMMS_PER_LAYER = 4
+
+
+class Attention(nn.Module):
+    def __init__(self, hidden: int) -> None:
+        super().__init__()
+        self.q_proj = nn.Linear(hidden, hidden, bias=False)
+        self.k_proj = nn.Linear(hidden, hidden, bias=False)
+        self.v_proj = nn.Linear(hidden, hidden, bias=False)
+        self.o_proj = nn.Linear(hidden, hidden, bias=False)
+        self.hidden = hidden
+
+    def mix(self, x: torch.Tensor) -> torch.Tensor:
+        """``A @ V``: the input of ``o_proj``."""
+        q, k, v = self.q_proj(x), self.k_proj(x), self.v_proj(x)
+        scores = torch.softmax(q @ k.transpose(-1, -2) / self.hidden**0.5, dim=-1)
+        return scores @ v
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.o_proj(self.mix(x))
+
+
+class MLP(nn.Module):
+    def __init__(self, hidden: int, intermediate: int) -> None:
+        super().__init__()
+        self.gate_proj = nn.Linear(hidden, intermediate, bias=False)
+        self.up_proj = nn.Linear(hidden, intermediate, bias=False)
+        self.down_proj = nn.Linear(intermediate, hidden, bias=False)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.down_proj(nn.functional.silu(self.gate_proj(x)) * self.up_proj(x))
+
+
+class DecoderLayer(nn.Module):
+    def __init__(self, hidden: int, intermediate: int) -> None:
+        super().__init__()
+        self.self_attn = Attention(hidden)
+        self.mlp = MLP(hidden, intermediate)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        x = x + self.self_attn(x)
+        return x + self.mlp(x)
+
+
+class TinyDecoder(nn.Module):
+    """Module names follow transformers' Llama layout: ``model.layers.N.{self_attn,mlp}.*``."""
+
+    def __init__(self, layers: int, hidden: int, intermediate: int) -> None:
+        super().__init__()
+        self.model = nn.Module()
+        self.model.layers = nn.ModuleList(DecoderLayer(hidden, intermediate) for _ in range(layers))
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        for layer in self.model.layers:
+            x = layer(x)
+        return x
+
+
+class RecordingStream(CommitmentStream):
+    def __init__(self) -> None:
+        super().__init__()
+        self.order: List[Tuple[int, int]] = []
+
+    def submit(self, layer_index: int, gemm_index: int, rows: np.ndarray) -> None:
+        self.order.append((layer_index, gemm_index))
+        super().submit(layer_index, gemm_index, rows)
+
+
+def _root(tensor: torch.Tensor) -> str:
+    return FlatMerkleTree.from_matrix(quantize_activation(tensor)).root()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--layers", type=int, default=3)
+    parser.add_argument("--hidden", type=int, default=16)
+    parser.add_argument("--intermediate", type=int, default=32)
+    parser.add_argument("--batch", type=int, default=2)
+    parser.add_argument("--tokens", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    torch.manual_seed(0)
+    model = TinyDecoder(args.layers, args.hidden, args.intermediate).eval()
+    x = torch.randn(args.batch, args.tokens, args.hidden)
+    stream = RecordingStream()
+    try:
+        with torch.inference_mode(), GemmCaptureHooks(model, stream):
+            model(x)
+    finally:
+        commitments = stream.finish()
+
+    failures = []
+    expected = [(layer, gemm) for layer in range(args.layers) for gemm in range(GEMMS_PER_LAYER)]
+    if stream.order != expected:
+        failures.append(f"hook order {stream.order} != {expected}")
+    if [(item.layer_index, item.gemm_index) for item in commitments] != expected:
+        failures.append(f"{len(commitments)} commitments, expected {args.layers} x {GEMMS_PER_LAYER}")
+    rows = args.batch * args.tokens
+    if stream.stats().rows != len(expected) * rows:
+        failures.append(f"captured {stream.stats().rows} rows, expected {len(expected) * rows}")
+
+    with torch.inference_mode():
+        layer = model.model.layers[0]
+        attn, mlp = layer.self_attn, layer.mlp
+        h = x + attn(x)
+        reference = [
+            _root(torch.cat([attn.q_proj(x), attn.k_proj(x), attn.v_proj(x)], dim=-1)),
+            _root(attn.mix(x)),
+            _root(torch.cat([mlp.gate_proj(h), mlp.up_proj(h)], dim=-1)),
+            _root(mlp.down_proj(nn.functional.silu(mlp.gate_proj(h)) * mlp.up_proj(h))),
+        ]
+    for gemm, root in enumerate(reference[: len(commitments)]):
+        if commitments[gemm].merkle_root != root:
+            failures.append(f"layer 0 GEMM {gemm} root does not match the recomputed GEMM")
+
+    state_hash = hash_state_dict(model)
+    with torch.no_grad():
+        model.model.layers[-1].mlp.down_proj.weight[0, 0] += 1
+    if hash_state_dict(model) == state_hash:
+        failures.append("hash_state_dict did not change with the weights")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    status = "FAILED" if failures else "ok"
+    print(f"{len(commitments)} commitments over {args.layers} layers, {rows} rows each: {status}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
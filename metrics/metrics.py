@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import bisect
+import functools
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple, TypeVar
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Stage-timer buckets in nanoseconds: 1us to ~67s (1000 << 26), doubling.
+STAGE_BUCKETS_NS: Tuple[int, ...] = tuple(1000 << shift for shift in range(27))
+PROMETHEUS_PREFIX = "compute"
+_INVALID_NAME = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class Counter:
+    __slots__ = ("name", "value", "_lock")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``counts[i]`` counts observations ``<= bounds[i]``, the last slot the rest."""
+
+    __slots__ = ("name", "bounds", "counts", "count", "total", "_lock")
+
+    def __init__(self, name: str, bounds: Sequence[float]) -> None:
+        self.name = name
+        self.bounds = tuple(sorted(bounds))
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        slot = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[slot] += 1
+            self.count += 1
+            self.total += value
+
+    def cumulative(self) -> Iterator[Tuple[float, int]]:
+        running = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            running += count
+            yield bound, running
+
+
+class _StageTimer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: Histogram) -> None:
+        self.histogram = histogram
+
+    def __enter__(self) -> "_StageTimer":
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter_ns() - self.started)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """Stage timers, counters and histograms that cost one attribute check when disabled.
+
+    Stage timers record wall time in nanoseconds into ``STAGE_BUCKETS_NS``
+    histograms keyed by stage name (``"worker.run_job"``). Counters and value
+    histograms are keyed the same way. ``snapshot`` returns a JSON-ready dict
+    and ``prometheus`` the text exposition format.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self._stages: Dict[str, Histogram] = {}
+        self._counters: Dict[str, Counter] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def stage_histogram(self, name: str) -> Histogram:
+        histogram = self._stages.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(name, Histogram(name, STAGE_BUCKETS_NS))
+        return histogram
+
+    def counter(self, name: str) -> Counter:
+        counter = self._counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(name, Counter(name))
+        return counter
+
+    def histogram(self, name: str, bounds: Sequence[float]) -> Histogram:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram(name, bounds))
+        return histogram
+
+    def timer(self, stage: str):
+        """Context manager timing one run of ``stage``."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self.stage_histogram(stage))
+
+    def timed(self, stage: str) -> Callable[[F], F]:
+        """Decorator timing every call of the wrapped function as ``stage``."""
+
+        def decorate(fn: F) -> F:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                started = time.perf_counter_ns()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.stage_histogram(stage).observe(time.perf_counter_ns() - started)
+
+            return wrapper  # type: ignore[return-value]
+
+        return decorate
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        if self.enabled:
+            self.counter(name).inc(amount)
+
+    def observe(self, name: str, value: float, bounds: Sequence[float]) -> None:
+        if self.enabled:
+            self.histogram(name, bounds).observe(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        def histogram_dict(histogram: Histogram) -> Dict[str, Any]:
+            return {
+                "count": histogram.count,
+                "sum": histogram.total,
+                "buckets": [[bound, count] for bound, count in zip(histogram.bounds, histogram.counts)],
+                "overflow": histogram.counts[-1],
+            }
+
+        with self._lock:
+            stages = dict(self._stages)
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+        return {
+            "stages_ns": {name: histogram_dict(stages[name]) for name in sorted(stages)},
+            "counters": {name: counters[name].value for name in sorted(counters)},
+            "histograms": {name: histogram_dict(histograms[name]) for name in sorted(histograms)},
+        }
+
+    def prometheus(self, prefix: str = PROMETHEUS_PREFIX) -> str:
+        """Render all metrics in the Prometheus text format; stage times are exported in seconds."""
+        with self._lock:
+            stages = dict(self._stages)
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+        lines: List[str] = []
+        if stages:
+            family = f"{prefix}_stage_seconds"
+            lines += [f"# HELP {family} Wall time per instrumented stage.", f"# TYPE {family} histogram"]
+            for name in sorted(stages):
+                lines += _histogram_lines(family, stages[name], f'stage="{name}"', divisor=10**9)
+        for name in sorted(counters):
+            family = f"{prefix}_{_metric_name(name)}_total"
+            lines += [f"# TYPE {family} counter", f"{family} {counters[name].value}"]
+        for name in sorted(histograms):
+            family = f"{prefix}_{_metric_name(name)}"
+            lines += [f"# TYPE {family} histogram"] + _histogram_lines(family, histograms[name], "", divisor=1)
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def write_prometheus(self, path: str, prefix: str = PROMETHEUS_PREFIX) -> None:
+        """Atomically replace ``path`` with the Prometheus text (for node_exporter's textfile collector)."""
+        _write_atomic(path, self.prometheus(prefix))
+
+    def write_json(self, path: str) -> None:
+        _write_atomic(path, json.dumps(self.snapshot(), indent=2))
+
+
+def _metric_name(name: str) -> str:
+    return _INVALID_NAME.sub("_", name)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _histogram_lines(family: str, histogram: Histogram, labels: str, divisor: int) -> List[str]:
+    sep = "," if labels else ""
+    lines = []
+    for bound, count in histogram.cumulative():
+        le = "+Inf" if bound == float("inf") else _format_value(bound / divisor if divisor != 1 else bound)
+        lines.append(f'{family}_bucket{{{labels}{sep}le="{le}"}} {count}')
+    selector = f"{{{labels}}}" if labels else ""
+    lines.append(f"{family}_sum{selector} {_format_value(histogram.total / divisor if divisor != 1 else histogram.total)}")
+    lines.append(f"{family}_count{selector} {histogram.count}")
+    return lines
+
+
+def _write_atomic(path: str, text: str) -> None:
+    temp = f"{path}.tmp"
+    with open(temp, "w") as handle:
+        handle.write(text)
+    os.replace(temp, path)
+
+
+METRICS = MetricsRegistry(enabled=os.getenv("COMPUTE_METRICS", "") not in ("", "0"))
+
+
+def enable() -> None:
+    METRICS.enabled = True
+
+
+def disable() -> None:
+    METRICS.enabled = False
+
+
+def timed(stage: str) -> Callable[[F], F]:
+    return METRICS.timed(stage)
+
+
+def timer(stage: str):
+    return METRICS.timer(stage)
+
+
+def inc(name: str, amount: int = 1) -> None:
+    METRICS.inc(name, amount)
+
+
+def observe(name: str, value: float, bounds: Sequence[float]) -> None:
+    METRICS.observe(name, value, bounds)
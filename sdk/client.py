@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, List, Optional, Sequence, Set, TypeVar, Union
+
+from chain.codec import (
+    decode_challenge,
+    decode_verification,
+    encode_job,
+    encode_receipt,
+    encode_verification,
+    encode_worker,
+)
+from chain.types import Challenge, Job, Receipt, Verification, Worker
+
+from .transport import (
+    STATUS_CHALLENGED,
+    STATUS_SETTLED,
+    RemoteError,
+    Transport,
+    pack_frames,
+    unpack_frames,
+    unpack_results,
+)
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+# An item encoded into its request frames, or the exception that kept it from being encoded.
+_Item = Union[List[bytes], Exception]
+
+
+class BatchError(RemoteError):
+    """Some items of a batched call failed; the others were applied.
+
+    ``results`` holds each item's result or exception, in submission order.
+    """
+
+    def __init__(self, results: List[object]) -> None:
+        failed = [item for item in results if isinstance(item, Exception)]
+        super().__init__(f"{len(failed)} of {len(results)} items failed; first: {failed[0]}")
+        self.results = results
+
+
+def _encode(encode: Callable[..., List[bytes]], *args) -> _Item:
+    try:
+        return encode(*args)
+    except Exception as exc:
+        return exc
+
+
+def _settle(results: List[object], return_exceptions: bool) -> list:
+    if not return_exceptions and any(isinstance(item, Exception) for item in results):
+        raise BatchError(results)
+    return results
+
+
+def _decoded(decode: Callable[[bytes], R], result: Union[bytes, Exception]) -> Union[R, Exception]:
+    if isinstance(result, Exception):
+        return result
+    try:
+        return decode(result)
+    except Exception as exc:
+        return exc
+
+
+class _Batcher(Generic[T, R]):
+    """Coalesces single calls made in the same loop iteration into batched requests.
+
+    Up to ``max_batch`` items go in one request; the batch is sent on the next
+    loop iteration or as soon as it is full. Requests for successive batches
+    are pipelined rather than waiting for each other. ``send`` returns each
+    item's result or exception, and each future resolves with its own.
+    """
+
+    def __init__(self, send: Callable[[List[T]], Awaitable[List[Union[R, Exception]]]], max_batch: int) -> None:
+        self.send = send
+        self.max_batch = max_batch
+        self._items: List[T] = []
+        self._futures: List["asyncio.Future[R]"] = []
+        self._scheduled = False
+        self._inflight: Set["asyncio.Task"] = set()
+
+    def add(self, item: T) -> "asyncio.Future[R]":
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[R]" = loop.create_future()
+        self._items.append(item)
+        self._futures.append(future)
+        if len(self._items) >= self.max_batch:
+            self.flush()
+        elif not self._scheduled:
+            self._scheduled = True
+            loop.call_soon(self.flush)
+        return future
+
+    def flush(self) -> None:
+        self._scheduled = False
+        if not self._items:
+            return
+        items, futures = self._items, self._futures
+        self._items, self._futures = [], []
+        task = asyncio.get_running_loop().create_task(self._run(items, futures))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, items: List[T], futures: List["asyncio.Future[R]"]) -> None:
+        try:
+            results = await self.send(items)
+        except BaseException as exc:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+        for future, result in zip(futures, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def drain(self) -> None:
+        self.flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+
+class AsyncSDKClient:
+    """Asyncio SDK client that batches and pipelines chain calls over a ``Transport``.
+
+    ``submit_receipt``, ``assign_challenge`` and ``submit_verification`` are
+    coalesced per loop iteration into batched requests, so thousands of
+    concurrent shard submissions cost a handful of round trips.
+    ``challenge_assigned`` and ``settled`` return futures resolved by a single
+    background poller that checks every watched receipt in one ``status`` call
+    per ``poll_interval``.
+    """
+
+    def __init__(self, transport: Transport, max_batch: int = 512, poll_interval: float = 0.05) -> None:
+        self.transport = transport
+        self.max_batch = max_batch
+        self.poll_interval = poll_interval
+        # Batchers hold items already encoded into their request frames.
+        self._receipts: _Batcher[List[bytes], str] = _Batcher(self._submit_receipt_frames, max_batch)
+        self._challenges: _Batcher[List[bytes], Challenge] = _Batcher(self._assign_frames, max_batch)
+        self._verifications: _Batcher[List[bytes], None] = _Batcher(self._submit_verification_frames, max_batch)
+        self._challenge_waiters: Dict[str, List["asyncio.Future[Challenge]"]] = {}
+        self._settle_waiters: Dict[str, List["asyncio.Future[Verification]"]] = {}
+        self._poller: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "AsyncSDKClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _call(self, method: str, frames: Sequence[bytes]) -> List[bytes]:
+        return unpack_frames(await self.transport.request(method, pack_frames(frames)))
+
+    async def _chunked(self, method: str, frames: Sequence[bytes], per_item: int = 1) -> List[bytes]:
+        step = self.max_batch * per_item
+        chunks = [frames[start : start + step] for start in range(0, len(frames), step)]
+        results = await asyncio.gather(*(self._call(method, chunk) for chunk in chunks))
+        return [frame for result in results for frame in result]
+
+    async def register_worker(self, pubkey: str, stake: int, supported_skus: List[str]) -> None:
+        await self._call("register_worker", [encode_worker(Worker(pubkey, stake, supported_skus))])
+
+    async def create_job(self, job_id: str, sku_id: str, input_root: str, shard_size: int, payment: int) -> None:
+        await self._call("create_job", [encode_job(Job(job_id, sku_id, input_root, shard_size, payment))])
+
+    async def _send_items(
+        self, method: str, items: Sequence[_Item], per_item: int = 1
+    ) -> List[Union[bytes, Exception]]:
+        """Send the encoded items; items that failed to encode keep their exception and are not sent."""
+        frames = [frame for item in items if not isinstance(item, Exception) for frame in item]
+        sent = iter(unpack_results(await self._chunked(method, frames, per_item)) if frames else [])
+        return [item if isinstance(item, Exception) else next(sent) for item in items]
+
+    async def submit_receipts(self, receipts: Sequence[Receipt], return_exceptions: bool = False) -> list:
+        """Submit ``receipts`` and return their ids.
+
+        Each receipt is applied independently. If any fails, ``BatchError``
+        carries every item's result, unless ``return_exceptions`` puts the
+        exceptions in the returned list instead.
+        """
+        items = [_encode(_receipt_frames, receipt) for receipt in receipts]
+        return _settle(await self._submit_receipt_frames(items), return_exceptions)
+
+    async def assign_challenges(
+        self, receipt_ids: Sequence[str], verifier_pubkey: Optional[str] = None, return_exceptions: bool = False
+    ) -> list:
+        items = [_encode(_challenge_frames, receipt_id, verifier_pubkey) for receipt_id in receipt_ids]
+        return _settle(await self._assign_frames(items), return_exceptions)
+
+    async def submit_verifications(
+        self, verifications: Sequence[Verification], return_exceptions: bool = False
+    ) -> list:
+        items = [_encode(_verification_frames, item) for item in verifications]
+        return _settle(await self._submit_verification_frames(items), return_exceptions)
+
+    async def _submit_receipt_frames(self, items: Sequence[_Item]) -> List[Union[str, Exception]]:
+        results = await self._send_items("submit_receipts", items)
+        return [_decoded(lambda payload: payload.decode("ascii"), result) for result in results]
+
+    async def _assign_frames(self, items: Sequence[_Item]) -> List[Union[Challenge, Exception]]:
+        results = await self._send_items("assign_challenges", items, per_item=2)
+        challenges = [_decoded(decode_challenge, result) for result in results]
+        for challenge in challenges:
+            if isinstance(challenge, Challenge):
+                self._resolve(self._challenge_waiters, challenge.receipt_id, challenge)
+        return challenges
+
+    async def _submit_verification_frames(self, items: Sequence[_Item]) -> List[Union[None, Exception]]:
+        results = await self._send_items("submit_verifications", items)
+        return [result if isinstance(result, Exception) else None for result in results]
+
+    def submit_receipt(self, receipt: Receipt) -> "asyncio.Future[str]":
+        """Queue ``receipt`` for the next batched submission; resolves to its receipt id.
+
+        The receipt is encoded now: one that cannot be encoded fails its own
+        future and is never sent.
+        """
+        return self._queue(self._receipts, _encode(_receipt_frames, receipt))
+
+    def assign_challenge(self, receipt_id: str, verifier_pubkey: Optional[str] = None) -> "asyncio.Future[Challenge]":
+        return self._queue(self._challenges, _encode(_challenge_frames, receipt_id, verifier_pubkey))
+
+    def submit_verification(self, verification: Verification) -> "asyncio.Future[None]":
+        return self._queue(self._verifications, _encode(_verification_frames, verification))
+
+    @staticmethod
+    def _queue(batcher: _Batcher[List[bytes], R], item: _Item) -> "asyncio.Future[R]":
+        if isinstance(item, Exception):
+            future: "asyncio.Future[R]" = asyncio.get_running_loop().create_future()
+            future.set_exception(item)
+            return future
+        return batcher.add(item)
+
+    def challenge_assigned(self, receipt_id: str) -> "asyncio.Future[Challenge]":
+        """Future resolved with the receipt's ``Challenge`` once one is assigned by anyone."""
+        return self._watch(self._challenge_waiters, receipt_id)
+
+    def settled(self, receipt_id: str) -> "asyncio.Future[Verification]":
+        """Future resolved with the receipt's ``Verification`` once it is settled.
+
+        Under epoch settlement this is when the epoch containing the
+        verification closes.
+        """
+        return self._watch(self._settle_waiters, receipt_id)
+
+    async def run_flow(
+        self,
+        receipt: Receipt,
+        respond: Callable[[str, Challenge], Awaitable[Verification]],
+        verifier_pubkey: Optional[str] = None,
+    ) -> Verification:
+        """Submit ``receipt``, have a challenge assigned, verify it with ``respond`` and submit the result.
+
+        Concurrent flows share batched requests at every step.
+        """
+        receipt_id = await self.submit_receipt(receipt)
+        challenge = await self.assign_challenge(receipt_id, verifier_pubkey)
+        verification = await respond(receipt_id, challenge)
+        await self.submit_verification(verification)
+        return verification
+
+    async def flush(self) -> None:
+        for batcher in (self._receipts, self._challenges, self._verifications):
+            await batcher.drain()
+
+    async def close(self) -> None:
+        await self.flush()
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+        for waiters in (self._challenge_waiters, self._settle_waiters):
+            for futures in waiters.values():
+                for future in futures:
+                    future.cancel()
+            waiters.clear()
+        await self.transport.close()
+
+    def _watch(self, waiters: Dict[str, List["asyncio.Future"]], receipt_id: str) -> "asyncio.Future":
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiters.setdefault(receipt_id, []).append(future)
+        if self._poller is None or self._poller.done():
+            self._poller = loop.create_task(self._poll())
+        return future
+
+    @staticmethod
+    def _resolve(waiters: Dict[str, List["asyncio.Future"]], receipt_id: str, value) -> None:
+        for future in waiters.pop(receipt_id, []):
+            if not future.done():
+                future.set_result(value)
+
+    async def _poll(self) -> None:
+        while self._challenge_waiters or self._settle_waiters:
+            receipt_ids = sorted(set(self._challenge_waiters) | set(self._settle_waiters))
+            try:
+                frames = await self._chunked("status", [receipt_id.encode("ascii") for receipt_id in receipt_ids])
+            except Exception as exc:
+                for waiters in (self._challenge_waiters, self._settle_waiters):
+                    for receipt_id in receipt_ids:
+                        for future in waiters.pop(receipt_id, []):
+                            if not future.done():
+                                future.set_exception(exc)
+                return
+            for idx, receipt_id in enumerate(receipt_ids):
+                flags, challenge, verification = frames[3 * idx], frames[3 * idx + 1], frames[3 * idx + 2]
+                if flags[0] & STATUS_CHALLENGED and receipt_id in self._challenge_waiters:
+                    self._resolve(self._challenge_waiters, receipt_id, decode_challenge(challenge))
+                if flags[0] & STATUS_SETTLED and receipt_id in self._settle_waiters:
+                    self._resolve(self._settle_waiters, receipt_id, decode_verification(verification))
+            if self._challenge_waiters or self._settle_waiters:
+                await asyncio.sleep(self.poll_interval)
+
+
+def _receipt_frames(receipt: Receipt) -> List[bytes]:
+    return [encode_receipt(receipt)]
+
+
+def _challenge_frames(receipt_id: str, verifier_pubkey: Optional[str]) -> List[bytes]:
+    return [receipt_id.encode("ascii"), (verifier_pubkey or "").encode("utf-8")]
+
+
+def _verification_frames(verification: Verification) -> List[bytes]:
+    return [encode_verification(verification)]
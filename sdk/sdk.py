@@ -1,7 +1,7 @@
-from typing import List
+from typing import List, Optional
 
 from chain.chain import Chain
-from chain.types import Receipt, Verification
+from chain.types import Challenge, Receipt, Verification
 
 
 class SDKClient:
@@ -17,8 +17,8 @@ class SDKClient:
     def submit_receipt(self, receipt: Receipt) -> str:
         return self.chain.submit_receipt(receipt)
 
-    def assign_challenge(self, receipt_id: str, verifier_pubkey: str) -> None:
-        self.chain.assign_challenge(receipt_id, verifier_pubkey)
+    def assign_challenge(self, receipt_id: str, verifier_pubkey: Optional[str] = None) -> Challenge:
+        return self.chain.assign_challenge(receipt_id, verifier_pubkey)
 
     def submit_verification(self, verification: Verification) -> None:
         self.chain.submit_verification(verification)
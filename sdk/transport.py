@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import asyncio
+import http.client
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar, Union
+from urllib.parse import urlsplit
+
+from chain.chain import Chain
+from chain.codec import (
+    Buffer,
+    CodecError,
+    decode_job,
+    decode_receipt,
+    decode_verification,
+    decode_worker,
+    encode_challenge,
+    encode_verification,
+)
+
+
+# Request and response bodies are a u32 frame count followed by
+# u32-length-prefixed frames; chain objects inside frames use chain.codec.
+_U32 = struct.Struct("<I")
+
+STATUS_CHALLENGED = 1
+STATUS_VERIFIED = 2
+STATUS_SETTLED = 4
+
+# Batched methods answer each item with a status frame and a payload frame:
+# the item's result, or the error message when the item was rejected.
+ITEM_OK = b"\x00"
+ITEM_ERROR = b"\x01"
+
+T = TypeVar("T")
+
+
+class RemoteError(RuntimeError):
+    """The chain rejected a request; the message carries the remote exception."""
+
+
+def pack_frames(frames: Sequence[bytes]) -> bytes:
+    parts = [_U32.pack(len(frames))]
+    for frame in frames:
+        parts.append(_U32.pack(len(frame)))
+        parts.append(frame)
+    return b"".join(parts)
+
+
+def unpack_frames(data: Buffer) -> List[bytes]:
+    view = memoryview(data).cast("B")
+    try:
+        (count,) = _U32.unpack_from(view, 0)
+        offset = _U32.size
+        frames = []
+        for _ in range(count):
+            (length,) = _U32.unpack_from(view, offset)
+            offset += _U32.size
+            if offset + length > len(view):
+                raise CodecError("Truncated frame")
+            frames.append(bytes(view[offset : offset + length]))
+            offset += length
+    except struct.error as exc:
+        raise CodecError("Truncated frame header") from exc
+    if offset != len(view):
+        raise CodecError("Trailing bytes after frames")
+    return frames
+
+
+def unpack_results(frames: Sequence[bytes]) -> List[Union[bytes, RemoteError]]:
+    """Split a batched response into each item's payload or ``RemoteError``."""
+    if len(frames) % 2:
+        raise CodecError("Item results come in status/payload pairs")
+    results: List[Union[bytes, RemoteError]] = []
+    for idx in range(0, len(frames), 2):
+        status, payload = frames[idx], frames[idx + 1]
+        if status == ITEM_OK:
+            results.append(payload)
+        elif status == ITEM_ERROR:
+            results.append(RemoteError(payload.decode("utf-8", "replace")))
+        else:
+            raise CodecError(f"Unknown item status: {status!r}")
+    return results
+
+
+def _apply_each(items: Sequence[T], apply: Callable[[T], bytes]) -> List[bytes]:
+    """Apply every item on its own, so a rejected item does not stop the rest of its batch."""
+    out = []
+    for item in items:
+        try:
+            out += [ITEM_OK, apply(item)]
+        except Exception as exc:
+            out += [ITEM_ERROR, f"{type(exc).__name__}: {exc}".encode("utf-8")]
+    return out
+
+
+class ChainDispatcher:
+    """Serves batched SDK requests against a ``Chain``; calls are serialized by a lock.
+
+    Methods take and return frame lists:
+
+    - ``register_worker`` / ``create_job``: one encoded ``Worker`` / ``Job``.
+    - ``submit_receipts``: encoded receipts; each returns its id.
+    - ``assign_challenges``: ``receipt_id, verifier_pubkey`` pairs (an empty
+      verifier lets the chain select one); each returns its encoded challenge.
+    - ``submit_verifications``: encoded verifications; each returns an empty
+      payload.
+
+    The three batched methods apply items independently and return an
+    ``ITEM_OK``/``ITEM_ERROR`` status frame and a payload frame per item
+    (see ``unpack_results``).
+    - ``status``: receipt ids; returns ``flags, challenge, verification``
+      triples with empty frames for what does not exist yet.
+    """
+
+    def __init__(self, chain: Chain) -> None:
+        self.chain = chain
+        self._lock = threading.Lock()
+        self._methods: Dict[str, Callable[[List[bytes]], List[bytes]]] = {
+            "register_worker": self._register_worker,
+            "create_job": self._create_job,
+            "submit_receipts": self._submit_receipts,
+            "assign_challenges": self._assign_challenges,
+            "submit_verifications": self._submit_verifications,
+            "status": self._status,
+        }
+
+    def handle(self, method: str, body: Buffer) -> bytes:
+        handler = self._methods.get(method)
+        if handler is None:
+            raise RemoteError(f"Unknown method: {method}")
+        try:
+            frames = unpack_frames(body)
+            with self._lock:
+                return pack_frames(handler(frames))
+        except RemoteError:
+            raise
+        except Exception as exc:
+            raise RemoteError(f"{type(exc).__name__}: {exc}") from exc
+
+    def _register_worker(self, frames: List[bytes]) -> List[bytes]:
+        for frame in frames:
+            worker = decode_worker(frame)
+            self.chain.register_worker(worker.pubkey, worker.stake, worker.supported_skus)
+        return []
+
+    def _create_job(self, frames: List[bytes]) -> List[bytes]:
+        for frame in frames:
+            job = decode_job(frame)
+            self.chain.create_job(job.job_id, job.sku_id, job.input_root, job.shard_size, job.payment)
+        return []
+
+    def _submit_receipts(self, frames: List[bytes]) -> List[bytes]:
+        return _apply_each(frames, lambda frame: self.chain.submit_receipt(decode_receipt(frame)).encode("ascii"))
+
+    def _assign_challenges(self, frames: List[bytes]) -> List[bytes]:
+        if len(frames) % 2:
+            raise CodecError("assign_challenges takes receipt/verifier pairs")
+        return _apply_each(list(zip(frames[::2], frames[1::2])), self._assign_challenge)
+
+    def _assign_challenge(self, pair: Tuple[bytes, bytes]) -> bytes:
+        receipt_id, verifier = pair
+        challenge = self.chain.assign_challenge(receipt_id.decode("ascii"), verifier.decode("utf-8") or None)
+        return encode_challenge(challenge)
+
+    def _submit_verifications(self, frames: List[bytes]) -> List[bytes]:
+        return _apply_each(frames, self._submit_verification)
+
+    def _submit_verification(self, frame: bytes) -> bytes:
+        self.chain.submit_verification(decode_verification(frame))
+        return b""
+
+    def _status(self, frames: List[bytes]) -> List[bytes]:
+        state = self.chain.state
+        out = []
+        for frame in frames:
+            receipt_id = frame.decode("ascii")
+            flags = 0
+            challenge = verification = b""
+            if receipt_id in state.challenges:
+                flags |= STATUS_CHALLENGED
+                challenge = encode_challenge(state.challenges[receipt_id])
+            if receipt_id in state.verifications:
+                flags |= STATUS_VERIFIED
+                verification = encode_verification(state.verifications[receipt_id])
+                if self.chain.is_settled(receipt_id):
+                    flags |= STATUS_SETTLED
+            out += [bytes([flags]), challenge, verification]
+        return out
+
+
+class Transport:
+    """Carries one framed request to the chain and returns the framed response."""
+
+    async def request(self, method: str, body: bytes) -> bytes:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        return None
+
+
+class InProcessTransport(Transport):
+    """Calls a ``ChainDispatcher`` in the same process, with the same framing as HTTP."""
+
+    def __init__(self, chain: Chain) -> None:
+        self.dispatcher = ChainDispatcher(chain)
+
+    async def request(self, method: str, body: bytes) -> bytes:
+        return self.dispatcher.handle(method, body)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    dispatcher: ChainDispatcher
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        try:
+            payload = self.dispatcher.handle(self.path.lstrip("/"), body)
+            status = 200
+        except RemoteError as exc:
+            payload = str(exc).encode("utf-8")
+            status = 400
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args) -> None:
+        return None
+
+
+class LocalHTTPServer:
+    """Serves a ``ChainDispatcher`` over HTTP/1.1 keep-alive on a background thread."""
+
+    def __init__(self, chain: Chain, host: str = "127.0.0.1", port: int = 0) -> None:
+        handler = type("ChainHandler", (_Handler,), {"dispatcher": ChainDispatcher(chain)})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "LocalHTTPServer":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="chain-http", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "LocalHTTPServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class HTTPTransport(Transport):
+    """POSTs framed requests over a pool of up to ``pool_size`` keep-alive connections.
+
+    Blocking socket I/O runs in the loop's default executor, so up to
+    ``pool_size`` requests are in flight at once.
+    """
+
+    def __init__(self, url: str, pool_size: int = 8, timeout: float = 30.0) -> None:
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._idle: List[http.client.HTTPConnection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _post(self, connection: http.client.HTTPConnection, method: str, body: bytes) -> bytes:
+        # Requests are not retried: a batch may already have been applied.
+        connection.request("POST", f"/{method}", body=body, headers={"Content-Type": "application/octet-stream"})
+        response = connection.getresponse()
+        payload = response.read()
+        if response.status != 200:
+            raise RemoteError(payload.decode("utf-8", "replace"))
+        return payload
+
+    async def request(self, method: str, body: bytes) -> bytes:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else http.client.HTTPConnection(
+                self.host, self.port, timeout=self.timeout
+            )
+            try:
+                payload = await asyncio.get_running_loop().run_in_executor(None, self._post, connection, method, body)
+            except RemoteError:
+                self._idle.append(connection)
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            self._idle.append(connection)
+            return payload
+
+    async def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
@@ -0,0 +1,77 @@
+import hashlib
+
+import pytest
+
+from chain.chain import Chain
+from chain.epoch import EpochConfig
+from chain.policy import PROBATION, AdaptivePolicy
+from chain.types import GemmCommitment, Receipt, Verification
+
+
+def _digest(label: str) -> str:
+    return hashlib.sha256(label.encode("utf-8")).hexdigest()
+
+
+def _receipt(worker: str, index: int, layers: int = 2) -> Receipt:
+    commitments = [
+        GemmCommitment(layer, gemm, _digest(f"{worker}:{index}:{layer}:{gemm}"))
+        for layer in range(layers)
+        for gemm in range(4)
+    ]
+    return Receipt(worker, "job", f"shard-{index}", "sku", _digest(f"{worker}:{index}:out"), commitments)
+
+
+def _run_ops(chain: Chain, start: int, stop: int) -> None:
+    """Submit, challenge and verify receipts ``start..stop``; every third verification fails."""
+    for index in range(start, stop):
+        worker = f"worker-{index % 3}"
+        receipt_id = chain.submit_receipt(_receipt(worker, index))
+        challenge = chain.assign_challenge(receipt_id)
+        verification = Verification(
+            receipt_id, challenge.verifier_pubkey, challenge.gemm_indices, challenge.random_vectors, index % 3 != 2
+        )
+        chain.submit_verification(verification)
+
+
+def _setup(chain: Chain) -> None:
+    for idx in range(4):
+        chain.register_worker(f"worker-{idx}", 1000, ["sku"])
+    chain.create_job("job", "sku", _digest("input"), 4, 10)
+
+
+def _decisions(chain: Chain):
+    probes = [chain.submit_receipt(_receipt(f"worker-{idx}", 1000 + idx)) for idx in range(3)]
+    return [chain.plan_challenge(receipt_id, "worker-3") for receipt_id in probes]
+
+
+@pytest.mark.parametrize("epoch", [None, EpochConfig(inflation=50)])
+def test_restart_matches_uninterrupted_chain(tmp_path, epoch):
+    reference = Chain(epoch=epoch, policy=AdaptivePolicy())
+    _setup(reference)
+    _run_ops(reference, 0, 12)
+
+    stored = Chain.open(str(tmp_path), snapshot_interval=10, epoch=epoch, policy=AdaptivePolicy())
+    _setup(stored)
+    _run_ops(stored, 0, 12)
+    stored.close()
+    restored = Chain.open(str(tmp_path), snapshot_interval=10, epoch=epoch, policy=AdaptivePolicy())
+
+    assert dict(restored.state.workers) == dict(reference.state.workers)
+    assert dict(restored.state.accounts) == dict(reference.state.accounts)
+    assert dict(restored.state.receipts) == dict(reference.state.receipts)
+    assert dict(restored.state.challenges) == dict(reference.state.challenges)
+    assert dict(restored.state.verifications) == dict(reference.state.verifications)
+    assert _decisions(restored) == _decisions(reference)
+    restored.close()
+
+
+def test_probation_survives_snapshot(tmp_path):
+    chain = Chain.open(str(tmp_path), policy=AdaptivePolicy())
+    _setup(chain)
+    _run_ops(chain, 0, 3)  # worker-2 fails its verification
+    chain.snapshot()
+    chain.close()
+    restored = Chain.open(str(tmp_path), policy=AdaptivePolicy())
+    assert restored.policy.tier_for(restored.state.workers["worker-2"]) == PROBATION
+    assert restored.policy.recent_failures("worker-2") == 1
+    restored.close()
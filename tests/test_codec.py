@@ -0,0 +1,122 @@
+import hashlib
+
+import pytest
+
+from chain.codec import CodecError, ReceiptView, decode, encode
+from chain.epoch import EpochLedger, EpochResult, decode_epoch_result, encode_epoch_result
+from chain.policy import AdaptivePolicy
+from chain.types import Challenge, GemmCommitment, Job, Receipt, Verification, Worker
+
+
+def _digest(label: str) -> str:
+    return hashlib.sha256(label.encode("utf-8")).hexdigest()
+
+
+def _receipt(count: int = 3) -> Receipt:
+    commitments = [
+        GemmCommitment(layer, gemm, _digest(f"{layer}:{gemm}")) for layer in range(count) for gemm in range(4)
+    ]
+    return Receipt("worker-\u00e9", "job", "shard", "sku", _digest("out"), commitments)
+
+
+CHAIN_OBJECTS = [
+    GemmCommitment(3, 2, _digest("root")),
+    _receipt(),
+    _receipt(0),
+    Challenge(_digest("receipt"), "verifier", [(0, 1), (2, 3)], [_digest("r0"), _digest("r1")]),
+    Challenge(_digest("receipt"), "verifier", [(1, 0)], [_digest("r0")], open_rows=4),
+    Verification(_digest("receipt"), "verifier", [(0, 1)], [_digest("r0")], verdict=True),
+    Verification(_digest("receipt"), "verifier", [], [], verdict=False),
+    Worker("worker", 100, ["sku-a", "sku-b"], reputation_score=-3),
+    Worker("worker", 0, []),
+    Job("job", "sku", "input", 16, 1 << 40),
+]
+
+
+@pytest.mark.parametrize("value", CHAIN_OBJECTS)
+def test_chain_objects_round_trip(value):
+    data = encode(value)
+    assert decode(data) == value
+    assert encode(decode(memoryview(data))) == data
+
+
+@pytest.mark.parametrize("value", CHAIN_OBJECTS)
+def test_truncated_and_padded_messages_are_rejected(value):
+    data = encode(value)
+    with pytest.raises(CodecError):
+        decode(data[:-1])
+    with pytest.raises(CodecError):
+        decode(data + b"\x00")
+
+
+def test_receipt_view_reads_commitments_lazily():
+    receipt = _receipt()
+    view = ReceiptView(encode(receipt))
+    assert view.commitment_count == len(receipt.gemm_commitments)
+    assert view.output_root == receipt.output_root
+    assert [view.commitment(idx) for idx in range(view.commitment_count)] == receipt.gemm_commitments
+    assert bytes(view.commitment_root_bytes(5)).hex() == receipt.gemm_commitments[5].merkle_root
+    assert view.to_receipt() == receipt
+
+
+def test_version_two_challenge_without_rows_is_rejected():
+    data = bytearray(encode(CHAIN_OBJECTS[4]))
+    data[-4:] = b"\x00" * 4
+    with pytest.raises(CodecError):
+        decode(bytes(data))
+
+
+@pytest.mark.parametrize("pending", [False, True])
+def test_epoch_ledger_round_trip(pending):
+    ledger = EpochLedger(epoch=7)
+    ledger.record_success("b", 10, 2, receipt_id="r1" if pending else None)
+    ledger.record_success("a", 5, 1)
+    ledger.record_failure("b", receipt_id="r2" if pending else None)
+    data = ledger.encode()
+    assert data[0] == (2 if pending else 1)
+    decoded = EpochLedger.decode(data)
+    assert (decoded.epoch, decoded.fees, len(decoded)) == (7, 3, 2)
+    assert list(decoded.pending) == (["r1", "r2"] if pending else [])
+    assert decoded.encode() == data
+
+
+def test_epoch_result_round_trip():
+    result = EpochResult(
+        epoch=2,
+        pool=50,
+        pubkeys=["a", "b"],
+        credits=[10, 0],
+        rewards=[50, 0],
+        stakes=[100, 90],
+        reputation_scores=[1, -1],
+        slashed=[False, True],
+    )
+    assert decode_epoch_result(encode_epoch_result(result)) == result
+
+
+def test_policy_state_round_trip():
+    policy = AdaptivePolicy()
+    for index in range(20):
+        policy.observe(f"worker-{index % 3}", index % 4 != 0)
+    restored = AdaptivePolicy()
+    restored.restore_state(policy.encode_state())
+    assert restored.encode_state() == policy.encode_state()
+    with pytest.raises(CodecError):
+        restored.restore_state(policy.encode_state()[:-1])
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        GemmCommitment(-1, 0, _digest("root")),
+        GemmCommitment(0, 1 << 32, _digest("root")),
+        Receipt("w", "j", "s", "sku", _digest("out"), [GemmCommitment(0, -2, _digest("root"))]),
+        Challenge(_digest("receipt"), "v", [(-1, 0)], [_digest("r")]),
+        Challenge(_digest("receipt"), "v", [(0, 0)], [_digest("r")], open_rows=-1),
+        Worker("w", 1 << 63, ["sku"]),
+        Job("j", "sku", "root", 16, -(1 << 63) - 1),
+    ],
+)
+def test_out_of_range_fields_raise_codec_error(value):
+    with pytest.raises(CodecError):
+        encode(value)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from chain.types import EMPTY_ROOT
+from worker.merkle import FlatMerkleTree, MerkleTree, verify_multiproof, verify_proof
+
+
+def _tree(rows: int = 11, cols: int = 3):
+    matrix = np.arange(rows * cols, dtype=np.int64).reshape(rows, cols) - 7
+    return matrix, FlatMerkleTree.from_matrix(matrix)
+
+
+@pytest.mark.parametrize("opened", [[0], [10], [1, 2, 3], [0, 5, 9, 10], list(range(11))])
+def test_multiproof_accepts_honest_openings(opened):
+    matrix, tree = _tree()
+    rows = [(idx, matrix[idx].tolist()) for idx in opened]
+    assert verify_multiproof(tree.leaf_count, rows, tree.get_multiproof(opened), tree.root())
+
+
+def test_multiproof_rejects_tampering():
+    matrix, tree = _tree()
+    opened = [2, 7]
+    siblings = tree.get_multiproof(opened)
+    rows = [(idx, matrix[idx].tolist()) for idx in opened]
+    root = tree.root()
+    assert not verify_multiproof(tree.leaf_count, [(2, [0, 0, 0]), rows[1]], siblings, root)
+    assert not verify_multiproof(tree.leaf_count, [(3, rows[0][1]), rows[1]], siblings, root)
+    assert not verify_multiproof(tree.leaf_count, rows, siblings[:-1], root)
+    assert not verify_multiproof(tree.leaf_count, rows, siblings + [siblings[0]], root)
+    assert not verify_multiproof(tree.leaf_count, rows + [rows[0]], siblings, root)
+    assert not verify_multiproof(tree.leaf_count, rows, siblings, EMPTY_ROOT)
+
+
+@pytest.mark.parametrize(
+    "rows",
+    [
+        [(-1, [1, 2, 3])],
+        [(11, [1, 2, 3])],
+        [(1 << 40, [1, 2, 3])],
+        [(0, [1 << 31, 0, 0])],
+        [(0, [-(1 << 31) - 1, 0, 0])],
+        [(0, ["x", 0, 0])],
+    ],
+)
+def test_multiproof_rejects_malformed_input(rows):
+    _, tree = _tree()
+    assert verify_multiproof(tree.leaf_count, rows, tree.get_multiproof([0]), tree.root()) is False
+
+
+def test_multiproof_rejects_bad_siblings():
+    matrix, tree = _tree()
+    siblings = tree.get_multiproof([4])
+    assert not verify_multiproof(tree.leaf_count, [(4, matrix[4].tolist())], ["zz"] + siblings[1:], tree.root())
+    assert not verify_multiproof(0, [(0, matrix[0].tolist())], siblings, tree.root())
+    assert not verify_multiproof(tree.leaf_count, [], siblings, tree.root())
+
+
+def test_empty_trees_share_the_canonical_root():
+    assert FlatMerkleTree.from_matrix(np.zeros((0, 3), dtype=np.int32)).root() == EMPTY_ROOT
+    assert MerkleTree([]).root() == EMPTY_ROOT
+
+
+def test_single_proofs_match_flat_tree():
+    matrix, tree = _tree()
+    reference = MerkleTree(matrix.tolist())
+    assert reference.root() == tree.root()
+    for idx in range(len(matrix)):
+        assert reference.get_proof(idx) == tree.get_proof(idx)
+        assert verify_proof(idx, matrix[idx].tolist(), tree.get_proof(idx), tree.root())
@@ -0,0 +1,16 @@
+import numpy as np
+import pytest
+
+from verifier.weights import WeightStore
+
+
+def test_weight_store_rejects_same_bytes_in_another_layout(tmp_path):
+    store = WeightStore(str(tmp_path))
+    weights = np.arange(64 * 32).reshape(64, 32) % 200 - 100
+    weights_hash = store.add([weights])
+    assert store.add([weights.copy()]) == weights_hash
+    with pytest.raises(ValueError):
+        store.add([weights.reshape(32, 64)])
+    with pytest.raises(ValueError):
+        store.add([weights[:32], weights[32:]])
+    assert store.open(weights_hash).entries[(0, 0)].shape == (64, 32)
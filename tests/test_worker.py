@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from chain.randomness import derive_field_vectors
+from verifier.verifier import VerifierNode
+from worker.sharded import ShardedExecutor
+from worker.types import InferenceJob
+from worker.worker import WorkerNode
+
+
+def _chain_job(rows: int = 8, hidden: int = 64, gemms: int = 3, seed: int = 0) -> InferenceJob:
+    rng = np.random.default_rng(seed)
+    weights = [rng.integers(-128, 128, size=(hidden, hidden)) for _ in range(gemms)]
+    return InferenceJob("job", "sku", "shard", rng.integers(-128, 128, size=(rows, hidden)), weights)
+
+
+def _workers():
+    return {
+        "in_memory": lambda: WorkerNode("worker"),
+        "streaming": lambda: WorkerNode("worker", tile_rows=4),
+        "sharded": lambda: WorkerNode("worker", executor=ShardedExecutor(max_workers=1, shard_rows=4)),
+    }
+
+
+@pytest.mark.parametrize("mode", sorted(_workers()))
+def test_chained_gemms_pass_freivalds(mode):
+    # Three 64x64 int8 GEMMs: the raw second product no longer fits int32.
+    job = _chain_job()
+    worker = _workers()[mode]()
+    _, receipt = worker.run_job(job)
+    verifier = VerifierNode("verifier")
+    for commitment in receipt.gemm_commitments:
+        layer, gemm = commitment.layer_index, commitment.gemm_index
+        r = derive_field_vectors(f"test:{gemm}", 4, job.weights[gemm].shape[1])
+        response = worker.respond_challenge_batch(layer, gemm, r, [0, 3])
+        result = verifier.verify_challenge_batch(
+            receipt_id="receipt",
+            input_matrix=worker.gemm_artifact(layer, gemm, "input"),
+            merkle_root=commitment.merkle_root,
+            response_layer_index=layer,
+            response_gemm_index=gemm,
+            r_vectors=r,
+            wr_vectors=response.wr_vectors,
+            yr_vectors=response.yr_vectors,
+            merkle_proofs=response.merkle_proofs,
+        )
+        assert result.reason == "ok", (mode, gemm)
+
+
+def test_execution_modes_commit_identical_roots():
+    job = _chain_job(rows=13)
+    roots = {}
+    outputs = {}
+    for mode, make in _workers().items():
+        output, receipt = make().run_job(job)
+        roots[mode] = [item.merkle_root for item in receipt.gemm_commitments] + [receipt.output_root]
+        outputs[mode] = [np.asarray(matrix) for matrix in output.gemm_outputs]
+    assert roots["in_memory"] == roots["streaming"] == roots["sharded"]
+    for mode in ("streaming", "sharded"):
+        for expected, actual in zip(outputs["in_memory"], outputs[mode]):
+            np.testing.assert_array_equal(expected, actual)
+
+
+def test_gemm_input_is_saturated_previous_output():
+    job = _chain_job()
+    worker = WorkerNode("worker")
+    output, _ = worker.run_job(job)
+    previous = np.asarray(output.gemm_outputs[0])
+    np.testing.assert_array_equal(np.asarray(worker.gemm_artifact(0, 1, "input")), np.clip(previous, -128, 127))
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from chain.types import Verification
+from worker.gemm import Matrix, field_operand, to_field
+from worker.merkle import MerkleMultiproof
+
+from .verifier import VerificationResult, VerifierNode
+from .weights import WeightStore
+
+
+@dataclass(frozen=True)
+class VerificationTask:
+    receipt_id: str
+    sku_id: str
+    layer_index: int
+    gemm_index: int
+    input_matrix: Matrix
+    merkle_root: str
+    r_vectors: Matrix
+    wr_vectors: Matrix
+    yr_vectors: Matrix
+    merkle_proofs: Union[List[List], MerkleMultiproof]
+    gemm_indices: List[Tuple[int, int]]
+    random_vectors: List[str]
+    # Rows to spot-check, e.g. ``Challenge.open_rows``; None uses the service's ``spot_check_rows``.
+    open_rows: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class WorkerThroughput:
+    pid: int
+    tasks: int
+    seconds: float
+
+    @property
+    def tasks_per_second(self) -> float:
+        return self.tasks / self.seconds if self.seconds > 0 else 0.0
+
+
+@dataclass(frozen=True)
+class VerificationBatch:
+    verifications: List[Verification]
+    results: List[VerificationResult]
+    throughput: List[WorkerThroughput]
+    seconds: float
+
+
+# Array operands travel through one shared-memory segment per batch as
+# (offset, shape, dtype) references; only proofs and metadata are pickled.
+ArrayRef = Tuple[int, Tuple[int, ...], str]
+_ARRAY_FIELDS = ("input_matrix", "r_vectors", "wr_vectors", "yr_vectors")
+
+_verifier: Optional[VerifierNode] = None
+_block_rows = 256
+
+
+def _init_process(
+    pubkey: str, weight_dir: Optional[str], layout_budget: int, block_rows: int, spot_check_rows: int = 0
+) -> None:
+    global _verifier, _block_rows
+    store = WeightStore(weight_dir, layout_budget=layout_budget) if weight_dir is not None else None
+    _verifier = VerifierNode(pubkey, weight_store=store, spot_check_rows=spot_check_rows)
+    _block_rows = block_rows
+
+
+def _task_arrays(task: VerificationTask) -> Optional[List[np.ndarray]]:
+    try:
+        arrays = [
+            field_operand(task.input_matrix),
+            field_operand(task.r_vectors),
+            to_field(task.wr_vectors),
+            to_field(task.yr_vectors),
+        ]
+    except (TypeError, ValueError):
+        return None
+    if any(array.ndim != 2 for array in arrays):
+        return None
+    return arrays
+
+
+def _run_task(verifier: VerifierNode, task: VerificationTask, arrays: Optional[List[np.ndarray]]) -> VerificationResult:
+    if arrays is None:
+        # Operands that do not form integer matrices can never pass.
+        return VerificationResult(receipt_id=task.receipt_id, verdict=False, reason="malformed_response")
+    x, r_vectors, wr_vectors, yr_vectors = arrays
+    return verifier.verify_challenge_batch(
+        receipt_id=task.receipt_id,
+        input_matrix=x,
+        merkle_root=task.merkle_root,
+        response_layer_index=task.layer_index,
+        response_gemm_index=task.gemm_index,
+        r_vectors=r_vectors,
+        wr_vectors=wr_vectors,
+        yr_vectors=yr_vectors,
+        merkle_proofs=task.merkle_proofs,
+        block_rows=_block_rows,
+        sku_id=task.sku_id,
+        open_rows=task.open_rows,
+    )
+
+
+def _run_chunk(
+    segment: Optional[str], chunk: List[Tuple[int, VerificationTask, Optional[List[ArrayRef]]]]
+) -> Tuple[int, float, List[Tuple[int, VerificationResult]]]:
+    started = time.perf_counter()
+    shm = shared_memory.SharedMemory(name=segment) if segment is not None else None
+    results = []
+    try:
+        for index, task, refs in chunk:
+            arrays = None
+            if refs is not None:
+                arrays = [
+                    np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset) for offset, shape, dtype in refs
+                ]
+            results.append((index, _run_task(_verifier, task, arrays)))
+            del arrays
+    finally:
+        if shm is not None:
+            shm.close()
+    return os.getpid(), time.perf_counter() - started, results
+
+
+class VerificationService:
+    """Verify batches of challenge responses on a process pool.
+
+    Tasks are grouped by ``(sku_id, layer_index, gemm_index)`` so each process
+    reuses the cached weight layout of a GEMM. Inputs are copied once into
+    shared memory and mapped by the workers. Results are returned in submission
+    order.
+    """
+
+    def __init__(
+        self,
+        pubkey: str,
+        weight_dir: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        chunk_size: int = 16,
+        layout_budget: int = 1 << 30,
+        block_rows: int = 256,
+        spot_check_rows: int = 0,
+    ) -> None:
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        self.pubkey = pubkey
+        self.weight_dir = weight_dir
+        self.max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self._init_args = (pubkey, weight_dir, layout_budget, block_rows, spot_check_rows)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "VerificationService":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _chunks(self, tasks: Sequence[VerificationTask], refs: List[Optional[List[ArrayRef]]]) -> List[list]:
+        order = sorted(
+            range(len(tasks)), key=lambda idx: (tasks[idx].sku_id, tasks[idx].layer_index, tasks[idx].gemm_index, idx)
+        )
+        chunks: List[list] = []
+        for idx in order:
+            group = (tasks[idx].sku_id, tasks[idx].layer_index, tasks[idx].gemm_index)
+            if not chunks or len(chunks[-1][1]) >= self.chunk_size or chunks[-1][0] != group:
+                chunks.append((group, []))
+            task = replace(tasks[idx], **{name: None for name in _ARRAY_FIELDS})
+            chunks[-1][1].append((idx, task, refs[idx]))
+        return [chunk for _, chunk in chunks]
+
+    def verify_many(self, tasks: Sequence[VerificationTask]) -> VerificationBatch:
+        started = time.perf_counter()
+        results: List[Optional[VerificationResult]] = [None] * len(tasks)
+        stats: Dict[int, List[float]] = {}
+
+        def record(pid: int, seconds: float, chunk_results) -> None:
+            entry = stats.setdefault(pid, [0, 0.0])
+            entry[0] += len(chunk_results)
+            entry[1] += seconds
+            for index, result in chunk_results:
+                results[index] = result
+
+        arrays = [_task_arrays(task) for task in tasks]
+        if self.max_workers <= 1:
+            _init_process(*self._init_args)
+            for chunk in self._chunks(tasks, [None] * len(tasks)):
+                chunk_started = time.perf_counter()
+                chunk_results = [(idx, _run_task(_verifier, task, arrays[idx])) for idx, task, _ in chunk]
+                record(os.getpid(), time.perf_counter() - chunk_started, chunk_results)
+        else:
+            shm, refs = _pack(arrays)
+            try:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers, initializer=_init_process, initargs=self._init_args
+                    )
+                segment = shm.name if shm is not None else None
+                futures = [self._pool.submit(_run_chunk, segment, chunk) for chunk in self._chunks(tasks, refs)]
+                for future in futures:
+                    record(*future.result())
+            finally:
+                if shm is not None:
+                    shm.close()
+                    shm.unlink()
+
+        verifications = [
+            Verification(
+                receipt_id=task.receipt_id,
+                verifier_pubkey=self.pubkey,
+                gemm_indices=task.gemm_indices,
+                random_vectors=task.random_vectors,
+                verdict=result.verdict,
+            )
+            for task, result in zip(tasks, results)
+        ]
+        throughput = [
+            WorkerThroughput(pid=pid, tasks=int(count), seconds=seconds) for pid, (count, seconds) in sorted(stats.items())
+        ]
+        return VerificationBatch(
+            verifications=verifications,
+            results=results,
+            throughput=throughput,
+            seconds=time.perf_counter() - started,
+        )
+
+
+def _pack(
+    arrays: List[Optional[List[np.ndarray]]],
+) -> Tuple[Optional[shared_memory.SharedMemory], List[Optional[List[ArrayRef]]]]:
+    total = sum(array.nbytes for group in arrays if group is not None for array in group)
+    if total == 0:
+        return None, [None] * len(arrays)
+    shm = shared_memory.SharedMemory(create=True, size=total)
+    refs: List[Optional[List[ArrayRef]]] = []
+    offset = 0
+    for group in arrays:
+        if group is None:
+            refs.append(None)
+            continue
+        group_refs = []
+        for array in group:
+            target = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf, offset=offset)
+            target[...] = array
+            group_refs.append((offset, array.shape, array.dtype.str))
+            offset += array.nbytes
+        del target
+        refs.append(group_refs)
+    return shm, refs
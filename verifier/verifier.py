@@ -1,14 +1,18 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional, Sequence, Tuple, Union
 
+import numpy as np
+
+from chain.randomness import select_spot_rows
 from chain.types import Verification
-from worker.merkle import verify_proof
+from metrics.metrics import timed
+from worker.gemm import PRIME_MODULUS, Matrix, exact_matmul, field_operand, mod_matmul, to_field
+from worker.merkle import MerkleMultiproof, verify_multiproof, verify_proof
 from worker.worker import matvec_int32
 
-
-PRIME_MODULUS = (1 << 61) - 1
+from .weights import WeightStore
 
 
 @dataclass(frozen=True)
@@ -23,10 +27,155 @@ def mod_reduce(value: int, modulus: int = PRIME_MODULUS) -> int:
     return value
 
 
+def verify_openings(merkle_proofs: Union[List[List], MerkleMultiproof], merkle_root: str) -> bool:
+    if isinstance(merkle_proofs, MerkleMultiproof):
+        return verify_multiproof(merkle_proofs.leaf_count, merkle_proofs.rows, merkle_proofs.siblings, merkle_root)
+    for row_index, row_values, proof in merkle_proofs:
+        if not verify_proof(row_index, row_values, proof, merkle_root):
+            return False
+    return True
+
+
+def opened_rows(merkle_proofs: Union[List[List], MerkleMultiproof]) -> List[Tuple[int, List[int]]]:
+    if isinstance(merkle_proofs, MerkleMultiproof):
+        return [(int(idx), values) for idx, values in merkle_proofs.rows]
+    return [(int(idx), values) for idx, values, _ in merkle_proofs]
+
+
 class VerifierNode:
-    def __init__(self, pubkey: str) -> None:
+    """Checks challenge responses.
+
+    With ``spot_check_rows > 0`` every response must open the rows given by
+    ``chain.randomness.select_spot_rows`` for its receipt and GEMM. For the
+    opened rows the verifier checks ``Y[rows] @ R`` against the returned
+    ``YR``. When the SKU's weights are stored, it also recomputes
+    ``X[rows] @ W`` exactly. The verify methods take ``open_rows`` per call
+    (e.g. ``Challenge.open_rows``), overriding ``spot_check_rows``.
+    """
+
+    def __init__(self, pubkey: str, weight_store: Optional[WeightStore] = None, spot_check_rows: int = 0) -> None:
         self.pubkey = pubkey
+        self.weight_store = weight_store
+        self.spot_check_rows = spot_check_rows
+
+    def select_spot_rows(self, receipt_id: str, layer_index: int, gemm_index: int, total_rows: int) -> List[int]:
+        """Rows the worker must open: ``spot_check_rows`` distinct rows derived from the receipt and GEMM."""
+        return select_spot_rows(receipt_id, layer_index, gemm_index, total_rows, self.spot_check_rows)
+
+    def check_rows(
+        self, input_matrix: Matrix, weights: Matrix, rows: Sequence[Tuple[int, Sequence[int]]]
+    ) -> Optional[str]:
+        """Recompute ``X[rows] @ W`` for the opened rows and compare it to their values.
+
+        Small operands use the exact int64 kernel. Otherwise (e.g. inputs
+        already reduced into the field) the product is taken mod P; row values
+        are int32 and P > 2^32, so equality mod P is still exact equality.
+        """
+        if not rows:
+            return None
+        x = field_operand(input_matrix)
+        w = field_operand(weights)
+        indices = [idx for idx, _ in rows]
+        if x.ndim != 2 or w.ndim != 2 or x.shape[1] != w.shape[0]:
+            return "malformed_response"
+        if min(indices) < 0 or max(indices) >= x.shape[0]:
+            return "malformed_response"
+        claimed = field_operand([values for _, values in rows])
+        if claimed.shape != (len(rows), w.shape[1]):
+            return "malformed_response"
+        expected = exact_matmul(x[indices], w)
+        if expected is not None:
+            matches = np.array_equal(expected, claimed)
+        else:
+            matches = np.array_equal(mod_matmul(x[indices], w), to_field(claimed))
+        if not matches:
+            return "row_mismatch"
+        return None
+
+    def _spot_check(
+        self,
+        receipt_id: str,
+        sku_id: Optional[str],
+        layer_index: int,
+        gemm_index: int,
+        input_matrix: Matrix,
+        merkle_proofs: Union[List[List], MerkleMultiproof],
+        r_vectors: np.ndarray,
+        yr: np.ndarray,
+        open_rows: int,
+    ) -> Optional[str]:
+        """Spot-check opened rows. ``r_vectors`` is ``k x N`` and ``yr`` is ``T x k``, both in the field.
+
+        The opened rows must include the derived rows; a worker choosing
+        which rows to open could open only rows it computed honestly.
+        """
+        if open_rows <= 0:
+            return None
+        rows = opened_rows(merkle_proofs)
+        indices = sorted({idx for idx, _ in rows})
+        required = select_spot_rows(receipt_id, layer_index, gemm_index, yr.shape[0], open_rows)
+        if len(indices) < len(required):
+            return "insufficient_openings"
+        if not set(required).issubset(indices):
+            return "wrong_rows"
+        if not indices:
+            return None
+        if indices[0] < 0 or indices[-1] >= yr.shape[0]:
+            return "malformed_response"
+        values = field_operand([row for _, row in rows])
+        if values.ndim != 2 or values.shape[1] != r_vectors.shape[1]:
+            return "malformed_response"
+        # Opened rows are Merkle-proven, so this binds YR to the committed Y.
+        if not np.array_equal(mod_matmul(values, r_vectors.T), yr[[idx for idx, _ in rows]]):
+            return "yr_row_mismatch"
+        if self.weight_store is None:
+            return None
+        weights_hash = self.weight_store.sku_hash(sku_id) if sku_id is not None else None
+        if weights_hash is None:
+            return "unknown_sku"
+        if (layer_index, gemm_index) not in self.weight_store.open(weights_hash).entries:
+            return "malformed_response"
+        return self.check_rows(input_matrix, self.weight_store.matrix(weights_hash, layer_index, gemm_index), rows)
+
+    def verify_many(self, tasks, max_workers: Optional[int] = None, chunk_size: int = 16):
+        """Verify ``tasks`` (``service.VerificationTask``) on a process pool; see ``service.VerificationService``."""
+        from .service import VerificationService
+
+        weight_dir = self.weight_store.directory if self.weight_store is not None else None
+        with VerificationService(
+            self.pubkey,
+            weight_dir,
+            max_workers=max_workers,
+            chunk_size=chunk_size,
+            spot_check_rows=self.spot_check_rows,
+        ) as service:
+            return service.verify_many(tasks)
+
+    def check_wr(
+        self, sku_id: Optional[str], layer_index: int, gemm_index: int, r_vectors, wr: np.ndarray
+    ) -> Optional[str]:
+        """Recompute ``W @ R mod P`` from the SKU's stored weights and compare it to ``wr`` (``H x k``).
 
+        Returns a failure reason, or None if the check passes or the node has
+        no weight store. With a store, a missing or unregistered ``sku_id``
+        fails with ``"unknown_sku"``: otherwise the worker could pick WR freely.
+        """
+        if self.weight_store is None:
+            return None
+        weights_hash = self.weight_store.sku_hash(sku_id) if sku_id is not None else None
+        if weights_hash is None:
+            return "unknown_sku"
+        weights = self.weight_store.open(weights_hash)
+        entry = weights.entries.get((layer_index, gemm_index))
+        r = field_operand(r_vectors)
+        if entry is None or r.ndim != 2 or r.shape[1] != entry.shape[1]:
+            return "malformed_response"
+        expected = self.weight_store.matmul_mod(weights_hash, layer_index, gemm_index, r.T)
+        if not np.array_equal(expected, wr):
+            return "wr_mismatch"
+        return None
+
+    @timed("verifier.verify_challenge")
     def verify_challenge(
         self,
         receipt_id: str,
@@ -37,11 +186,30 @@ class VerifierNode:
         r_vector: List[int],
         wr_vector: List[int],
         yr_vector: List[int],
-        merkle_proofs: List[List],
+        merkle_proofs: Union[List[List], MerkleMultiproof],
+        sku_id: Optional[str] = None,
+        open_rows: Optional[int] = None,
     ) -> VerificationResult:
-        for row_index, row_values, proof in merkle_proofs:
-            if not verify_proof(row_index, row_values, proof, merkle_root):
-                return VerificationResult(receipt_id=receipt_id, verdict=False, reason="merkle_proof_failed")
+        if not verify_openings(merkle_proofs, merkle_root):
+            return VerificationResult(receipt_id=receipt_id, verdict=False, reason="merkle_proof_failed")
+
+        reason = self.check_wr(sku_id, response_layer_index, response_gemm_index, [r_vector], to_field([wr_vector]).T)
+        if reason is not None:
+            return VerificationResult(receipt_id=receipt_id, verdict=False, reason=reason)
+
+        reason = self._spot_check(
+            receipt_id,
+            sku_id,
+            response_layer_index,
+            response_gemm_index,
+            input_matrix,
+            merkle_proofs,
+            field_operand([r_vector]),
+            to_field([yr_vector]).T,
+            self.spot_check_rows if open_rows is None else open_rows,
+        )
+        if reason is not None:
+            return VerificationResult(receipt_id=receipt_id, verdict=False, reason=reason)
 
         x_wr = matvec_int32(input_matrix, wr_vector)
         for idx, value in enumerate(x_wr):
@@ -50,6 +218,59 @@ class VerifierNode:
 
         return VerificationResult(receipt_id=receipt_id, verdict=True, reason="ok")
 
+    @timed("verifier.verify_challenge_batch")
+    def verify_challenge_batch(
+        self,
+        receipt_id: str,
+        input_matrix: List[List[int]],
+        merkle_root: str,
+        response_layer_index: int,
+        response_gemm_index: int,
+        r_vectors: List[List[int]],
+        wr_vectors: List[List[int]],
+        yr_vectors: List[List[int]],
+        merkle_proofs: Union[List[List], MerkleMultiproof],
+        block_rows: int = 256,
+        sku_id: Optional[str] = None,
+        open_rows: Optional[int] = None,
+    ) -> VerificationResult:
+        if not verify_openings(merkle_proofs, merkle_root):
+            return VerificationResult(receipt_id=receipt_id, verdict=False, reason="merkle_proof_failed")
+
+        x = field_operand(input_matrix)
+        if x.ndim != 2 or len(wr_vectors) != len(r_vectors) or len(yr_vectors) != len(r_vectors):
+            return VerificationResult(receipt_id=receipt_id, verdict=False, reason="malformed_response")
+        if len(r_vectors) == 0:
+            return VerificationResult(receipt_id=receipt_id, verdict=True, reason="ok")
+        # Rounds are stacked column-wise: WR is H x k and YR is T x k.
+        wr = to_field(wr_vectors).T
+        yr = to_field(yr_vectors).T
+        if wr.shape[0] != x.shape[1] or yr.shape[0] != x.shape[0]:
+            return VerificationResult(receipt_id=receipt_id, verdict=False, reason="malformed_response")
+        reason = self.check_wr(sku_id, response_layer_index, response_gemm_index, r_vectors, wr)
+        if reason is not None:
+            return VerificationResult(receipt_id=receipt_id, verdict=False, reason=reason)
+        reason = self._spot_check(
+            receipt_id,
+            sku_id,
+            response_layer_index,
+            response_gemm_index,
+            input_matrix,
+            merkle_proofs,
+            field_operand(r_vectors),
+            yr,
+            self.spot_check_rows if open_rows is None else open_rows,
+        )
+        if reason is not None:
+            return VerificationResult(receipt_id=receipt_id, verdict=False, reason=reason)
+
+        for start in range(0, x.shape[0], block_rows):
+            x_wr = mod_matmul(x[start : start + block_rows], wr, block_rows=block_rows)
+            if not np.array_equal(x_wr, yr[start : start + block_rows]):
+                return VerificationResult(receipt_id=receipt_id, verdict=False, reason="freivalds_mismatch")
+
+        return VerificationResult(receipt_id=receipt_id, verdict=True, reason="ok")
+
     def build_verification_receipt(
         self,
         receipt_id: str,
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from worker.gemm import Matrix, ModOperand, as_int_array, mod_matmul, prepare_mod_operand
+
+
+GemmKey = Tuple[int, int]
+
+WEIGHTS_FILE = "weights.bin"
+MANIFEST_FILE = "manifest.json"
+SKU_FILE = "skus.json"
+_MANIFEST_VERSION = 1
+_HASH_CHUNK = 1 << 20
+
+
+@dataclass(frozen=True)
+class WeightEntry:
+    layer_index: int
+    gemm_index: int
+    offset: int
+    shape: Tuple[int, int]
+
+
+def hash_weights_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _as_int8(matrix: Matrix) -> np.ndarray:
+    array = as_int_array(matrix)
+    if array is None or array.ndim != 2:
+        raise ValueError("SKU weights must be 2-D integer matrices")
+    if array.size and (int(array.min()) < -128 or int(array.max()) > 127):
+        raise ValueError("SKU weights must fit in int8")
+    return np.ascontiguousarray(array, dtype=np.int8)
+
+
+def _write_json(path: str, payload: dict) -> None:
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(fd, "w") as handle:
+        json.dump(payload, handle, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class SkuWeights:
+    """Read-only view of one content-addressed weight blob.
+
+    ``weights.bin`` is memory-mapped, so every process that opens the same hash
+    shares one copy through the page cache.
+    """
+
+    def __init__(self, directory: str, weights_hash: str) -> None:
+        self.weights_hash = weights_hash
+        with open(os.path.join(directory, MANIFEST_FILE)) as handle:
+            manifest = json.load(handle)
+        if manifest.get("version") != _MANIFEST_VERSION:
+            raise ValueError(f"Unsupported weight manifest version: {manifest.get('version')}")
+        self.entries: Dict[GemmKey, WeightEntry] = {}
+        for item in manifest["matrices"]:
+            entry = WeightEntry(
+                layer_index=item["layer_index"],
+                gemm_index=item["gemm_index"],
+                offset=item["offset"],
+                shape=tuple(item["shape"]),
+            )
+            self.entries[(entry.layer_index, entry.gemm_index)] = entry
+        path = os.path.join(directory, WEIGHTS_FILE)
+        self._data = np.memmap(path, dtype=np.int8, mode="r") if os.path.getsize(path) else np.zeros(0, dtype=np.int8)
+
+    def matrix(self, layer_index: int, gemm_index: int) -> np.ndarray:
+        entry = self.entries[(layer_index, gemm_index)]
+        rows, cols = entry.shape
+        return self._data[entry.offset : entry.offset + rows * cols].reshape(rows, cols)
+
+
+class WeightStore:
+    """Content-addressed SKU weights shared across verifier processes.
+
+    Each blob lives in ``<directory>/<sha256(weights.bin)>/`` next to a
+    manifest of per-(layer, gemm) offsets and shapes. ``skus.json`` maps SKU ids
+    to weight hashes. Blocked limb layouts used for ``W @ R mod P`` are kept in
+    an LRU cache bounded by ``layout_budget`` bytes.
+    """
+
+    def __init__(self, directory: str, layout_budget: int = 1 << 30, block_rows: int = 256) -> None:
+        self.directory = directory
+        self.layout_budget = layout_budget
+        self.block_rows = block_rows
+        os.makedirs(directory, exist_ok=True)
+        self._opened: Dict[str, SkuWeights] = {}
+        self._layouts: "OrderedDict[Tuple[str, int, int], ModOperand]" = OrderedDict()
+        self.layout_bytes = 0
+        self._skus: Dict[str, str] = {}
+        self._skus_stamp: Optional[Tuple[int, int, int]] = None
+        self._lock = threading.RLock()
+
+    def add(self, weights: Union[Sequence[Matrix], Mapping[GemmKey, Matrix]]) -> str:
+        """Store weights and return their hash.
+
+        A sequence is taken as the GEMMs of layer 0 in order, matching
+        ``WorkerNode.run_job``. The hash covers the bytes only, so adding the
+        same bytes with a different layout (shapes or GEMM keys) than the
+        stored manifest raises ``ValueError``.
+        """
+        if isinstance(weights, Mapping):
+            items = sorted(weights.items())
+        else:
+            items = [((0, idx), matrix) for idx, matrix in enumerate(weights)]
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        digest = hashlib.sha256()
+        matrices = []
+        offset = 0
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                for (layer_index, gemm_index), matrix in items:
+                    array = _as_int8(matrix)
+                    raw = array.tobytes()
+                    handle.write(raw)
+                    digest.update(raw)
+                    matrices.append(
+                        {
+                            "layer_index": layer_index,
+                            "gemm_index": gemm_index,
+                            "offset": offset,
+                            "shape": list(array.shape),
+                        }
+                    )
+                    offset += len(raw)
+            weights_hash = digest.hexdigest()
+            target = os.path.join(self.directory, weights_hash)
+            manifest_path = os.path.join(target, MANIFEST_FILE)
+            if os.path.exists(manifest_path):
+                with open(manifest_path, "r", encoding="utf-8") as handle:
+                    stored = json.load(handle).get("matrices")
+                if stored != matrices:
+                    raise ValueError(f"Weights {weights_hash} are already stored with a different layout")
+            else:
+                os.makedirs(target, exist_ok=True)
+                os.replace(tmp_path, os.path.join(target, WEIGHTS_FILE))
+                _write_json(os.path.join(target, MANIFEST_FILE), {"version": _MANIFEST_VERSION, "matrices": matrices})
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return weights_hash
+
+    def register_sku(self, sku_id: str, weights_hash: str) -> None:
+        with self._lock:
+            self.open(weights_hash)
+            skus = dict(self._read_skus())
+            skus[sku_id] = weights_hash
+            _write_json(os.path.join(self.directory, SKU_FILE), skus)
+
+    def sku_hash(self, sku_id: str) -> Optional[str]:
+        return self._read_skus().get(sku_id)
+
+    def _read_skus(self) -> Dict[str, str]:
+        """Return the SKU map, re-reading ``skus.json`` only when it changed."""
+        path = os.path.join(self.directory, SKU_FILE)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return {}
+        # skus.json is replaced atomically, so a rewrite changes the inode.
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if stamp != self._skus_stamp:
+                with open(path) as handle:
+                    self._skus = json.load(handle)
+                self._skus_stamp = stamp
+            return self._skus
+
+    def open(self, weights_hash: str) -> SkuWeights:
+        with self._lock:
+            weights = self._opened.get(weights_hash)
+            if weights is None:
+                directory = os.path.join(self.directory, weights_hash)
+                if not os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+                    raise KeyError(weights_hash)
+                weights = SkuWeights(directory, weights_hash)
+                self._opened[weights_hash] = weights
+            return weights
+
+    def verify(self, weights_hash: str) -> bool:
+        """Re-hash a stored blob and check it still matches its address."""
+        path = os.path.join(self.directory, weights_hash, WEIGHTS_FILE)
+        return hash_weights_file(path) == weights_hash
+
+    def matrix(self, weights_hash: str, layer_index: int, gemm_index: int) -> np.ndarray:
+        return self.open(weights_hash).matrix(layer_index, gemm_index)
+
+    def layout(self, weights_hash: str, layer_index: int, gemm_index: int) -> ModOperand:
+        key = (weights_hash, layer_index, gemm_index)
+        with self._lock:
+            layout = self._layouts.get(key)
+            if layout is not None:
+                self._layouts.move_to_end(key)
+                return layout
+        layout = prepare_mod_operand(self.matrix(weights_hash, layer_index, gemm_index), self.block_rows)
+        with self._lock:
+            if key not in self._layouts:
+                self._layouts[key] = layout
+                self.layout_bytes += layout.nbytes
+                while self.layout_bytes > self.layout_budget and len(self._layouts) > 1:
+                    _, evicted = self._layouts.popitem(last=False)
+                    self.layout_bytes -= evicted.nbytes
+        return layout
+
+    def matmul_mod(self, weights_hash: str, layer_index: int, gemm_index: int, rhs: Matrix) -> np.ndarray:
+        """Return ``W @ rhs mod P`` for one stored GEMM weight matrix."""
+        return mod_matmul(self.layout(weights_hash, layer_index, gemm_index), rhs)
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from chain.randomness import expand_field_vectors
+from chain.types import Challenge
+from metrics.metrics import inc
+
+from .gemm import ModOperand, prepare_mod_operand
+from .worker import BatchChallengeResponse, WorkerNode
+
+
+class ChallengeDeadlineExceeded(TimeoutError):
+    pass
+
+
+@dataclass(frozen=True)
+class ReceiptChallengeResponse:
+    receipt_id: str
+    job_id: str
+    responses: List[BatchChallengeResponse]
+    seconds: float
+
+
+class ChallengeServer:
+    """Answers whole challenges for a ``WorkerNode`` from a bounded thread pool.
+
+    ``respond`` takes a chain ``Challenge`` and answers every sampled GEMM and
+    every round in one call, using one blocked product per GEMM for W·R and
+    Y·R. At most ``max_workers`` challenges are computed at once. Waiting
+    challenges are started earliest deadline first. A challenge whose deadline
+    passes while it waits is dropped without being computed. The products run
+    in BLAS, which releases the GIL, so threads run in parallel.
+
+    Prepared weight operands are cached per job and GEMM up to
+    ``operand_budget`` bytes, so concurrent verifiers challenging the same
+    receipt split the weights only once.
+    """
+
+    def __init__(
+        self,
+        worker: WorkerNode,
+        max_workers: int = 4,
+        deadline: float = 30.0,
+        operand_budget: int = 256 << 20,
+    ) -> None:
+        if max_workers <= 0:
+            raise ValueError("max_workers must be positive")
+        self.worker = worker
+        self.max_workers = max_workers
+        self.deadline = deadline
+        self.operand_budget = operand_budget
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="challenge")
+        self._running = 0
+        self._waiting: List[Tuple[float, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._operands: "OrderedDict[Tuple[str, int, int], ModOperand]" = OrderedDict()
+        self.operand_bytes = 0
+        self._lock = threading.Lock()
+
+    async def __aenter__(self) -> "ChallengeServer":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    async def respond(
+        self,
+        challenge: Challenge,
+        job_id: str,
+        row_indices: Sequence[int],
+        deadline: Optional[float] = None,
+    ) -> ReceiptChallengeResponse:
+        """Answer ``challenge`` for ``job_id`` within ``deadline`` seconds (default: the server's).
+
+        Raises ``ChallengeDeadlineExceeded`` if the response cannot be
+        returned in time.
+        """
+        loop = asyncio.get_running_loop()
+        due = loop.time() + (self.deadline if deadline is None else deadline)
+        await self._acquire(due)
+        remaining = due - loop.time()
+        if remaining <= 0:
+            self._release()
+            inc("worker.challenges_expired")
+            raise ChallengeDeadlineExceeded(f"Challenge for {challenge.receipt_id} expired before it was scheduled")
+        work = loop.run_in_executor(self._executor, self._answer, challenge, job_id, list(row_indices))
+        # The slot is held until the computation finishes, even if the caller gives up first.
+        work.add_done_callback(lambda _: self._release())
+        try:
+            response = await asyncio.wait_for(asyncio.shield(work), remaining)
+        except asyncio.TimeoutError:
+            inc("worker.challenges_late")
+            raise ChallengeDeadlineExceeded(f"Challenge for {challenge.receipt_id} missed its deadline") from None
+        inc("worker.challenges_answered")
+        return response
+
+    async def respond_many(
+        self,
+        requests: Sequence[Tuple[Challenge, str, Sequence[int]]],
+        deadline: Optional[float] = None,
+    ) -> List[object]:
+        """Answer ``(challenge, job_id, row_indices)`` requests concurrently.
+
+        Returns responses or exceptions in request order.
+        """
+        return await asyncio.gather(
+            *(self.respond(challenge, job_id, rows, deadline) for challenge, job_id, rows in requests),
+            return_exceptions=True,
+        )
+
+    async def _acquire(self, due: float) -> None:
+        if self._running < self.max_workers and not self._waiting:
+            self._running += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (due, next(self._sequence), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before cancellation.
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        while self._waiting:
+            _, _, waiter = heapq.heappop(self._waiting)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._running -= 1
+
+    def _answer(self, challenge: Challenge, job_id: str, row_indices: List[int]) -> ReceiptChallengeResponse:
+        started = time.perf_counter()
+        r_by_cols: Dict[int, np.ndarray] = {}
+        responses = []
+        for layer_index, gemm_index in challenge.gemm_indices:
+            weights = self._operand(job_id, layer_index, gemm_index)
+            cols = weights.shape[1]
+            if cols not in r_by_cols:
+                r_by_cols[cols] = expand_field_vectors(challenge.random_vectors, cols)
+            responses.append(
+                self.worker.respond_challenge_batch(
+                    layer_index,
+                    gemm_index,
+                    r_by_cols[cols],
+                    row_indices,
+                    job_id=job_id,
+                    weights=weights,
+                    receipt_id=challenge.receipt_id,
+                    open_rows=challenge.open_rows,
+                )
+            )
+        return ReceiptChallengeResponse(
+            receipt_id=challenge.receipt_id,
+            job_id=job_id,
+            responses=responses,
+            seconds=time.perf_counter() - started,
+        )
+
+    def _operand(self, job_id: str, layer_index: int, gemm_index: int) -> ModOperand:
+        key = (job_id, layer_index, gemm_index)
+        with self._lock:
+            operand = self._operands.get(key)
+            if operand is not None:
+                self._operands.move_to_end(key)
+                return operand
+        weights = self.worker.gemm_artifact(layer_index, gemm_index, "weights", job_id)
+        operand = prepare_mod_operand(weights, self.worker.block_rows)
+        with self._lock:
+            if key not in self._operands:
+                self._operands[key] = operand
+                self.operand_bytes += operand.nbytes
+                while self.operand_bytes > self.operand_budget and len(self._operands) > 1:
+                    _, evicted = self._operands.popitem(last=False)
+                    self.operand_bytes -= evicted.nbytes
+        return operand
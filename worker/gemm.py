@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .tensor import Tensor
+
+
+Matrix = Union[Sequence[Sequence[int]], np.ndarray, Tensor]
+
+# Largest magnitudes a float mantissa represents exactly. Integer GEMMs are
+# routed through BLAS only while every partial sum stays below these bounds.
+_FLOAT32_EXACT = 1 << 24
+_FLOAT64_EXACT = 1 << 53
+_INT64_LIMIT = 1 << 63
+_MIN_FLOAT32_CHUNK = 256
+
+
+def matmul_int32(a: List[List[int]], b: List[List[int]]) -> List[List[int]]:
+    rows = len(a)
+    cols = len(b[0]) if b else 0
+    inner = len(b)
+    result = [[0 for _ in range(cols)] for _ in range(rows)]
+    for i in range(rows):
+        for k in range(inner):
+            aik = int(a[i][k])
+            for j in range(cols):
+                result[i][j] += aik * int(b[k][j])
+    return result
+
+
+def matvec_int32(matrix: List[List[int]], vector: List[int]) -> List[int]:
+    result = []
+    for row in matrix:
+        acc = 0
+        for idx, value in enumerate(row):
+            acc += int(value) * int(vector[idx])
+        result.append(acc)
+    return result
+
+
+def as_int_array(matrix: Matrix) -> Optional[np.ndarray]:
+    """Return ``matrix`` as a 2-D int64 array, or None if it does not fit int64."""
+    if isinstance(matrix, np.ndarray) and matrix.dtype.kind in "iu":
+        if matrix.dtype == np.uint64 and matrix.size and int(matrix.max()) >= _INT64_LIMIT:
+            return None
+        return np.asarray(matrix, dtype=np.int64)
+    try:
+        array = np.asarray(matrix, dtype=np.int64)
+    except (OverflowError, TypeError, ValueError):
+        return None
+    return array
+
+
+def _max_abs(array: np.ndarray) -> int:
+    if array.size == 0:
+        return 0
+    return max(abs(int(array.max())), abs(int(array.min())))
+
+
+def exact_matmul(a: np.ndarray, b: np.ndarray, block_rows: int = 256) -> Optional[np.ndarray]:
+    """Exact ``a @ b`` for int64 operands, or None if the result may overflow int64.
+
+    Rows of ``a`` are processed in tiles of ``block_rows``. The inner dimension
+    is split into chunks small enough that float32/float64 BLAS sums are exact,
+    and chunk results are accumulated in int64.
+    """
+    rows, inner = a.shape
+    cols = b.shape[1]
+    out = np.zeros((rows, cols), dtype=np.int64)
+    product = _max_abs(a) * _max_abs(b)
+    if product == 0 or inner == 0:
+        return out
+    if product * inner >= _INT64_LIMIT:
+        return None
+
+    if _FLOAT32_EXACT // product >= min(inner, _MIN_FLOAT32_CHUNK):
+        dtype, chunk = np.float32, _FLOAT32_EXACT // product
+    elif product < _FLOAT64_EXACT:
+        dtype, chunk = np.float64, _FLOAT64_EXACT // product
+    else:
+        dtype, chunk = None, inner
+    chunk = min(chunk, inner)
+
+    if dtype is None:
+        for start in range(0, rows, block_rows):
+            np.matmul(a[start : start + block_rows], b, out=out[start : start + block_rows])
+        return out
+
+    b_float = b.astype(dtype)
+    for start in range(0, rows, block_rows):
+        a_tile = a[start : start + block_rows].astype(dtype)
+        out_tile = out[start : start + block_rows]
+        for k in range(0, inner, chunk):
+            out_tile += np.matmul(a_tile[:, k : k + chunk], b_float[k : k + chunk]).astype(np.int64)
+    return out
+
+
+class GemmEngine:
+    name = "base"
+
+    def matmul(self, a: Matrix, b: Matrix) -> Matrix:
+        raise NotImplementedError
+
+    def matvec(self, matrix: Matrix, vector: Sequence[int]) -> List[int]:
+        raise NotImplementedError
+
+
+class ReferenceGemmEngine(GemmEngine):
+    name = "reference"
+
+    def matmul(self, a: Matrix, b: Matrix) -> List[List[int]]:
+        return matmul_int32(a, b)
+
+    def matvec(self, matrix: Matrix, vector: Sequence[int]) -> List[int]:
+        return matvec_int32(matrix, vector)
+
+
+class NumpyGemmEngine(GemmEngine):
+    name = "numpy"
+
+    def __init__(self, block_rows: int = 256) -> None:
+        if block_rows <= 0:
+            raise ValueError("block_rows must be positive")
+        self.block_rows = block_rows
+
+    def matmul(self, a: Matrix, b: Matrix) -> Matrix:
+        a_array = as_int_array(a)
+        b_array = as_int_array(b)
+        if a_array is not None and b_array is not None:
+            if a_array.ndim == 2 and b_array.ndim == 2 and a_array.shape[1] == b_array.shape[0]:
+                result = exact_matmul(a_array, b_array, self.block_rows)
+                if result is not None:
+                    return result
+            elif a_array.size and b_array.size:
+                raise ValueError(f"Shape mismatch for matmul: {a_array.shape} @ {b_array.shape}")
+        return matmul_int32(_as_lists(a), _as_lists(b))
+
+    def matvec(self, matrix: Matrix, vector: Sequence[int]) -> List[int]:
+        matrix_array = as_int_array(matrix)
+        vector_array = as_int_array(vector)
+        if matrix_array is not None and vector_array is not None and matrix_array.ndim == 2:
+            result = exact_matmul(matrix_array, vector_array.reshape(-1, 1), self.block_rows)
+            if result is not None:
+                return result[:, 0].tolist()
+        return matvec_int32(_as_lists(matrix), list(vector))
+
+
+def _as_lists(matrix: Matrix) -> List[List[int]]:
+    if isinstance(matrix, np.ndarray):
+        return matrix.tolist()
+    return matrix
+
+
+GEMM_ENGINES: Dict[str, type] = {
+    ReferenceGemmEngine.name: ReferenceGemmEngine,
+    NumpyGemmEngine.name: NumpyGemmEngine,
+}
+
+
+def get_gemm_engine(name: str = "numpy") -> GemmEngine:
+    if name not in GEMM_ENGINES:
+        raise ValueError(f"Unknown GEMM engine: {name}")
+    return GEMM_ENGINES[name]()
+
+
+# Freivalds checks are done modulo the Mersenne prime P = 2^61 - 1
+# (spec/deterministic_inference.md). Operands are split into signed limbs so
+# that each limb product is an exact float64 BLAS matmul; limb results are
+# recombined with shift-and-fold Mersenne reduction in uint64.
+PRIME_MODULUS = (1 << 61) - 1
+_MERSENNE_BITS = 61
+_MOD_BLOCK_INNER = 4096
+
+
+def field_operand(matrix: Matrix) -> np.ndarray:
+    """Return ``matrix`` as int64, reducing mod P only when values exceed int64."""
+    array = as_int_array(matrix)
+    if array is not None:
+        return array
+    reduced = np.vectorize(lambda value: int(value) % PRIME_MODULUS, otypes=[object])(np.asarray(matrix, dtype=object))
+    return reduced.astype(np.int64)
+
+
+def _mod_signed(values: np.ndarray) -> np.ndarray:
+    return np.mod(values, PRIME_MODULUS).astype(np.uint64)
+
+
+def to_field(matrix: Matrix) -> np.ndarray:
+    return _mod_signed(field_operand(matrix))
+
+
+def _mul_pow2(values: np.ndarray, shift: int) -> np.ndarray:
+    shift %= _MERSENNE_BITS
+    if shift == 0:
+        return values
+    low = (values << np.uint64(shift)) & np.uint64(PRIME_MODULUS)
+    return low | (values >> np.uint64(_MERSENNE_BITS - shift))
+
+
+def _add_mod(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    total = left + right
+    return np.where(total >= np.uint64(PRIME_MODULUS), total - np.uint64(PRIME_MODULUS), total)
+
+
+def _magnitude(array: np.ndarray) -> np.ndarray:
+    negative = array < 0
+    magnitude = array.astype(np.uint64)
+    magnitude[negative] = (-(array[negative] + 1)).astype(np.uint64) + np.uint64(1)
+    return magnitude
+
+
+def _signed_limbs(array: np.ndarray, width: int, count: int) -> List[np.ndarray]:
+    sign = np.where(array < 0, -1.0, 1.0)
+    magnitude = _magnitude(array)
+    mask = np.uint64((1 << width) - 1)
+    return [sign * ((magnitude >> np.uint64(width * idx)) & mask).astype(np.float64) for idx in range(count)]
+
+
+def _limb_widths(bits_a: int, bits_b: int, budget: int) -> tuple:
+    best = None
+    for width_a in range(1, budget):
+        width_b = budget - width_a
+        count_a = max(1, -(-bits_a // width_a))
+        count_b = max(1, -(-bits_b // width_b))
+        if best is None or count_a * count_b < best[0]:
+            best = (count_a * count_b, width_a, count_a, width_b, count_b)
+    return best[1:]
+
+
+def _accumulate_limbs(
+    acc: np.ndarray, a_limbs: List[np.ndarray], width_a: int, b_limbs: List[np.ndarray], width_b: int
+) -> None:
+    for idx_a, a_limb in enumerate(a_limbs):
+        for idx_b, b_limb in enumerate(b_limbs):
+            partial = _mod_signed(np.matmul(a_limb, b_limb).astype(np.int64))
+            acc[...] = _add_mod(acc, _mul_pow2(partial, width_a * idx_a + width_b * idx_b))
+
+
+def _limb_budget(inner: int) -> Tuple[int, int]:
+    chunk = min(inner, _MOD_BLOCK_INNER)
+    return chunk, 53 - max(chunk - 1, 1).bit_length()
+
+
+@dataclass(frozen=True)
+class ModOperand:
+    """Left operand of ``mod_matmul`` pre-split into float64 limb tiles.
+
+    ``tiles[row_block][inner_chunk]`` holds the limbs of that tile. Preparing a
+    matrix once lets repeated products against it skip the conversion.
+    """
+
+    shape: Tuple[int, int]
+    block_rows: int
+    chunk: int
+    width: int
+    tiles: List[List[List[np.ndarray]]]
+    nbytes: int
+
+
+def prepare_mod_operand(matrix: Matrix, block_rows: int = 256, rhs_bits: int = _MERSENNE_BITS) -> ModOperand:
+    """Split ``matrix`` for products with right-hand sides of up to ``rhs_bits`` bits."""
+    array = field_operand(matrix)
+    rows, inner = array.shape
+    bits = int(_magnitude(array).max()).bit_length() if array.size else 0
+    chunk, budget = _limb_budget(inner)
+    width, count, _, _ = _limb_widths(max(bits, 1), rhs_bits, budget)
+    tiles = [
+        [
+            _signed_limbs(array[row_start : row_start + block_rows, start : start + chunk], width, count)
+            for start in range(0, inner, max(chunk, 1))
+        ]
+        for row_start in range(0, rows, block_rows)
+    ]
+    nbytes = sum(limb.nbytes for row in tiles for limbs in row for limb in limbs)
+    return ModOperand(shape=(rows, inner), block_rows=block_rows, chunk=chunk, width=width, tiles=tiles, nbytes=nbytes)
+
+
+def _mod_matmul_prepared(a: ModOperand, b_array: np.ndarray) -> np.ndarray:
+    rows, inner = a.shape
+    if b_array.shape[0] != inner:
+        raise ValueError(f"Shape mismatch for mod_matmul: {a.shape} @ {b_array.shape}")
+    out = np.zeros((rows, b_array.shape[1]), dtype=np.uint64)
+    bits_b = int(_magnitude(b_array).max()).bit_length() if b_array.size else 0
+    if bits_b == 0 or inner == 0 or rows == 0:
+        return out
+    width_b = 53 - max(a.chunk - 1, 1).bit_length() - a.width
+    count_b = max(1, -(-bits_b // width_b))
+    b_chunks = [_signed_limbs(b_array[start : start + a.chunk], width_b, count_b) for start in range(0, inner, a.chunk)]
+    for block_idx, row_tiles in enumerate(a.tiles):
+        acc = out[block_idx * a.block_rows : (block_idx + 1) * a.block_rows]
+        for chunk_idx, a_limbs in enumerate(row_tiles):
+            _accumulate_limbs(acc, a_limbs, a.width, b_chunks[chunk_idx], width_b)
+    return out
+
+
+def mod_matmul(a: Union[Matrix, ModOperand], b: Matrix, block_rows: int = 256) -> np.ndarray:
+    """Return ``a @ b mod P`` as a uint64 array with entries in ``[0, P)``."""
+    b_array = field_operand(b)
+    if b_array.ndim == 1:
+        b_array = b_array.reshape(-1, 1)
+    if isinstance(a, ModOperand):
+        return _mod_matmul_prepared(a, b_array)
+    a_array = field_operand(a)
+    rows, inner = a_array.shape
+    if b_array.shape[0] != inner:
+        raise ValueError(f"Shape mismatch for mod_matmul: {a_array.shape} @ {b_array.shape}")
+    cols = b_array.shape[1]
+    out = np.zeros((rows, cols), dtype=np.uint64)
+    bits_a = int(_magnitude(a_array).max()).bit_length() if a_array.size else 0
+    bits_b = int(_magnitude(b_array).max()).bit_length() if b_array.size else 0
+    if bits_a == 0 or bits_b == 0 or inner == 0:
+        return out
+
+    chunk, budget = _limb_budget(inner)
+    width_a, count_a, width_b, count_b = _limb_widths(bits_a, bits_b, budget)
+    b_chunks = [
+        _signed_limbs(b_array[start : start + chunk], width_b, count_b) for start in range(0, inner, chunk)
+    ]
+    for row_start in range(0, rows, block_rows):
+        a_tile = a_array[row_start : row_start + block_rows]
+        acc = out[row_start : row_start + block_rows]
+        for chunk_idx, start in enumerate(range(0, inner, chunk)):
+            a_limbs = _signed_limbs(a_tile[:, start : start + chunk], width_a, count_a)
+            _accumulate_limbs(acc, a_limbs, width_a, b_chunks[chunk_idx], width_b)
+    return out
@@ -1,22 +1,40 @@
 from __future__ import annotations
 
+import copy
+import hashlib
 import os
+import threading
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+from metrics.metrics import inc, timed
 
-try:
-    import torch
-except ImportError as exc:  # pragma: no cover - optional dependency
-    raise ImportError("PyTorch is required for LLM hooks. Install torch.") from exc
+from .llm_cache import PrefixCache, PrefixHit
 
-try:
-    from transformers import AutoModelForCausalLM, AutoTokenizer
-except ImportError as exc:  # pragma: no cover - optional dependency
-    raise ImportError("transformers is required for LLM hooks.") from exc
 
+# torch and transformers are imported on first use so that importing this
+# module (and anything that imports it) stays cheap.
+torch: Any = None
+AutoModelForCausalLM: Any = None
+AutoTokenizer: Any = None
 
-@dataclass
+
+def _require_llm_deps() -> None:
+    global torch, AutoModelForCausalLM, AutoTokenizer
+    if torch is not None and AutoModelForCausalLM is not None:
+        return
+    try:
+        import torch as torch_module
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise ImportError("PyTorch is required for LLM hooks. Install torch.") from exc
+    try:
+        from transformers import AutoModelForCausalLM as model_cls, AutoTokenizer as tokenizer_cls
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise ImportError("transformers is required for LLM hooks.") from exc
+    torch, AutoModelForCausalLM, AutoTokenizer = torch_module, model_cls, tokenizer_cls
+
+
+@dataclass(frozen=True)
 class LLMBackendConfig:
     model_name: str
     dtype: str = "bfloat16"
@@ -24,6 +42,13 @@ class LLMBackendConfig:
     trust_remote_code: bool = True
     use_distributed: bool = False
     dist_backend: str = "nccl"
+    warmup_prompt: str = "Hello"
+    warmup_tokens: int = 1
+
+    @property
+    def load_key(self) -> tuple:
+        """Fields that determine the loaded weights; generation settings are excluded."""
+        return (self.model_name, self.dtype, self.trust_remote_code, self.use_distributed, self.dist_backend)
 
 
 def _parse_dtype(dtype: str) -> torch.dtype:
@@ -37,53 +62,181 @@ def _parse_dtype(dtype: str) -> torch.dtype:
 
 
 def init_distributed(backend: str = "nccl", init_method: str = "env://") -> None:
+    _require_llm_deps()
     if torch.distributed.is_available() and not torch.distributed.is_initialized():
         torch.distributed.init_process_group(backend=backend, init_method=init_method)
 
 
 def get_rank() -> int:
+    _require_llm_deps()
     if torch.distributed.is_available() and torch.distributed.is_initialized():
         return torch.distributed.get_rank()
     return 0
 
 
 def get_world_size() -> int:
+    _require_llm_deps()
     if torch.distributed.is_available() and torch.distributed.is_initialized():
         return torch.distributed.get_world_size()
     return 1
 
 
+def _legacy_cache(past_key_values) -> tuple:
+    if hasattr(past_key_values, "to_legacy_cache"):
+        return past_key_values.to_legacy_cache()
+    return past_key_values
+
+
+def cache_nbytes(past_key_values) -> int:
+    # Newer transformers caches yield (keys, values, sliding_window) per layer, with None for unused slots.
+    return sum(
+        tensor.numel() * tensor.element_size()
+        for layer in _legacy_cache(past_key_values)
+        for tensor in layer
+        if tensor is not None
+    )
+
+
+def _expand_cache(past_key_values, batch_size: int):
+    """Return an independent copy of a single-sequence cache repeated ``batch_size`` times."""
+    cache = copy.deepcopy(past_key_values)
+    if batch_size == 1:
+        return cache
+    if hasattr(cache, "batch_repeat_interleave"):
+        cache.batch_repeat_interleave(batch_size)
+        return cache
+    return tuple(tuple(tensor.repeat_interleave(batch_size, dim=0) for tensor in layer) for layer in cache)
+
+
+def hash_state_dict(model: Any) -> str:
+    """SHA-256 of the weights actually loaded: every state_dict entry in name order.
+
+    Each entry contributes ``name:dtype:shape`` followed by its raw bytes, so
+    the hash changes with any weight, dtype or layout change, not only with the
+    model name.
+    """
+    import torch  # a loaded model implies torch; transformers is not needed here
+
+    digest = hashlib.sha256()
+    for name, tensor in sorted(model.state_dict().items()):
+        data = tensor.detach().contiguous().cpu()
+        digest.update(f"{name}:{data.dtype}:{tuple(data.shape)}\n".encode("utf-8"))
+        digest.update(data.reshape(-1).view(torch.uint8).numpy())
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    tokenizer: Any
+    model: Any
+    weights_hash: str
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded models keyed by ``LLMBackendConfig.load_key``.
+
+    Each model is loaded once and warmed up, then shared read-only (eval mode,
+    no gradients) by every backend in the process. Loads of different models
+    run concurrently; concurrent requests for the same model wait for the
+    first load.
+    """
+
+    def __init__(self) -> None:
+        self._models: Dict[tuple, LoadedModel] = {}
+        self._locks: Dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, config: LLMBackendConfig) -> bool:
+        return config.load_key in self._models
+
+    def get(self, config: LLMBackendConfig) -> Tuple[Any, Any]:
+        loaded = self.loaded(config)
+        return loaded.tokenizer, loaded.model
+
+    def loaded(self, config: LLMBackendConfig) -> LoadedModel:
+        key = config.load_key
+        loaded = self._models.get(key)
+        if loaded is None:
+            with self._lock:
+                key_lock = self._locks.setdefault(key, threading.Lock())
+            with key_lock:
+                loaded = self._models.get(key)
+                if loaded is None:
+                    loaded = _load_model(config)
+                    self._models[key] = loaded
+        return loaded
+
+    def evict(self, config: LLMBackendConfig) -> None:
+        with self._lock:
+            self._models.pop(config.load_key, None)
+            self._locks.pop(config.load_key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self._locks.clear()
+
+
+def _load_model(config: LLMBackendConfig) -> LoadedModel:
+    _require_llm_deps()
+    if config.use_distributed:
+        init_distributed(backend=config.dist_backend)
+
+    dtype = _parse_dtype(config.dtype)
+    world_size = get_world_size()
+    device_map = "auto" if world_size > 1 else None
+
+    tokenizer = AutoTokenizer.from_pretrained(config.model_name, trust_remote_code=config.trust_remote_code)
+    # safetensors checkpoints are memory-mapped; low_cpu_mem_usage skips the
+    # random initialization and copies tensors straight from the mapping.
+    model = AutoModelForCausalLM.from_pretrained(
+        config.model_name,
+        torch_dtype=dtype,
+        device_map=device_map,
+        trust_remote_code=config.trust_remote_code,
+        low_cpu_mem_usage=True,
+    )
+
+    if device_map is None:
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        model.to(device)
+
+    model.eval()
+    model.requires_grad_(False)
+
+    if config.warmup_tokens > 0:
+        inputs = tokenizer([config.warmup_prompt], return_tensors="pt")
+        with torch.inference_mode():
+            model.generate(
+                input_ids=inputs["input_ids"].to(model.device),
+                attention_mask=inputs["attention_mask"].to(model.device),
+                max_new_tokens=config.warmup_tokens,
+                do_sample=False,
+            )
+    return LoadedModel(tokenizer=tokenizer, model=model, weights_hash=hash_state_dict(model))
+
+
+MODEL_REGISTRY = ModelRegistry()
+
+
 class LLMBackend:
-    def __init__(self, config: LLMBackendConfig) -> None:
+    def __init__(self, config: LLMBackendConfig, prefix_cache: Optional[PrefixCache] = None) -> None:
         self.config = config
         self.tokenizer = None
         self.model = None
+        self.prefix_cache = prefix_cache
+        # Content hash of the loaded weights (``hash_state_dict``), set by ``load``.
+        self.model_hash: Optional[str] = None
 
     def load(self) -> None:
-        if self.config.use_distributed:
-            init_distributed(backend=self.config.dist_backend)
-
-        dtype = _parse_dtype(self.config.dtype)
-        world_size = get_world_size()
-        device_map = "auto" if world_size > 1 else None
-
-        self.tokenizer = AutoTokenizer.from_pretrained(self.config.model_name, trust_remote_code=self.config.trust_remote_code)
-        self.model = AutoModelForCausalLM.from_pretrained(
-            self.config.model_name,
-            torch_dtype=dtype,
-            device_map=device_map,
-            trust_remote_code=self.config.trust_remote_code,
-        )
-
-        if device_map is None:
-            device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            self.model.to(device)
-
-        self.model.eval()
+        loaded = MODEL_REGISTRY.loaded(self.config)
+        self.tokenizer, self.model, self.model_hash = loaded.tokenizer, loaded.model, loaded.weights_hash
 
+    @timed("llm.generate")
     def generate(self, prompts: List[str]) -> List[str]:
         if self.model is None or self.tokenizer is None:
             raise RuntimeError("LLMBackend.load() must be called before generate().")
+        inc("llm.prompts", len(prompts))
 
         inputs = self.tokenizer(prompts, return_tensors="pt", padding=True)
         input_ids = inputs["input_ids"]
@@ -110,8 +263,109 @@ class LLMBackend:
 
         return self.tokenizer.batch_decode(output_ids, skip_special_tokens=True)
 
+    def tokenize(self, prompts: List[str]) -> List[List[int]]:
+        if self.tokenizer is None:
+            raise RuntimeError("LLMBackend.load() must be called before tokenize().")
+        return self.tokenizer(prompts, padding=False)["input_ids"]
+
+    def _device(self) -> torch.device:
+        device = getattr(self.model, "device", None)
+        return device if device is not None else torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    def _pad_id(self) -> int:
+        if self.tokenizer.pad_token_id is not None:
+            return self.tokenizer.pad_token_id
+        return self.tokenizer.eos_token_id if self.tokenizer.eos_token_id is not None else 0
+
+    @timed("llm.cache_prefix")
+    def cache_prefix(self, token_ids: List[int]) -> int:
+        """Prefill ``token_ids`` (truncated to the cache's block size) into the prefix cache."""
+        if self.model is None or self.prefix_cache is None:
+            return 0
+        length = self.prefix_cache.aligned(len(token_ids))
+        if length == 0 or self.prefix_cache.contains(self.model_hash, token_ids[:length]):
+            return length
+        input_ids = torch.tensor([token_ids[:length]], dtype=torch.long, device=self._device())
+        with torch.inference_mode():
+            past_key_values = self.model(input_ids=input_ids, use_cache=True).past_key_values
+        self.prefix_cache.insert(self.model_hash, token_ids[:length], past_key_values, cache_nbytes(past_key_values))
+        return length
+
+    @timed("llm.generate_ids")
+    def generate_ids(self, batch: List[List[int]], use_prefix_cache: bool = True) -> List[str]:
+        """Generate for pre-tokenized prompts.
+
+        Prompts with a cached prefix only prefill their suffix; prompts of equal
+        length sharing a prefix run as one batch over a copy of its state.
+        The rest are left-padded only to this batch's longest prompt.
+        """
+        if self.model is None or self.tokenizer is None:
+            raise RuntimeError("LLMBackend.load() must be called before generate_ids().")
+        inc("llm.prompts", len(batch))
+        if self.prefix_cache is None or not use_prefix_cache:
+            return self._generate_padded(batch)
+
+        outputs: List[Optional[str]] = [None] * len(batch)
+        groups: Dict[Tuple[bytes, int], Tuple[PrefixHit, List[int]]] = {}
+        misses: List[int] = []
+        for row, ids in enumerate(batch):
+            # At least one prompt token must remain to produce the first logits.
+            hit = self.prefix_cache.lookup(self.model_hash, ids, max_length=len(ids) - 1)
+            if hit is None:
+                misses.append(row)
+            else:
+                groups.setdefault((hit.key, len(ids)), (hit, []))[1].append(row)
+        if misses:
+            for row, text in zip(misses, self._generate_padded([batch[row] for row in misses])):
+                outputs[row] = text
+        for hit, rows in groups.values():
+            input_ids = torch.tensor([batch[row] for row in rows], dtype=torch.long, device=self._device())
+            with torch.inference_mode():
+                output_ids = self.model.generate(
+                    input_ids=input_ids,
+                    attention_mask=torch.ones_like(input_ids),
+                    past_key_values=_expand_cache(hit.value, len(rows)),
+                    max_new_tokens=self.config.max_new_tokens,
+                    do_sample=False,
+                    temperature=0.0,
+                    pad_token_id=self._pad_id(),
+                )
+            for row, text in zip(rows, self.tokenizer.batch_decode(output_ids, skip_special_tokens=True)):
+                outputs[row] = text
+        return outputs
+
+    def _generate_padded(self, batch: List[List[int]]) -> List[str]:
+        if not batch:
+            return []
+        pad_id = self._pad_id()
+        longest = max(len(ids) for ids in batch)
+        input_ids = torch.full((len(batch), longest), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(batch), longest), dtype=torch.long)
+        for row, ids in enumerate(batch):
+            if ids:
+                input_ids[row, longest - len(ids) :] = torch.tensor(ids, dtype=torch.long)
+                attention_mask[row, longest - len(ids) :] = 1
+
+        device = self._device()
+        with torch.inference_mode():
+            output_ids = self.model.generate(
+                input_ids=input_ids.to(device),
+                attention_mask=attention_mask.to(device),
+                max_new_tokens=self.config.max_new_tokens,
+                do_sample=False,
+                temperature=0.0,
+                pad_token_id=pad_id,
+            )
+
+        # Drop the left padding so decoded text matches generate() on the unpadded prompt.
+        return [
+            self.tokenizer.decode(output_ids[row, longest - len(ids) :], skip_special_tokens=True)
+            for row, ids in enumerate(batch)
+        ]
+
 
 def build_backend_from_env() -> LLMBackend:
+    _require_llm_deps()
     model_name = os.getenv("MODEL_NAME", "Qwen/Qwen2.5-0.5B")
     dtype = os.getenv("MODEL_DTYPE", "bfloat16")
     max_new_tokens = int(os.getenv("MAX_NEW_TOKENS", "32"))
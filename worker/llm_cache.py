@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import hashlib
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence
+
+
+_TOKEN = struct.Struct("<q")
+
+
+@dataclass(frozen=True)
+class PrefixHit:
+    length: int
+    key: bytes
+    value: Any
+
+
+def common_prefix_length(sequences: Sequence[Sequence[int]]) -> int:
+    if not sequences:
+        return 0
+    first = sequences[0]
+    length = min(len(seq) for seq in sequences)
+    for seq in sequences[1:]:
+        idx = 0
+        while idx < length and seq[idx] == first[idx]:
+            idx += 1
+        length = idx
+    return length
+
+
+class PrefixCache:
+    """LRU cache of attention state for token-ID prefixes, bounded by bytes.
+
+    Prefixes are cached at multiples of ``block_tokens``. Each block's key
+    chains the previous key with the block's token IDs and starts from the
+    model hash, so finding the longest cached prefix of a prompt costs one
+    pass over its tokens.
+    """
+
+    def __init__(self, byte_budget: int = 1 << 30, block_tokens: int = 16) -> None:
+        if block_tokens <= 0:
+            raise ValueError("block_tokens must be positive")
+        self.byte_budget = byte_budget
+        self.block_tokens = block_tokens
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def aligned(self, length: int) -> int:
+        return length - length % self.block_tokens
+
+    def block_keys(self, model_hash: str, token_ids: Sequence[int]) -> List[bytes]:
+        """Keys of every block-aligned prefix of ``token_ids``, shortest first."""
+        keys = []
+        key = hashlib.sha256(model_hash.encode("utf-8")).digest()
+        for end in range(self.block_tokens, len(token_ids) + 1, self.block_tokens):
+            block = b"".join(_TOKEN.pack(int(token)) for token in token_ids[end - self.block_tokens : end])
+            key = hashlib.sha256(key + block).digest()
+            keys.append(key)
+        return keys
+
+    def lookup(self, model_hash: str, token_ids: Sequence[int], max_length: Optional[int] = None) -> Optional[PrefixHit]:
+        limit = len(token_ids) if max_length is None else min(max_length, len(token_ids))
+        keys = self.block_keys(model_hash, token_ids[: self.aligned(max(limit, 0))])
+        with self._lock:
+            for idx in range(len(keys) - 1, -1, -1):
+                entry = self._entries.get(keys[idx])
+                if entry is not None:
+                    self._entries.move_to_end(keys[idx])
+                    self.hits += 1
+                    return PrefixHit(length=(idx + 1) * self.block_tokens, key=keys[idx], value=entry[0])
+            self.misses += 1
+            return None
+
+    def contains(self, model_hash: str, token_ids: Sequence[int]) -> bool:
+        keys = self.block_keys(model_hash, token_ids[: self.aligned(len(token_ids))])
+        with self._lock:
+            return bool(keys) and keys[-1] in self._entries
+
+    def insert(self, model_hash: str, token_ids: Sequence[int], value: Any, nbytes: int) -> None:
+        """Cache ``value`` as the state after ``token_ids``, which must be block-aligned."""
+        if len(token_ids) == 0 or len(token_ids) % self.block_tokens:
+            raise ValueError("Cached prefixes must be a positive multiple of block_tokens")
+        if nbytes > self.byte_budget:
+            return
+        key = self.block_keys(model_hash, token_ids)[-1]
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[1]
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.byte_budget:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
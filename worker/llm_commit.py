@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import queue
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from chain.types import GemmCommitment
+
+from .merkle import NODE_SIZE, FlatMerkleTree, hash_rows, serialize_matrix
+
+
+# Spec GEMM order per layer (spec/deterministic_inference.md) and the linear
+# modules each one is captured from. ``A @ V`` has no module of its own; it is
+# the input of the attention output projection.
+GEMM_QKV = 0
+GEMM_ATTN_VALUE = 1
+GEMM_MLP_IN = 2
+GEMM_MLP_OUT = 3
+
+_OUTPUT_HOOKS: Dict[str, Tuple[int, int, int]] = {
+    # module name: (gemm index, part, part count)
+    "q_proj": (GEMM_QKV, 0, 3),
+    "k_proj": (GEMM_QKV, 1, 3),
+    "v_proj": (GEMM_QKV, 2, 3),
+    "gate_proj": (GEMM_MLP_IN, 0, 2),
+    "up_proj": (GEMM_MLP_IN, 1, 2),
+    "down_proj": (GEMM_MLP_OUT, 0, 1),
+}
+_INPUT_HOOKS: Dict[str, Tuple[int, int, int]] = {
+    "o_proj": (GEMM_ATTN_VALUE, 0, 1),
+}
+_LAYER_MODULE = re.compile(r"(?:^|\.)layers\.(\d+)\.(?:self_attn|mlp)\.(\w+)$")
+
+DEFAULT_ACTIVATION_SCALE = 1 << 8
+_INT32_MIN = -(1 << 31)
+_INT32_MAX = (1 << 31) - 1
+
+
+def quantize_activation(tensor: Any, scale: int = DEFAULT_ACTIVATION_SCALE) -> np.ndarray:
+    """Round ``tensor * scale`` to int32 (saturating) as a 2-D ``(rows, features)`` host array."""
+    import torch  # only reached from hooks on a loaded torch model
+
+    quantized = (tensor.detach().double() * scale).round_().clamp_(_INT32_MIN, _INT32_MAX)
+    return quantized.to(torch.int32).reshape(-1, tensor.shape[-1]).cpu().numpy()
+
+
+class _GemmLeaves:
+    def __init__(self) -> None:
+        self.rows = 0
+        self.leaves = bytearray()
+
+    def append(self, rows: np.ndarray) -> None:
+        serialized = serialize_matrix(rows, start_index=self.rows)
+        count = serialized.shape[0]
+        start = len(self.leaves)
+        self.leaves.extend(bytes(count * NODE_SIZE))
+        hash_rows(serialized, memoryview(self.leaves)[start:], max_workers=1)
+        self.rows += count
+
+
+@dataclass(frozen=True)
+class CaptureStats:
+    captures: int
+    rows: int
+    capture_seconds: float
+    hash_seconds: float
+
+
+class CommitmentStream:
+    """Hashes captured GEMM outputs into per-GEMM Merkle leaves on a background thread.
+
+    ``submit`` hands off a quantized block and returns; the block is released
+    once its rows are hashed. Only 32-byte leaf hashes are kept per row. The
+    queue is bounded by ``max_pending`` blocks, so capture applies
+    backpressure instead of buffering activations without limit.
+    """
+
+    def __init__(self, max_pending: int = 8) -> None:
+        self._queue: "queue.Queue[Optional[Tuple[int, int, np.ndarray]]]" = queue.Queue(maxsize=max_pending)
+        self._gemms: Dict[Tuple[int, int], _GemmLeaves] = {}
+        self._error: Optional[BaseException] = None
+        self.captures = 0
+        self.capture_seconds = 0.0
+        self.hash_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name="gemm-commit", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue
+            started = time.perf_counter()
+            layer_index, gemm_index, rows = item
+            try:
+                self._gemms.setdefault((layer_index, gemm_index), _GemmLeaves()).append(rows)
+            except BaseException as exc:  # surfaced by finish()
+                self._error = exc
+            self.hash_seconds += time.perf_counter() - started
+
+    def submit(self, layer_index: int, gemm_index: int, rows: np.ndarray) -> None:
+        self.captures += 1
+        self._queue.put((layer_index, gemm_index, rows))
+
+    def finish(self) -> List[GemmCommitment]:
+        """Wait for pending blocks and return commitments in spec order."""
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return [
+            GemmCommitment(
+                layer_index=layer_index,
+                gemm_index=gemm_index,
+                merkle_root=FlatMerkleTree.from_leaf_hashes(self._gemms[(layer_index, gemm_index)].leaves).root(),
+            )
+            for layer_index, gemm_index in sorted(self._gemms)
+        ]
+
+    def leaves(self, layer_index: int, gemm_index: int) -> bytes:
+        return bytes(self._gemms[(layer_index, gemm_index)].leaves)
+
+    def stats(self) -> CaptureStats:
+        return CaptureStats(
+            captures=self.captures,
+            rows=sum(gemm.rows for gemm in self._gemms.values()),
+            capture_seconds=self.capture_seconds,
+            hash_seconds=self.hash_seconds,
+        )
+
+
+class GemmCaptureHooks:
+    """Forward hooks that stream a decoder's spec-ordered GEMMs into a ``CommitmentStream``.
+
+    Works with Llama/Qwen-style modules (``layers.N.self_attn.{q,k,v,o}_proj``
+    and ``layers.N.mlp.{gate,up,down}_proj``). Split projections are
+    concatenated along the feature axis in spec order (q|k|v, gate|up) before
+    hashing. Only quantization and the host copy run on the inference thread.
+    """
+
+    def __init__(self, model: Any, stream: CommitmentStream, scale: int = DEFAULT_ACTIVATION_SCALE) -> None:
+        self.model = model
+        self.stream = stream
+        self.scale = scale
+        self._handles: List[Any] = []
+        self._parts: Dict[Tuple[int, int], List[Optional[np.ndarray]]] = {}
+
+    def __enter__(self) -> "GemmCaptureHooks":
+        self.install()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.remove()
+
+    def install(self) -> None:
+        for name, module in self.model.named_modules():
+            match = _LAYER_MODULE.search(name)
+            if match is None:
+                continue
+            layer_index, leaf = int(match.group(1)), match.group(2)
+            if leaf in _OUTPUT_HOOKS:
+                hook = self._output_hook(layer_index, *_OUTPUT_HOOKS[leaf])
+                self._handles.append(module.register_forward_hook(hook))
+            elif leaf in _INPUT_HOOKS:
+                hook = self._input_hook(layer_index, *_INPUT_HOOKS[leaf])
+                self._handles.append(module.register_forward_pre_hook(hook))
+        if not self._handles:
+            raise ValueError("Model has no recognised decoder projection modules")
+
+    def remove(self) -> None:
+        for handle in self._handles:
+            handle.remove()
+        self._handles = []
+        self._parts.clear()
+
+    def _capture(self, layer_index: int, gemm_index: int, part: int, count: int, tensor: Any) -> None:
+        started = time.perf_counter()
+        rows = quantize_activation(tensor, self.scale)
+        if count == 1:
+            self.stream.submit(layer_index, gemm_index, rows)
+        else:
+            parts = self._parts.setdefault((layer_index, gemm_index), [None] * count)
+            parts[part] = rows
+            if all(piece is not None for piece in parts):
+                del self._parts[(layer_index, gemm_index)]
+                self.stream.submit(layer_index, gemm_index, np.concatenate(parts, axis=1))
+        self.stream.capture_seconds += time.perf_counter() - started
+
+    def _output_hook(self, layer_index: int, gemm_index: int, part: int, count: int):
+        def hook(module, inputs, output):
+            self._capture(layer_index, gemm_index, part, count, output)
+
+        return hook
+
+    def _input_hook(self, layer_index: int, gemm_index: int, part: int, count: int):
+        def hook(module, inputs):
+            self._capture(layer_index, gemm_index, part, count, inputs[0])
+
+        return hook
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import bisect
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class ScheduledPrompt:
+    job_id: str
+    index: int
+    token_ids: Tuple[int, ...]
+
+
+@dataclass
+class SchedulerStats:
+    batches: int = 0
+    prompt_tokens: int = 0
+    padding_tokens: int = 0
+
+    @property
+    def padding_ratio(self) -> float:
+        total = self.prompt_tokens + self.padding_tokens
+        return self.padding_tokens / total if total else 0.0
+
+
+# Bucket upper bounds in prompt tokens. Prompts are only batched with others
+# from the same bucket, so padding stays under 2x the shortest prompt.
+DEFAULT_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+class BatchScheduler:
+    """Length-bucketed batching of prompts from many jobs.
+
+    Prompts are queued into buckets by token length. ``batches`` drains the
+    buckets, sorting each by length and packing batches greedily so that
+    ``batch_size * (longest prompt + max_new_tokens)`` stays within
+    ``token_budget``. Each prompt keeps its ``(job_id, index)`` so results can
+    be routed back to their job.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 8192,
+        max_batch_size: int = 64,
+        max_new_tokens: int = 0,
+        buckets: Sequence[int] = DEFAULT_BUCKETS,
+    ) -> None:
+        if token_budget <= 0 or max_batch_size <= 0:
+            raise ValueError("token_budget and max_batch_size must be positive")
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+        self.max_new_tokens = max_new_tokens
+        self.bounds = sorted(buckets)
+        self._buckets: Dict[int, List[ScheduledPrompt]] = {}
+        self.stats = SchedulerStats()
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    def submit(self, job_id: str, token_ids: Sequence[Sequence[int]]) -> None:
+        for index, ids in enumerate(token_ids):
+            prompt = ScheduledPrompt(job_id=job_id, index=index, token_ids=tuple(ids))
+            slot = bisect.bisect_left(self.bounds, len(prompt.token_ids))
+            self._buckets.setdefault(slot, []).append(prompt)
+
+    def _cost(self, count: int, longest: int) -> int:
+        return count * (longest + self.max_new_tokens)
+
+    def batches(self) -> Iterator[List[ScheduledPrompt]]:
+        """Drain all queued prompts as packed batches, shortest buckets first."""
+        for slot in sorted(self._buckets):
+            pending = sorted(self._buckets.pop(slot), key=lambda prompt: len(prompt.token_ids))
+            batch: List[ScheduledPrompt] = []
+            for prompt in pending:
+                longest = len(prompt.token_ids)
+                if batch and (
+                    len(batch) >= self.max_batch_size or self._cost(len(batch) + 1, longest) > self.token_budget
+                ):
+                    yield self._emit(batch)
+                    batch = []
+                batch.append(prompt)
+            if batch:
+                yield self._emit(batch)
+
+    def _emit(self, batch: List[ScheduledPrompt]) -> List[ScheduledPrompt]:
+        longest = max(len(prompt.token_ids) for prompt in batch)
+        real = sum(len(prompt.token_ids) for prompt in batch)
+        self.stats.batches += 1
+        self.stats.prompt_tokens += real
+        self.stats.padding_tokens += longest * len(batch) - real
+        return batch
+
+
+def run_batched(
+    scheduler: BatchScheduler,
+    jobs: Sequence[Tuple[str, Sequence[Sequence[int]]]],
+    generate: Callable[[List[List[int]]], List[str]],
+) -> Dict[str, List[str]]:
+    """Schedule every job's prompts, run ``generate`` per batch and regroup the outputs by job."""
+    results: Dict[str, List[str]] = {}
+    for job_id, token_ids in jobs:
+        if job_id in results:
+            raise ValueError(f"Duplicate job id in batch: {job_id}")
+        results[job_id] = [""] * len(token_ids)
+        scheduler.submit(job_id, token_ids)
+    for batch in scheduler.batches():
+        outputs = generate([list(prompt.token_ids) for prompt in batch])
+        if len(outputs) != len(batch):
+            raise RuntimeError(f"Backend returned {len(outputs)} outputs for a batch of {len(batch)}")
+        for prompt, output in zip(batch, outputs):
+            results[prompt.job_id][prompt.index] = output
+    return results
@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import functools
+import time
 from dataclasses import dataclass
-from typing import List
+from typing import List, Mapping, Optional, Sequence, Tuple
+
+from chain.types import EMPTY_ROOT, Receipt
 
 from .llm_backend import LLMBackend, LLMBackendConfig
+from .llm_cache import PrefixCache, common_prefix_length
+from .llm_commit import DEFAULT_ACTIVATION_SCALE, CaptureStats, CommitmentStream, GemmCaptureHooks
+from .llm_scheduler import BatchScheduler, SchedulerStats, run_batched
 
 
 @dataclass(frozen=True)
@@ -20,11 +27,82 @@ class LLMOutput:
 
 
 class LLMWorkerNode:
-    def __init__(self, pubkey: str, backend_config: LLMBackendConfig) -> None:
+    def __init__(
+        self,
+        pubkey: str,
+        backend_config: LLMBackendConfig,
+        token_budget: int = 8192,
+        max_batch_size: int = 64,
+        prefix_cache: Optional[PrefixCache] = None,
+        min_prefix_tokens: int = 32,
+        sku_models: Optional[Mapping[str, str]] = None,
+    ) -> None:
         self.pubkey = pubkey
-        self.backend = LLMBackend(backend_config)
+        self.sku_models = dict(sku_models) if sku_models is not None else None
+        self.backend = LLMBackend(backend_config, prefix_cache=prefix_cache)
+        self.min_prefix_tokens = min_prefix_tokens
         self.backend.load()
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+        self.last_stats: Optional[SchedulerStats] = None
+        self.last_capture: Optional[CaptureStats] = None
+        self.last_capture_overhead = 0.0
 
     def run_job(self, job: LLMJob) -> LLMOutput:
-        responses = self.backend.generate(job.prompts)
-        return LLMOutput(responses=responses)
+        return self.run_jobs([job])[0]
+
+    def run_job_with_receipt(
+        self, job: LLMJob, activation_scale: int = DEFAULT_ACTIVATION_SCALE
+    ) -> Tuple[LLMOutput, Receipt]:
+        """Run ``job`` with GEMM capture hooks and return its output and commitment receipt.
+
+        The prefix cache is bypassed so every GEMM row of the job is computed
+        and committed. ``last_capture_overhead`` is the share of wall time
+        spent in the hooks on the inference thread.
+
+        With ``sku_models`` (SKU id -> ``hash_state_dict`` of its weights), a
+        receipt is only issued if the loaded weights are the SKU's weights.
+        """
+        if self.sku_models is not None and self.sku_models.get(job.sku_id) != self.backend.model_hash:
+            raise ValueError(f"Loaded weights {self.backend.model_hash} are not registered for SKU {job.sku_id}")
+        stream = CommitmentStream()
+        started = time.perf_counter()
+        try:
+            with GemmCaptureHooks(self.backend.model, stream, scale=activation_scale):
+                output = self._run([job], use_prefix_cache=False)[0]
+        finally:
+            commitments = stream.finish()
+        elapsed = time.perf_counter() - started
+        self.last_capture = stream.stats()
+        self.last_capture_overhead = self.last_capture.capture_seconds / elapsed if elapsed > 0 else 0.0
+        receipt = Receipt(
+            worker_pubkey=self.pubkey,
+            job_id=job.job_id,
+            shard_id=job.shard_id,
+            sku_id=job.sku_id,
+            output_root=commitments[-1].merkle_root if commitments else EMPTY_ROOT,
+            gemm_commitments=commitments,
+        )
+        return output, receipt
+
+    def run_jobs(self, jobs: Sequence[LLMJob]) -> List[LLMOutput]:
+        return self._run(jobs, use_prefix_cache=True)
+
+    def _run(self, jobs: Sequence[LLMJob], use_prefix_cache: bool) -> List[LLMOutput]:
+        """Run several jobs through one length-bucketed batch schedule."""
+        scheduler = BatchScheduler(
+            token_budget=self.token_budget,
+            max_batch_size=self.max_batch_size,
+            max_new_tokens=self.backend.config.max_new_tokens,
+        )
+        tokenized = [(job.job_id, self.backend.tokenize(job.prompts)) for job in jobs]
+        if self.backend.prefix_cache is not None and use_prefix_cache:
+            for _, token_ids in tokenized:
+                # Cache the prefix a job's prompts share, keeping one token of each prompt uncached.
+                shared = common_prefix_length(token_ids)
+                if len(token_ids) > 1 and shared >= self.min_prefix_tokens:
+                    self.backend.cache_prefix(token_ids[0][: min(shared, min(len(ids) for ids in token_ids) - 1)])
+        generate = functools.partial(self.backend.generate_ids, use_prefix_cache=use_prefix_cache)
+        results = run_batched(scheduler, tokenized, generate)
+        self.last_stats = scheduler.stats
+        return [LLMOutput(responses=results[job.job_id]) for job in jobs]
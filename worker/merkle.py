@@ -1,5 +1,22 @@
 import hashlib
-from typing import List, Tuple
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from chain.types import EMPTY_ROOT
+from metrics.metrics import timed
+
+
+NODE_SIZE = 32
+# hashlib only releases the GIL for inputs larger than 2047 bytes, so smaller
+# leaves are hashed inline rather than on the thread pool.
+_PARALLEL_MIN_BYTES = 2048
+_PARALLEL_MIN_CHUNK_BYTES = 1 << 20
+_pools: Dict[int, ThreadPoolExecutor] = {}
 
 
 def _hash(data: bytes) -> bytes:
@@ -7,13 +24,35 @@ def _hash(data: bytes) -> bytes:
 
 
 def serialize_row(row_index: int, row_values: List[int]) -> bytes:
-    data = row_index.to_bytes(4, "little", signed=False)
-    for value in row_values:
-        data += int(value).to_bytes(4, "little", signed=True)
-    return data
+    prefix = row_index.to_bytes(4, "little", signed=False)
+    return prefix + b"".join(int(value).to_bytes(4, "little", signed=True) for value in row_values)
+
+
+def serialize_matrix(matrix: Union[Sequence[Sequence[int]], np.ndarray], start_index: int = 0) -> np.ndarray:
+    """Serialize all rows at once into a contiguous ``(T, N + 1)`` little-endian int32 buffer.
+
+    Row ``i`` of the result has the same bytes as ``serialize_row(start_index + i, matrix[i])``.
+    """
+    values = np.asarray(matrix)
+    if values.ndim != 2:
+        if values.size == 0:
+            values = values.reshape(len(values), 0)
+        else:
+            raise ValueError("Merkle rows must have a fixed length")
+    if values.size and values.dtype.kind not in "iu":
+        values = values.astype(np.int64)
+    if values.size and (values.min() < -(1 << 31) or values.max() >= (1 << 31)):
+        raise OverflowError("row value does not fit in int32")
+    if start_index < 0 or start_index + len(values) > (1 << 32):
+        raise OverflowError("row index does not fit in uint32")
+    buffer = np.empty((values.shape[0], values.shape[1] + 1), dtype="<i4")
+    buffer[:, 0] = np.arange(start_index, start_index + values.shape[0], dtype="<u4").view("<i4")
+    buffer[:, 1:] = values
+    return buffer
 
 
 class MerkleTree:
+    @timed("merkle.build")
     def __init__(self, rows: List[List[int]]) -> None:
         self.rows = rows
         self.leaves = [_hash(serialize_row(idx, row)) for idx, row in enumerate(rows)]
@@ -32,20 +71,25 @@ class MerkleTree:
             level = next_level
 
     def root(self) -> str:
-        if not self.levels:
-            return ""
+        if not self.leaves:
+            return EMPTY_ROOT
         return self.levels[-1][0].hex()
 
+    @timed("merkle.proof")
     def get_proof(self, index: int) -> List[str]:
         proof = []
         idx = index
         for level in self.levels[:-1]:
             sibling = idx + 1 if idx % 2 == 0 else idx - 1
-            if sibling < len(level):
-                proof.append(level[sibling].hex())
+            # A lone last node is paired with itself, as in _build.
+            proof.append(level[min(sibling, len(level) - 1)].hex())
             idx //= 2
         return proof
 
+    @timed("merkle.multiproof")
+    def get_multiproof(self, indices: Iterable[int]) -> List[str]:
+        return _multiproof_siblings(lambda level, idx: self.levels[level][idx], len(self.leaves), indices)
+
 
 def verify_proof(row_index: int, row_values: List[int], proof: List[str], root: str) -> bool:
     computed = _hash(serialize_row(row_index, row_values))
@@ -58,3 +102,263 @@ def verify_proof(row_index: int, row_values: List[int], proof: List[str], root:
             computed = _hash(sibling + computed)
         idx //= 2
     return computed.hex() == root
+
+
+def _hash_pool(max_workers: int) -> ThreadPoolExecutor:
+    pool = _pools.get(max_workers)
+    if pool is None:
+        pool = _pools.setdefault(max_workers, ThreadPoolExecutor(max_workers=max_workers))
+    return pool
+
+
+def _level_sizes(leaf_count: int) -> List[int]:
+    sizes = [leaf_count]
+    while sizes[-1] > 1:
+        sizes.append((sizes[-1] + 1) // 2)
+    return sizes
+
+
+def hash_rows(serialized: np.ndarray, out: memoryview, max_workers: Optional[int] = None) -> None:
+    """Write ``sha256`` of every serialized row into ``out`` (32 bytes per row)."""
+    rows = serialized.shape[0]
+    row_bytes = serialized.shape[1] * 4
+    data = memoryview(np.ascontiguousarray(serialized)).cast("B")
+
+    def hash_range(start: int, stop: int) -> None:
+        for idx in range(start, stop):
+            offset = idx * row_bytes
+            out[idx * NODE_SIZE : (idx + 1) * NODE_SIZE] = hashlib.sha256(data[offset : offset + row_bytes]).digest()
+
+    workers = max_workers or os.cpu_count() or 1
+    if workers <= 1 or row_bytes < _PARALLEL_MIN_BYTES or rows * row_bytes < 2 * _PARALLEL_MIN_CHUNK_BYTES:
+        hash_range(0, rows)
+        return
+    chunk = max(-(-rows // (workers * 4)), _PARALLEL_MIN_CHUNK_BYTES // row_bytes, 1)
+    pool = _hash_pool(workers)
+    futures = [pool.submit(hash_range, start, min(start + chunk, rows)) for start in range(0, rows, chunk)]
+    for future in futures:
+        future.result()
+
+
+class FlatMerkleTree:
+    """Merkle tree whose levels live in one preallocated buffer.
+
+    Produces the same roots and proofs as ``MerkleTree`` (spec/commitments.md).
+    Each level is a ``memoryview`` of consecutive 32-byte nodes, so siblings are
+    hashed straight out of the buffer without building intermediate bytes.
+    """
+
+    def __init__(self, buffer: Union[bytearray, memoryview, np.ndarray], leaf_count: int) -> None:
+        self.leaf_count = leaf_count
+        self.buffer = memoryview(buffer).cast("B")
+        self.levels: List[memoryview] = []
+        offset = 0
+        for size in _level_sizes(leaf_count) if leaf_count else []:
+            self.levels.append(self.buffer[offset : offset + size * NODE_SIZE])
+            offset += size * NODE_SIZE
+        if offset != len(self.buffer):
+            raise ValueError("Merkle buffer size does not match leaf count")
+
+    @staticmethod
+    def buffer_size(leaf_count: int) -> int:
+        return sum(_level_sizes(leaf_count)) * NODE_SIZE if leaf_count else 0
+
+    @classmethod
+    @timed("merkle.build")
+    def from_matrix(
+        cls, matrix: Union[Sequence[Sequence[int]], np.ndarray], max_workers: Optional[int] = None
+    ) -> "FlatMerkleTree":
+        serialized = serialize_matrix(matrix)
+        leaf_count = serialized.shape[0]
+        tree = cls(bytearray(cls.buffer_size(leaf_count)), leaf_count)
+        if leaf_count:
+            hash_rows(serialized, tree.levels[0], max_workers)
+            tree._build()
+        return tree
+
+    @classmethod
+    @timed("merkle.build")
+    def from_leaf_hashes(cls, leaves: Union[bytes, bytearray, memoryview]) -> "FlatMerkleTree":
+        leaves = memoryview(leaves).cast("B")
+        if len(leaves) % NODE_SIZE:
+            raise ValueError("Leaf hashes must be a multiple of 32 bytes")
+        leaf_count = len(leaves) // NODE_SIZE
+        tree = cls(bytearray(cls.buffer_size(leaf_count)), leaf_count)
+        if leaf_count:
+            tree.levels[0][:] = leaves
+            tree._build()
+        return tree
+
+    def _build(self) -> None:
+        for child, parent in zip(self.levels, self.levels[1:]):
+            pairs = len(child) // (2 * NODE_SIZE)
+            for idx in range(pairs):
+                offset = idx * 2 * NODE_SIZE
+                parent[idx * NODE_SIZE : (idx + 1) * NODE_SIZE] = _hash(child[offset : offset + 2 * NODE_SIZE])
+            if len(child) // NODE_SIZE % 2:
+                last = bytes(child[-NODE_SIZE:])
+                parent[-NODE_SIZE:] = _hash(last + last)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.buffer)
+
+    def node(self, level: int, index: int) -> bytes:
+        return bytes(self.levels[level][index * NODE_SIZE : (index + 1) * NODE_SIZE])
+
+    def root(self) -> str:
+        if not self.levels:
+            return EMPTY_ROOT
+        return self.levels[-1].hex()
+
+    def root_bytes(self) -> bytes:
+        return bytes(self.levels[-1]) if self.levels else bytes.fromhex(EMPTY_ROOT)
+
+    @timed("merkle.proof")
+    def get_proof(self, index: int) -> List[str]:
+        proof = []
+        idx = index
+        for level in self.levels[:-1]:
+            sibling = min(idx + 1 if idx % 2 == 0 else idx - 1, len(level) // NODE_SIZE - 1)
+            proof.append(level[sibling * NODE_SIZE : (sibling + 1) * NODE_SIZE].hex())
+            idx //= 2
+        return proof
+
+    @timed("merkle.multiproof")
+    def get_multiproof(self, indices: Iterable[int]) -> List[str]:
+        return _multiproof_siblings(self.node, self.leaf_count, indices)
+
+
+class MerkleFrontier:
+    """Incremental Merkle root over leaves pushed in order, in O(log T) memory.
+
+    ``push`` accepts a single leaf hash or the root of an aligned complete
+    subtree of ``leaf_count`` (a power of two) leaves. A final partial subtree
+    may be pushed as long as it starts at a multiple of its padded size; its
+    root must be built with the usual duplication rule. ``root`` matches the
+    root ``MerkleTree`` would build over the same rows.
+    """
+
+    def __init__(self) -> None:
+        self.leaf_count = 0
+        self._pending: List[Optional[bytes]] = []
+        self._tail: Optional[Tuple[bytes, int]] = None
+
+    def push(self, node: bytes, leaf_count: int = 1) -> None:
+        if self._tail is not None:
+            raise ValueError("Cannot push after a partial subtree")
+        if leaf_count <= 0:
+            raise ValueError("leaf_count must be positive")
+        height = (leaf_count - 1).bit_length()
+        if self.leaf_count % (1 << height):
+            raise ValueError("Subtree is not aligned to its size")
+        self.leaf_count += leaf_count
+        if leaf_count != 1 << height:
+            self._tail = (node, height)
+            return
+        while height < len(self._pending) and self._pending[height] is not None:
+            node = _hash(self._pending[height] + node)
+            self._pending[height] = None
+            height += 1
+        while len(self._pending) <= height:
+            self._pending.append(None)
+        self._pending[height] = node
+
+    def root(self) -> str:
+        if self.leaf_count == 0:
+            return EMPTY_ROOT
+        carry: Optional[bytes] = None
+        count = self.leaf_count
+        level = 0
+        while True:
+            if self._tail is not None and self._tail[1] == level:
+                carry = self._tail[0]
+            pending = self._pending[level] if level < len(self._pending) else None
+            if count == 1:
+                return (carry if carry is not None else pending).hex()
+            if pending is not None and carry is not None:
+                carry = _hash(pending + carry)
+            elif pending is not None:
+                carry = _hash(pending + pending)
+            elif carry is not None:
+                carry = _hash(carry + carry)
+            count = (count + 1) // 2
+            level += 1
+
+
+@dataclass(frozen=True)
+class MerkleMultiproof:
+    leaf_count: int
+    rows: List[Tuple[int, List[int]]]
+    siblings: List[str]
+
+
+def _multiproof_walk(leaf_count: int, indices: Iterable[int]) -> Iterable[Tuple[int, List[int], List[Tuple[int, int]]]]:
+    """Yield ``(level, known_indices, pairs)`` for each level below the root.
+
+    ``pairs`` lists ``(left, right)`` node indices to hash, where an index not in
+    ``known_indices`` must come from the proof. A lone last node is paired with
+    itself, matching the duplication rule used when building the tree.
+    """
+    known = sorted(set(indices))
+    if known and (known[0] < 0 or known[-1] >= leaf_count):
+        raise IndexError("Merkle row index out of range")
+    for level, size in enumerate(_level_sizes(leaf_count)[:-1] if leaf_count else []):
+        pairs = []
+        cursor = 0
+        while cursor < len(known):
+            left = known[cursor] - known[cursor] % 2
+            right = left + 1 if left + 1 < size else left
+            pairs.append((left, right))
+            cursor += 2 if cursor + 1 < len(known) and known[cursor + 1] == left + 1 else 1
+        yield level, known, pairs
+        known = [left // 2 for left, _ in pairs]
+
+
+def _multiproof_siblings(
+    node: Callable[[int, int], bytes], leaf_count: int, indices: Iterable[int]
+) -> List[str]:
+    siblings = []
+    for level, known, pairs in _multiproof_walk(leaf_count, indices):
+        known_set = set(known)
+        for left, right in pairs:
+            for idx in (left, right):
+                if idx not in known_set:
+                    siblings.append(node(level, idx).hex())
+    return siblings
+
+
+def verify_multiproof(
+    leaf_count: int, rows: Sequence[Tuple[int, Sequence[int]]], siblings: Sequence[str], root: str
+) -> bool:
+    """Rebuild the root from opened rows and deduplicated siblings in one bottom-up pass.
+
+    Malformed proofs (row indices outside the tree, values outside int32,
+    bad siblings) return False rather than raising.
+    """
+    if not rows or leaf_count <= 0:
+        return False
+    nodes: Dict[int, bytes] = {}
+    cursor = 0
+    try:
+        for row_index, row_values in rows:
+            if row_index in nodes or not 0 <= row_index < leaf_count:
+                return False
+            nodes[row_index] = _hash(serialize_row(row_index, row_values))
+        for _, _, pairs in _multiproof_walk(leaf_count, nodes):
+            parents: Dict[int, bytes] = {}
+            for left, right in pairs:
+                halves = []
+                for idx in (left, right):
+                    if idx in nodes:
+                        halves.append(nodes[idx])
+                    else:
+                        halves.append(bytes.fromhex(siblings[cursor]))
+                        cursor += 1
+                parents[left // 2] = _hash(halves[0] + halves[1])
+            nodes = parents
+    except (IndexError, OverflowError, TypeError, ValueError, struct.error):
+        return False
+    if cursor != len(siblings):
+        return False
+    return next(iter(nodes.values())).hex() == root
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .gemm import GemmEngine, Matrix
+from .merkle import NODE_SIZE, FlatMerkleTree, MerkleFrontier, hash_rows, serialize_matrix
+from .tensor import saturate_int8
+
+
+def _row_count(matrix: Matrix) -> int:
+    return matrix.shape[0] if isinstance(matrix, np.ndarray) else len(matrix)
+
+
+class TileCommitter:
+    """Folds row tiles of one GEMM output into a Merkle root as they arrive.
+
+    Each tile is serialized, its leaves hashed, and the tile's subtree root
+    pushed into a ``MerkleFrontier``. Only the frontier is kept; rows and leaf
+    hashes are optionally copied into caller-provided sinks.
+    """
+
+    def __init__(
+        self,
+        output_sink: Optional[np.ndarray] = None,
+        leaf_sink: Optional[np.ndarray] = None,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        self.frontier = MerkleFrontier()
+        self.output_sink = output_sink
+        self.leaf_sink = leaf_sink
+        self.max_workers = max_workers
+
+    def commit(self, tile: Matrix) -> None:
+        start = self.frontier.leaf_count
+        serialized = serialize_matrix(tile, start_index=start)
+        rows = serialized.shape[0]
+        if rows == 0:
+            return
+        leaves = bytearray(rows * NODE_SIZE)
+        hash_rows(serialized, memoryview(leaves), self.max_workers)
+        if self.output_sink is not None:
+            self.output_sink[start : start + rows] = serialized[:, 1:]
+        if self.leaf_sink is not None:
+            self.leaf_sink[start : start + rows] = np.frombuffer(leaves, dtype=np.uint8).reshape(rows, NODE_SIZE)
+        subtree = FlatMerkleTree.from_leaf_hashes(leaves)
+        self.frontier.push(subtree.root_bytes(), rows)
+
+    def root(self) -> str:
+        return self.frontier.root()
+
+
+def stream_gemm_chain(
+    engine: GemmEngine,
+    input_matrix: Matrix,
+    weights: Sequence[Matrix],
+    tile_rows: int = 256,
+    output_sinks: Optional[Sequence[Optional[np.ndarray]]] = None,
+    leaf_sinks: Optional[Sequence[Optional[np.ndarray]]] = None,
+    max_workers: Optional[int] = None,
+    input_sinks: Optional[Sequence[Optional[np.ndarray]]] = None,
+) -> List[str]:
+    """Run ``input_matrix @ weights[0] @ weights[1] ...`` tile by tile and return each GEMM's root.
+
+    Output rows depend only on the matching input rows, so a tile of
+    ``tile_rows`` rows flows through every GEMM before the next tile starts.
+    Hashing of tile ``i`` runs on a background thread while tile ``i + 1`` is
+    computed; at most two tiles are alive at once. Each int32 output is
+    committed exactly and requantized (saturated) to int8 before it feeds the
+    next GEMM; ``input_sinks[idx]`` receives those int8 inputs of GEMM ``idx``.
+    """
+    if tile_rows <= 0 or tile_rows & (tile_rows - 1):
+        raise ValueError("tile_rows must be a power of two")
+    committers = [
+        TileCommitter(
+            output_sink=output_sinks[idx] if output_sinks else None,
+            leaf_sink=leaf_sinks[idx] if leaf_sinks else None,
+            max_workers=max_workers,
+        )
+        for idx in range(len(weights))
+    ]
+
+    def commit_tile(outputs: List[Matrix]) -> None:
+        for committer, output in zip(committers, outputs):
+            committer.commit(output)
+
+    with ThreadPoolExecutor(max_workers=1) as hasher:
+        in_flight: Optional[Future] = None
+        for start in range(0, _row_count(input_matrix), tile_rows):
+            current = input_matrix[start : start + tile_rows]
+            outputs = []
+            for idx, matrix in enumerate(weights):
+                if idx:
+                    current = saturate_int8(current)
+                    if input_sinks and input_sinks[idx] is not None:
+                        input_sinks[idx][start : start + len(current)] = current
+                current = engine.matmul(current, matrix)
+                outputs.append(current)
+            if in_flight is not None:
+                in_flight.result()
+            in_flight = hasher.submit(commit_tile, outputs)
+        if in_flight is not None:
+            in_flight.result()
+    return [committer.root() for committer in committers]
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .gemm import GemmEngine, Matrix, as_int_array, get_gemm_engine
+from .merkle import NODE_SIZE, FlatMerkleTree, MerkleFrontier, hash_rows, serialize_matrix
+from .tensor import saturate_int8
+
+
+# Arrays are shared with shard processes as (offset, shape, dtype) references
+# into one shared-memory segment per run.
+ArrayRef = Tuple[int, Tuple[int, ...], str]
+
+
+@dataclass(frozen=True)
+class ShardStat:
+    start: int
+    rows: int
+    pid: int
+    seconds: float
+
+
+@dataclass(frozen=True)
+class ShardedRun:
+    outputs: List[np.ndarray]
+    leaves: List[np.ndarray]
+    roots: List[str]
+    shards: List[ShardStat]
+    seconds: float
+
+
+_engine: Optional[GemmEngine] = None
+
+
+def _init_process(engine_name: str) -> None:
+    global _engine
+    _engine = get_gemm_engine(engine_name)
+
+
+def _compute_shard(
+    engine: GemmEngine,
+    inputs: np.ndarray,
+    weights: Sequence[np.ndarray],
+    outputs: Sequence[np.ndarray],
+    leaves: Sequence[np.ndarray],
+    start: int,
+    rows: int,
+) -> List[bytes]:
+    """Run the GEMM chain over rows ``[start, start + rows)`` and return each GEMM's subtree root."""
+    roots = []
+    current: Matrix = inputs[start : start + rows]
+    for matrix, output, leaf in zip(weights, outputs, leaves):
+        current = engine.matmul(current, matrix)
+        serialized = serialize_matrix(current, start_index=start)
+        output[start : start + rows] = serialized[:, 1:]
+        shard_leaves = memoryview(leaf[start : start + rows].reshape(-1))
+        # Shards already run one per core; hash leaves inline.
+        hash_rows(serialized, shard_leaves, max_workers=1)
+        roots.append(FlatMerkleTree.from_leaf_hashes(shard_leaves).root_bytes())
+        current = saturate_int8(output[start : start + rows])
+    return roots
+
+
+def _run_shard(
+    segment: str, refs: List[List[ArrayRef]], start: int, rows: int
+) -> Tuple[int, List[bytes], int, float]:
+    started = time.perf_counter()
+    shm = shared_memory.SharedMemory(name=segment)
+    try:
+        inputs, weights, outputs, leaves = [
+            [np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset) for offset, shape, dtype in group]
+            for group in refs
+        ]
+        roots = _compute_shard(_engine, inputs[0], weights, outputs, leaves, start, rows)
+        del inputs, weights, outputs, leaves
+    finally:
+        shm.close()
+    return start, roots, os.getpid(), time.perf_counter() - started
+
+
+class ShardedExecutor:
+    """Run a GEMM chain over row shards on a process pool, with bit-identical commitments.
+
+    Output rows depend only on the matching input rows, so the input is split
+    into shards of ``shard_rows`` rows. ``shard_rows`` is a power of two, so
+    every shard is an aligned Merkle subtree. Each process computes its shard
+    through every GEMM and hashes its leaves and subtree roots. The coordinator
+    folds the roots in order with a ``MerkleFrontier``; the last shard may be
+    partial and uses the usual odd-node duplication. Each GEMM's int32 output
+    is requantized (saturated) to int8 before it feeds the next GEMM. Inputs, weights, outputs
+    and leaf hashes live in one shared-memory segment, so only subtree roots
+    are pickled.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        shard_rows: Optional[int] = None,
+        engine: str = "numpy",
+    ) -> None:
+        if shard_rows is not None and (shard_rows <= 0 or shard_rows & (shard_rows - 1)):
+            raise ValueError("shard_rows must be a power of two")
+        self.max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+        self.shard_rows = shard_rows
+        self.engine = engine
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "ShardedExecutor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _shard_size(self, rows: int) -> int:
+        if self.shard_rows is not None:
+            return self.shard_rows
+        # One shard per worker, rounded up to a power of two.
+        per_worker = max(-(-rows // self.max_workers), 1)
+        return 1 << (per_worker - 1).bit_length()
+
+    def run(self, input_matrix: Matrix, weights: Sequence[Matrix]) -> ShardedRun:
+        started = time.perf_counter()
+        inputs = _int_matrix(input_matrix)
+        weight_arrays = [_int_matrix(matrix) for matrix in weights]
+        rows = inputs.shape[0]
+        cols = inputs.shape[1]
+        for matrix in weight_arrays:
+            if matrix.shape[0] != cols:
+                raise ValueError(f"Shape mismatch in GEMM chain: {cols} columns into {matrix.shape}")
+            cols = matrix.shape[1]
+        shapes = [((rows, matrix.shape[1]), np.dtype("<i4")) for matrix in weight_arrays]
+        leaf_shapes = [((rows, NODE_SIZE), np.dtype(np.uint8)) for _ in weight_arrays]
+        shard = self._shard_size(rows)
+        spans = [(start, min(shard, rows - start)) for start in range(0, rows, shard)]
+
+        results: List[Tuple[int, List[bytes], int, float]] = []
+        if self.max_workers <= 1 or len(spans) <= 1:
+            engine = get_gemm_engine(self.engine)
+            outputs = [np.empty(shape, dtype=dtype) for shape, dtype in shapes]
+            leaves = [np.empty(shape, dtype=dtype) for shape, dtype in leaf_shapes]
+            for start, count in spans:
+                shard_started = time.perf_counter()
+                roots = _compute_shard(engine, inputs, weight_arrays, outputs, leaves, start, count)
+                results.append((start, roots, os.getpid(), time.perf_counter() - shard_started))
+        else:
+            layout = [[(inputs.shape, inputs.dtype)], [(w.shape, w.dtype) for w in weight_arrays], shapes, leaf_shapes]
+            refs, total = _layout(layout)
+            shm = shared_memory.SharedMemory(create=True, size=max(total, 1))
+            views: Optional[List[List[np.ndarray]]] = None
+            try:
+                views = [
+                    [np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset) for offset, shape, dtype in group]
+                    for group in refs
+                ]
+                for index, source in enumerate([inputs] + weight_arrays):
+                    (views[0] + views[1])[index][...] = source
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers, initializer=_init_process, initargs=(self.engine,)
+                    )
+                futures = [self._pool.submit(_run_shard, shm.name, refs, start, count) for start, count in spans]
+                results = [future.result() for future in futures]
+                outputs = [view.copy() for view in views[2]]
+                leaves = [view.copy() for view in views[3]]
+            finally:
+                # Views must be released before the segment can be closed.
+                views = None
+                shm.close()
+                shm.unlink()
+
+        frontiers = [MerkleFrontier() for _ in weight_arrays]
+        for (start, count), (_, roots, _, _) in zip(spans, results):
+            for frontier, root in zip(frontiers, roots):
+                frontier.push(root, count)
+        return ShardedRun(
+            outputs=outputs,
+            leaves=leaves,
+            roots=[frontier.root() for frontier in frontiers],
+            shards=[
+                ShardStat(start=start, rows=count, pid=pid, seconds=seconds)
+                for (start, count), (_, _, pid, seconds) in zip(spans, results)
+            ],
+            seconds=time.perf_counter() - started,
+        )
+
+
+def _int_matrix(matrix: Matrix) -> np.ndarray:
+    array = as_int_array(matrix)
+    if array is None or array.ndim != 2:
+        if array is not None and array.size == 0:
+            return array.reshape(len(array), 0)
+        raise ValueError("Sharded execution needs integer matrices that fit in int64")
+    return array
+
+
+def _layout(groups: List[List[Tuple[Tuple[int, ...], np.dtype]]]) -> Tuple[List[List[ArrayRef]], int]:
+    refs: List[List[ArrayRef]] = []
+    offset = 0
+    for group in groups:
+        group_refs = []
+        for shape, dtype in group:
+            dtype = np.dtype(dtype)
+            group_refs.append((offset, tuple(shape), dtype.str))
+            # Keep every array 8-byte aligned.
+            offset += -(-int(np.prod(shape)) * dtype.itemsize // 8) * 8
+        refs.append(group_refs)
+    return refs, offset
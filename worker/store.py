@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .gemm import Matrix, as_int_array
+from .merkle import FlatMerkleTree
+from .tensor import Tensor
+
+
+ArtifactKey = Tuple[str, int, int, str]
+Artifact = Union[np.ndarray, FlatMerkleTree]
+
+ARTIFACT_KINDS = ("input", "weights", "output", "tree", "leaves")
+_COMPACT_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
+
+def compact_int_array(matrix: Matrix) -> np.ndarray:
+    array = matrix.array if isinstance(matrix, Tensor) else as_int_array(matrix)
+    if array is None:
+        raise ValueError("Artifacts must fit in int64")
+    if array.size == 0:
+        return array.astype(np.int8)
+    low, high = int(array.min()), int(array.max())
+    for dtype in _COMPACT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return array.astype(dtype, copy=False)
+    return array
+
+
+@dataclass
+class _Entry:
+    value: Artifact
+    nbytes: int
+    path: Optional[str] = None
+
+
+@dataclass
+class _JobArtifacts:
+    opened_at: float
+    entries: Dict[ArtifactKey, _Entry] = field(default_factory=dict)
+    aliases: Dict[ArtifactKey, ArtifactKey] = field(default_factory=dict)
+
+
+class ArtifactStore:
+    """Job-scoped GEMM artifacts with a RAM budget.
+
+    Artifacts are keyed by ``(job_id, layer_index, gemm_index, kind)``. The most
+    recently used ones stay resident; once ``memory_budget`` is exceeded the
+    least recently used are written to ``spill_dir`` and reopened read-only as
+    memory maps. A job's artifacts are dropped by ``close_job``, by ``expire``
+    once ``challenge_window`` seconds have elapsed (``None`` disables this), or
+    oldest job first once spilled artifacts exceed ``disk_budget``. The job
+    being written is never evicted for the disk budget.
+    """
+
+    def __init__(
+        self,
+        memory_budget: int = 1 << 30,
+        spill_dir: Optional[str] = None,
+        challenge_window: Optional[float] = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+        disk_budget: int = 16 << 30,
+    ) -> None:
+        self.memory_budget = memory_budget
+        self.challenge_window = challenge_window
+        self.disk_budget = disk_budget
+        self.clock = clock
+        self._spill_dir = spill_dir
+        self._owns_spill_dir = spill_dir is None
+        self._jobs: Dict[str, _JobArtifacts] = {}
+        self._resident: "OrderedDict[ArtifactKey, _Entry]" = OrderedDict()
+        self.resident_bytes = 0
+        self.spilled_bytes = 0
+        self._lock = threading.RLock()
+
+    def open_job(self, job_id: str) -> None:
+        with self._lock:
+            self.expire()
+            if job_id not in self._jobs:
+                self._jobs[job_id] = _JobArtifacts(opened_at=self.clock())
+
+    def jobs(self) -> List[str]:
+        with self._lock:
+            return list(self._jobs)
+
+    def put(self, job_id: str, layer_index: int, gemm_index: int, kind: str, value: Union[Matrix, FlatMerkleTree]) -> None:
+        if kind not in ARTIFACT_KINDS:
+            raise ValueError(f"Unknown artifact kind: {kind}")
+        if kind == "tree":
+            if not isinstance(value, FlatMerkleTree):
+                raise TypeError("Tree artifacts must be FlatMerkleTree instances")
+            artifact: Artifact = value
+            nbytes = value.nbytes
+        elif kind == "leaves":
+            # Leaf hashes are raw bytes; compacting them as integers would change them.
+            artifact = np.ascontiguousarray(value, dtype=np.uint8)
+            nbytes = artifact.nbytes
+        else:
+            artifact = compact_int_array(value)
+            nbytes = artifact.nbytes
+        key = (job_id, layer_index, gemm_index, kind)
+        with self._lock:
+            self.open_job(job_id)
+            job = self._jobs[job_id]
+            self._drop(job, key)
+            entry = _Entry(value=artifact, nbytes=nbytes)
+            job.entries[key] = entry
+            self._resident[key] = entry
+            self.resident_bytes += nbytes
+            self._enforce_budget()
+            self._enforce_disk_budget(job_id)
+
+    def allocate(
+        self, job_id: str, layer_index: int, gemm_index: int, kind: str, shape: Tuple[int, ...], dtype: np.dtype
+    ) -> np.ndarray:
+        """Reserve a writable array artifact, memory-mapped if it does not fit the budget."""
+        if kind not in ARTIFACT_KINDS or kind == "tree":
+            raise ValueError(f"Cannot allocate artifact kind: {kind}")
+        key = (job_id, layer_index, gemm_index, kind)
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with self._lock:
+            self.open_job(job_id)
+            job = self._jobs[job_id]
+            self._drop(job, key)
+            if nbytes == 0 or self.resident_bytes + nbytes <= self.memory_budget:
+                entry = _Entry(value=np.empty(shape, dtype=dtype), nbytes=nbytes)
+                self._resident[key] = entry
+                self.resident_bytes += nbytes
+            else:
+                path = self._spill_path(key)
+                entry = _Entry(value=np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape), nbytes=nbytes, path=path)
+                self.spilled_bytes += nbytes
+            job.entries[key] = entry
+            self._enforce_disk_budget(job_id)
+            return entry.value
+
+    def link(self, job_id: str, layer_index: int, gemm_index: int, kind: str, source: Tuple[int, int, str]) -> None:
+        """Make an artifact share storage with another artifact of the same job."""
+        key = (job_id, layer_index, gemm_index, kind)
+        target = (job_id,) + tuple(source)
+        with self._lock:
+            job = self._jobs[job_id]
+            if target not in job.entries:
+                raise KeyError(target)
+            self._drop(job, key)
+            job.aliases[key] = target
+
+    def get(self, job_id: str, layer_index: int, gemm_index: int, kind: str) -> Artifact:
+        key = (job_id, layer_index, gemm_index, kind)
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise KeyError(key)
+            key = job.aliases.get(key, key)
+            entry = job.entries[key]
+            if key in self._resident:
+                self._resident.move_to_end(key)
+            return entry.value
+
+    def close_job(self, job_id: str) -> None:
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                return
+            for key in list(job.entries):
+                self._drop(job, key)
+
+    def expire(self, now: Optional[float] = None) -> List[str]:
+        if self.challenge_window is None:
+            return []
+        with self._lock:
+            now = self.clock() if now is None else now
+            expired = [job_id for job_id, job in self._jobs.items() if now - job.opened_at >= self.challenge_window]
+            for job_id in expired:
+                self.close_job(job_id)
+            return expired
+
+    def close(self) -> None:
+        with self._lock:
+            for job_id in list(self._jobs):
+                self.close_job(job_id)
+            if self._owns_spill_dir and self._spill_dir is not None:
+                shutil.rmtree(self._spill_dir, ignore_errors=True)
+                self._spill_dir = None
+
+    def _drop(self, job: _JobArtifacts, key: ArtifactKey) -> None:
+        job.aliases.pop(key, None)
+        entry = job.entries.pop(key, None)
+        if entry is None:
+            return
+        for alias, target in list(job.aliases.items()):
+            if target == key:
+                del job.aliases[alias]
+        if self._resident.pop(key, None) is not None:
+            self.resident_bytes -= entry.nbytes
+        if entry.path is not None:
+            self.spilled_bytes -= entry.nbytes
+            entry.value = None
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def _enforce_budget(self) -> None:
+        while self.resident_bytes > self.memory_budget and self._resident:
+            key, entry = self._resident.popitem(last=False)
+            self.resident_bytes -= entry.nbytes
+            self._spill(key, entry)
+
+    def _enforce_disk_budget(self, current_job: str) -> None:
+        while self.spilled_bytes > self.disk_budget:
+            older = [job_id for job_id in self._jobs if job_id != current_job]
+            if not older:
+                return
+            self.close_job(min(older, key=lambda job_id: self._jobs[job_id].opened_at))
+
+    def _spill_path(self, key: ArtifactKey) -> str:
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="compute-artifacts-")
+        os.makedirs(self._spill_dir, exist_ok=True)
+        job_id, layer_index, gemm_index, kind = key
+        job_tag = hashlib.sha256(job_id.encode("utf-8")).hexdigest()[:16]
+        suffix = "bin" if kind == "tree" else "npy"
+        return os.path.join(self._spill_dir, f"{job_tag}-{layer_index}-{gemm_index}-{kind}.{suffix}")
+
+    def _spill(self, key: ArtifactKey, entry: _Entry) -> None:
+        if entry.nbytes == 0:
+            return
+        path = self._spill_path(key)
+        value = entry.value
+        if isinstance(value, FlatMerkleTree):
+            with open(path, "wb") as handle:
+                handle.write(value.buffer)
+            entry.value = FlatMerkleTree(np.memmap(path, dtype=np.uint8, mode="r"), value.leaf_count)
+        else:
+            spilled = np.lib.format.open_memmap(path, mode="w+", dtype=value.dtype, shape=value.shape)
+            spilled[...] = value
+            spilled.flush()
+            del spilled
+            entry.value = np.load(path, mmap_mode="r")
+        entry.path = path
+        self.spilled_bytes += entry.nbytes
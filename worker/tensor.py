@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from typing import Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+
+INT8 = np.dtype(np.int8)
+INT32 = np.dtype(np.int32)
+_PACKED_DTYPES = (INT8, INT32)
+
+
+def _integer_array(values) -> np.ndarray:
+    if isinstance(values, Tensor):
+        return values.array
+    array = np.asarray(values)
+    if array.dtype == object or array.dtype.kind not in "iub":
+        try:
+            array = np.asarray(values, dtype=np.int64)
+        except OverflowError:
+            # Python ints beyond int64; reduced exactly below.
+            array = np.asarray(values, dtype=object)
+        except (TypeError, ValueError) as exc:
+            raise TypeError("Tensor values must be integers") from exc
+    if array.ndim == 1 and array.size == 0:
+        array = array.reshape(0, 0)
+    if array.ndim != 2:
+        raise ValueError(f"Tensor must be 2-D, got shape {array.shape}")
+    return array
+
+
+def saturate_int8(values) -> np.ndarray:
+    """Clamp to ``[-128, 127]``, as int8 quantization of activations and weights does."""
+    array = _integer_array(values)
+    if array.dtype == object:
+        array = np.clip(array, -128, 127).astype(np.int64)
+    return np.clip(array, -128, 127).astype(INT8)
+
+
+def wrap_int32(values) -> np.ndarray:
+    """Reduce to int32 with two's-complement wraparound, as int32 accumulators do."""
+    array = _integer_array(values)
+    if array.dtype == object:
+        array = ((array + (1 << 31)) % (1 << 32) - (1 << 31)).astype(np.int64)
+    return array.astype(np.int64, copy=False).astype(INT32)
+
+
+class Tensor:
+    """Immutable, packed, row-major 2-D int8 or int32 matrix.
+
+    ``Tensor.int8`` saturates and ``Tensor.int32`` wraps, matching the int8
+    quantization and int32 accumulation rules in
+    spec/deterministic_inference.md. ``Tensor.pack`` stores values exactly in
+    the narrowest of the two dtypes and raises ``OverflowError`` otherwise.
+
+    The buffer is read-only. Slicing rows (``tensor[a:b]``) returns a
+    ``Tensor`` view without copying, and ``tensor[i]`` returns a read-only row
+    array. ``np.asarray(tensor)`` is zero-copy, so tensors can be passed
+    anywhere a ``Matrix`` is accepted.
+    """
+
+    __slots__ = ("_array",)
+
+    def __init__(self, array: np.ndarray) -> None:
+        if not isinstance(array, np.ndarray) or array.ndim != 2 or array.dtype not in _PACKED_DTYPES:
+            raise TypeError("Tensor wraps a 2-D int8 or int32 array; use Tensor.pack, int8 or int32")
+        if array.flags.writeable or not array.flags.c_contiguous:
+            # Copy so that no writable alias of the buffer escapes.
+            array = np.array(array, order="C")
+            array.flags.writeable = False
+        self._array = array
+
+    @classmethod
+    def _owned(cls, array: np.ndarray) -> "Tensor":
+        """Wrap a freshly allocated array without copying it."""
+        array = np.ascontiguousarray(array)
+        array.flags.writeable = False
+        return cls(array)
+
+    @classmethod
+    def wrap(cls, array: np.ndarray) -> "Tensor":
+        """Wrap ``array`` (e.g. a memory-mapped artifact) through a read-only view, without copying.
+
+        The caller must not write to ``array`` afterwards.
+        """
+        return cls._owned(array.view())
+
+    @classmethod
+    def int8(cls, values) -> "Tensor":
+        return cls._owned(saturate_int8(values))
+
+    @classmethod
+    def int32(cls, values) -> "Tensor":
+        return cls._owned(wrap_int32(values))
+
+    @classmethod
+    def pack(cls, values, dtype: Optional[Union[str, np.dtype]] = None) -> "Tensor":
+        """Store ``values`` exactly as int8 if they fit (or ``dtype`` says so), else int32."""
+        if isinstance(values, Tensor) and (dtype is None or values.dtype == np.dtype(dtype)):
+            return values
+        array = _integer_array(values)
+        if array.size:
+            low, high = int(array.min()), int(array.max())
+        else:
+            low = high = 0
+        candidates = _PACKED_DTYPES if dtype is None else (np.dtype(dtype),)
+        for candidate in candidates:
+            if candidate not in _PACKED_DTYPES:
+                raise ValueError(f"Unsupported tensor dtype: {candidate}")
+            info = np.iinfo(candidate)
+            if info.min <= low and high <= info.max:
+                return cls._owned(array.astype(candidate))
+        raise OverflowError(f"Tensor values [{low}, {high}] do not fit in {candidates[-1]}")
+
+    @property
+    def array(self) -> np.ndarray:
+        """The read-only backing array."""
+        return self._array
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self._array.shape
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._array.dtype
+
+    @property
+    def nbytes(self) -> int:
+        return self._array.nbytes
+
+    def __len__(self) -> int:
+        return self._array.shape[0]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        return iter(self._array)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if index.step not in (None, 1):
+                raise ValueError("Tensor row slices must be contiguous")
+            return Tensor(self._array[index])
+        return self._array[index]
+
+    def rows(self, start: int, stop: int) -> "Tensor":
+        return Tensor(self._array[start:stop])
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        if dtype is None or np.dtype(dtype) == self._array.dtype:
+            return self._array.copy() if copy else self._array
+        if copy is False:
+            raise ValueError(f"Cannot view a {self._array.dtype} tensor as {np.dtype(dtype)} without copying")
+        return self._array.astype(dtype)
+
+    def tolist(self):
+        return self._array.tolist()
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Tensor):
+            other = other._array
+        elif not isinstance(other, np.ndarray):
+            return NotImplemented
+        return self._array.shape == other.shape and bool(np.array_equal(self._array, other))
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __reduce__(self):
+        return (Tensor, (self._array,))
+
+    def __repr__(self) -> str:
+        return f"Tensor(shape={self.shape}, dtype={self.dtype})"
@@ -1,19 +1,37 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List
+from typing import Tuple
+
+from .tensor import INT32, Tensor
 
 
 @dataclass(frozen=True)
 class InferenceJob:
+    """A shard of work. Matrices given as nested lists or arrays are packed into ``Tensor``s."""
+
     job_id: str
     sku_id: str
     shard_id: str
-    input_matrix: List[List[int]]
-    weights: List[List[List[int]]]
+    input_matrix: Tensor
+    weights: Tuple[Tensor, ...]
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "input_matrix", Tensor.pack(self.input_matrix))
+        object.__setattr__(self, "weights", tuple(Tensor.pack(matrix) for matrix in self.weights))
+
+    @property
+    def nbytes(self) -> int:
+        return self.input_matrix.nbytes + sum(matrix.nbytes for matrix in self.weights)
 
 
 @dataclass(frozen=True)
 class InferenceOutput:
-    output_matrix: List[List[int]]
-    gemm_outputs: List[List[List[int]]]
+    """GEMM outputs as int32 ``Tensor``s; ``output_matrix`` is the last one (or the input if there are none)."""
+
+    output_matrix: Tensor
+    gemm_outputs: Tuple[Tensor, ...]
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "output_matrix", Tensor.pack(self.output_matrix))
+        object.__setattr__(self, "gemm_outputs", tuple(Tensor.pack(matrix, INT32) for matrix in self.gemm_outputs))
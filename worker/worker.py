@@ -1,37 +1,23 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import List, Optional, Tuple, Union
 
+import numpy as np
+
+from chain.randomness import select_spot_rows
 from chain.types import GemmCommitment, Receipt
+from metrics.metrics import inc, timed
 
-from .merkle import MerkleTree
+from .gemm import GemmEngine, Matrix, ModOperand, NumpyGemmEngine, matmul_int32, matvec_int32, mod_matmul
+from .merkle import NODE_SIZE, FlatMerkleTree, MerkleMultiproof
+from .pipeline import stream_gemm_chain
+from .sharded import ShardedExecutor
+from .store import ArtifactStore
+from .tensor import INT32, Tensor, saturate_int8
 from .types import InferenceJob, InferenceOutput
 
 
-def matmul_int32(a: List[List[int]], b: List[List[int]]) -> List[List[int]]:
-    rows = len(a)
-    cols = len(b[0]) if b else 0
-    inner = len(b)
-    result = [[0 for _ in range(cols)] for _ in range(rows)]
-    for i in range(rows):
-        for k in range(inner):
-            aik = int(a[i][k])
-            for j in range(cols):
-                result[i][j] += aik * int(b[k][j])
-    return result
-
-
-def matvec_int32(matrix: List[List[int]], vector: List[int]) -> List[int]:
-    result = []
-    for row in matrix:
-        acc = 0
-        for idx, value in enumerate(row):
-            acc += int(value) * int(vector[idx])
-        result.append(acc)
-    return result
-
-
 @dataclass
 class ChallengeResponse:
     layer_index: int
@@ -39,56 +25,194 @@ class ChallengeResponse:
     r_vector: List[int]
     wr_vector: List[int]
     yr_vector: List[int]
-    merkle_proofs: List[Tuple[int, List[int], List[str]]]
+    merkle_proofs: Union[List[Tuple[int, List[int], List[str]]], MerkleMultiproof]
+
+
+@dataclass(frozen=True)
+class BatchChallengeResponse:
+    """All rounds for one GEMM: ``wr_vectors`` is ``k x H`` and ``yr_vectors`` is ``k x T``, mod P."""
+
+    layer_index: int
+    gemm_index: int
+    wr_vectors: np.ndarray
+    yr_vectors: np.ndarray
+    merkle_proofs: MerkleMultiproof
 
 
 class WorkerNode:
-    def __init__(self, pubkey: str) -> None:
+    def __init__(
+        self,
+        pubkey: str,
+        gemm_engine: Optional[GemmEngine] = None,
+        artifacts: Optional[ArtifactStore] = None,
+        block_rows: int = 1024,
+        tile_rows: Optional[int] = None,
+        executor: Optional[ShardedExecutor] = None,
+    ) -> None:
         self.pubkey = pubkey
-        self.gemm_inputs: Dict[Tuple[int, int], List[List[int]]] = {}
-        self.gemm_weights: Dict[Tuple[int, int], List[List[int]]] = {}
-        self.gemm_outputs: Dict[Tuple[int, int], List[List[int]]] = {}
-        self.gemm_trees: Dict[Tuple[int, int], MerkleTree] = {}
+        self.gemm_engine = gemm_engine if gemm_engine is not None else NumpyGemmEngine()
+        self.artifacts = artifacts if artifacts is not None else ArtifactStore()
+        self.block_rows = block_rows
+        self.tile_rows = tile_rows
+        self.executor = executor
+        self.last_job_id: Optional[str] = None
 
+    @timed("worker.run_job")
     def run_job(self, job: InferenceJob) -> Tuple[InferenceOutput, Receipt]:
-        current = job.input_matrix
-        gemm_outputs = []
-        for idx, weights in enumerate(job.weights):
-            gemm_key = (0, idx)
-            self.gemm_inputs[gemm_key] = current
-            self.gemm_weights[gemm_key] = weights
-            output = matmul_int32(current, weights)
-            self.gemm_outputs[gemm_key] = output
-            self.gemm_trees[gemm_key] = MerkleTree(output)
-            gemm_outputs.append(output)
-            current = output
+        self.artifacts.close_job(job.job_id)
+        self.artifacts.open_job(job.job_id)
+        if self.executor is not None:
+            gemm_outputs, roots = self._run_sharded(job)
+        elif self.tile_rows is not None:
+            gemm_outputs, roots = self._run_streaming(job)
+        else:
+            gemm_outputs, roots = self._run_in_memory(job)
+        self.last_job_id = job.job_id
+        inc("worker.gemms", len(job.weights))
 
-        output_matrix = current
-        output_tree = MerkleTree(output_matrix)
+        output_matrix = gemm_outputs[-1] if gemm_outputs else job.input_matrix
+        # The final output is the last GEMM output, so its root is already known.
+        output_root = roots[-1] if roots else FlatMerkleTree.from_matrix(output_matrix).root()
         commitments = [
-            GemmCommitment(layer_index=0, gemm_index=idx, merkle_root=self.gemm_trees[(0, idx)].root())
-            for idx in range(len(job.weights))
+            GemmCommitment(layer_index=0, gemm_index=idx, merkle_root=root) for idx, root in enumerate(roots)
         ]
         receipt = Receipt(
             worker_pubkey=self.pubkey,
             job_id=job.job_id,
             shard_id=job.shard_id,
             sku_id=job.sku_id,
-            output_root=output_tree.root(),
+            output_root=output_root,
             gemm_commitments=commitments,
         )
         return InferenceOutput(output_matrix=output_matrix, gemm_outputs=gemm_outputs), receipt
 
+    def _run_in_memory(self, job: InferenceJob) -> Tuple[List[Tensor], List[str]]:
+        current = job.input_matrix
+        gemm_outputs = []
+        roots = []
+        for idx, weights in enumerate(job.weights):
+            if idx > 0:
+                current = Tensor.int8(current)
+            self.artifacts.put(job.job_id, 0, idx, "input", current)
+            self.artifacts.put(job.job_id, 0, idx, "weights", weights)
+            output = Tensor.pack(self.gemm_engine.matmul(current, weights), INT32)
+            tree = FlatMerkleTree.from_matrix(output)
+            self.artifacts.put(job.job_id, 0, idx, "output", output)
+            self.artifacts.put(job.job_id, 0, idx, "tree", tree)
+            roots.append(tree.root())
+            gemm_outputs.append(output)
+            current = output
+        return gemm_outputs, roots
+
+    def _run_streaming(self, job: InferenceJob) -> Tuple[List[Tensor], List[str]]:
+        # Outputs and leaf hashes go straight into store-allocated buffers, which
+        # are memory-mapped when they exceed the budget; trees are rebuilt from
+        # the leaf hashes only when a challenge needs proofs.
+        rows = len(job.input_matrix)
+        output_sinks = []
+        leaf_sinks = []
+        input_sinks = []
+        for idx, weights in enumerate(job.weights):
+            if idx == 0:
+                self.artifacts.put(job.job_id, 0, idx, "input", job.input_matrix)
+                input_sinks.append(None)
+            else:
+                shape = (rows, weights.shape[0])
+                input_sinks.append(self.artifacts.allocate(job.job_id, 0, idx, "input", shape, np.int8))
+            self.artifacts.put(job.job_id, 0, idx, "weights", weights)
+            cols = weights.shape[1]
+            output_sinks.append(self.artifacts.allocate(job.job_id, 0, idx, "output", (rows, cols), np.int32))
+            leaf_sinks.append(self.artifacts.allocate(job.job_id, 0, idx, "leaves", (rows, NODE_SIZE), np.uint8))
+        roots = stream_gemm_chain(
+            self.gemm_engine,
+            job.input_matrix,
+            job.weights,
+            tile_rows=self.tile_rows,
+            output_sinks=output_sinks,
+            leaf_sinks=leaf_sinks,
+            input_sinks=input_sinks,
+        )
+        return [Tensor.wrap(sink) for sink in output_sinks], roots
+
+    def _run_sharded(self, job: InferenceJob) -> Tuple[List[Tensor], List[str]]:
+        # Shards keep only leaf hashes; trees are rebuilt when a GEMM is challenged.
+        run = self.executor.run(job.input_matrix, job.weights)
+        for idx, weights in enumerate(job.weights):
+            if idx == 0:
+                self.artifacts.put(job.job_id, 0, idx, "input", job.input_matrix)
+            else:
+                self.artifacts.put(job.job_id, 0, idx, "input", saturate_int8(run.outputs[idx - 1]))
+            self.artifacts.put(job.job_id, 0, idx, "weights", weights)
+            self.artifacts.put(job.job_id, 0, idx, "output", run.outputs[idx])
+            self.artifacts.put(job.job_id, 0, idx, "leaves", run.leaves[idx])
+        return [Tensor.wrap(output) for output in run.outputs], run.roots
+
+    def gemm_artifact(self, layer_index: int, gemm_index: int, kind: str, job_id: Optional[str] = None):
+        job_id = job_id if job_id is not None else self.last_job_id
+        if job_id is None:
+            raise KeyError("No job has been run")
+        try:
+            return self.artifacts.get(job_id, layer_index, gemm_index, kind)
+        except KeyError:
+            if kind != "tree":
+                raise
+        leaves = self.artifacts.get(job_id, layer_index, gemm_index, "leaves")
+        tree = FlatMerkleTree.from_leaf_hashes(memoryview(np.ascontiguousarray(leaves)))
+        self.artifacts.put(job_id, layer_index, gemm_index, "tree", tree)
+        return tree
+
+    @staticmethod
+    def _rows_to_open(
+        row_indices: List[int],
+        receipt_id: Optional[str],
+        layer_index: int,
+        gemm_index: int,
+        total_rows: int,
+        open_rows: int,
+    ) -> List[int]:
+        """``row_indices`` plus the spot-check rows the verifier derives for this receipt and GEMM."""
+        rows = list(row_indices)
+        if receipt_id is not None and open_rows > 0:
+            requested = set(rows)
+            spot_rows = select_spot_rows(receipt_id, layer_index, gemm_index, total_rows, open_rows)
+            rows += [idx for idx in spot_rows if idx not in requested]
+        return rows
+
+    def _blocked_matvec(self, matrix, vector: List[int]) -> List[int]:
+        # Artifacts may be memory-mapped; stream them a row block at a time.
+        result: List[int] = []
+        for start in range(0, len(matrix), self.block_rows):
+            result.extend(self.gemm_engine.matvec(matrix[start : start + self.block_rows], vector))
+        return result
+
+    @timed("worker.respond_challenge")
     def respond_challenge(
-        self, layer_index: int, gemm_index: int, r_vector: List[int], row_indices: List[int]
+        self,
+        layer_index: int,
+        gemm_index: int,
+        r_vector: List[int],
+        row_indices: List[int],
+        multiproof: bool = False,
+        job_id: Optional[str] = None,
+        receipt_id: Optional[str] = None,
+        open_rows: int = 0,
     ) -> ChallengeResponse:
-        key = (layer_index, gemm_index)
-        weights = self.gemm_weights[key]
-        output = self.gemm_outputs[key]
-        wr_vector = matvec_int32(weights, r_vector)
-        yr_vector = matvec_int32(output, r_vector)
-        tree = self.gemm_trees[key]
-        proofs = [(idx, output[idx], tree.get_proof(idx)) for idx in row_indices]
+        """Answer one round. With ``receipt_id`` and ``open_rows``, the spot-check rows are opened too."""
+        weights = self.gemm_artifact(layer_index, gemm_index, "weights", job_id)
+        output = self.gemm_artifact(layer_index, gemm_index, "output", job_id)
+        tree = self.gemm_artifact(layer_index, gemm_index, "tree", job_id)
+        row_indices = self._rows_to_open(row_indices, receipt_id, layer_index, gemm_index, len(output), open_rows)
+        wr_vector = self._blocked_matvec(weights, r_vector)
+        yr_vector = self._blocked_matvec(output, r_vector)
+        if multiproof:
+            opened = sorted(set(row_indices))
+            proofs = MerkleMultiproof(
+                leaf_count=tree.leaf_count,
+                rows=[(idx, [int(value) for value in output[idx]]) for idx in opened],
+                siblings=tree.get_multiproof(opened),
+            )
+        else:
+            proofs = [(idx, [int(value) for value in output[idx]], tree.get_proof(idx)) for idx in row_indices]
         return ChallengeResponse(
             layer_index=layer_index,
             gemm_index=gemm_index,
@@ -97,3 +221,46 @@ class WorkerNode:
             yr_vector=yr_vector,
             merkle_proofs=proofs,
         )
+
+    @timed("worker.respond_challenge_batch")
+    def respond_challenge_batch(
+        self,
+        layer_index: int,
+        gemm_index: int,
+        r_vectors: Matrix,
+        row_indices: List[int],
+        job_id: Optional[str] = None,
+        weights: Optional[ModOperand] = None,
+        receipt_id: Optional[str] = None,
+        open_rows: int = 0,
+    ) -> BatchChallengeResponse:
+        """Answer every round for one GEMM with one blocked ``W @ R`` and ``Y @ R`` mod P.
+
+        ``r_vectors`` is ``k x N``. ``weights`` may be a prepared operand for
+        this GEMM's weights, reused across challenges. With ``receipt_id`` and
+        ``open_rows``, the spot-check rows are opened along with ``row_indices``.
+        """
+        if weights is None:
+            weights = self.gemm_artifact(layer_index, gemm_index, "weights", job_id)
+        output = self.gemm_artifact(layer_index, gemm_index, "output", job_id)
+        tree = self.gemm_artifact(layer_index, gemm_index, "tree", job_id)
+        r = np.ascontiguousarray(np.asarray(r_vectors, dtype=np.uint64).T)
+        wr = mod_matmul(weights, r, block_rows=self.block_rows)
+        yr = np.empty((len(output), r.shape[1]), dtype=np.uint64)
+        # Outputs may be memory-mapped; only one row block is widened at a time.
+        for start in range(0, len(output), self.block_rows):
+            block = output[start : start + self.block_rows]
+            yr[start : start + self.block_rows] = mod_matmul(block, r, block_rows=self.block_rows)
+        rows = self._rows_to_open(row_indices, receipt_id, layer_index, gemm_index, len(output), open_rows)
+        opened = sorted(set(rows))
+        return BatchChallengeResponse(
+            layer_index=layer_index,
+            gemm_index=gemm_index,
+            wr_vectors=wr.T,
+            yr_vectors=yr.T,
+            merkle_proofs=MerkleMultiproof(
+                leaf_count=tree.leaf_count,
+                rows=[(idx, [int(value) for value in output[idx]]) for idx in opened],
+                siblings=tree.get_multiproof(opened),
+            ),
+        )